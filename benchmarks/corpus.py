@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Reproducible synthetic corpora for the benchmark suite.
+
+Documents are assembled from the comments produced by
+``create_synthetic_dataset`` and padded to lengths drawn from a
+configurable distribution, so the same seed always yields the same corpus.
+"""
+
+import os
+import sys
+import csv
+import math
+import random
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mca_ai.data_loader import create_synthetic_dataset
+
+# Average text length reported in the README dataset statistics
+README_MEAN_CHARS = 32759
+
+LENGTH_DISTS = ["fixed", "uniform", "lognormal", "readme"]
+
+
+def sample_lengths(num_docs: int, dist: str = "readme", mean_chars: int = README_MEAN_CHARS, sigma: float = 1.0, seed: int = 42):
+    """Draw target document lengths in characters."""
+    rng = random.Random(seed)
+    if dist == "readme":
+        dist, mean_chars = "lognormal", README_MEAN_CHARS
+    if dist == "fixed":
+        return [mean_chars] * num_docs
+    if dist == "uniform":
+        return [rng.randint(1, 2 * mean_chars) for _ in range(num_docs)]
+    if dist == "lognormal":
+        # Choose mu so that the distribution mean equals mean_chars
+        mu = math.log(mean_chars) - sigma ** 2 / 2
+        return [max(1, int(rng.lognormvariate(mu, sigma))) for _ in range(num_docs)]
+    raise ValueError(f"Unknown length distribution: {dist}")
+
+
+def build_corpus(num_docs: int = 200, dist: str = "readme", mean_chars: int = README_MEAN_CHARS, sigma: float = 1.0, seed: int = 42):
+    """Return ``num_docs`` raw comment texts following the chosen length distribution."""
+    random.seed(seed)
+    synthetic = create_synthetic_dataset(max(num_docs, 100))
+    sentences = list(synthetic["train"]["text"]) + list(synthetic["test"]["text"])
+    rng = random.Random(seed)
+    docs = []
+    for target in sample_lengths(num_docs, dist, mean_chars, sigma, seed):
+        parts, size = [], 0
+        while size < target:
+            s = rng.choice(sentences)
+            parts.append(s)
+            size += len(s) + 1
+        docs.append(" ".join(parts)[:target])
+    return docs
+
+
+def write_corpus_csv(docs, data_dir: str) -> str:
+    """Write docs as ``train.csv`` so ``load_dataset_any`` can read them with ``data.source: csv``."""
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    csv_path = os.path.join(data_dir, "train.csv")
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "text"])
+        for i, doc in enumerate(docs):
+            writer.writerow([i, doc])
+    return csv_path
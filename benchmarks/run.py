@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Per-stage benchmark suite for the MCA AI pipeline.
+
+Usage:
+    python benchmarks/run.py bench --docs 200 --dist readme --out benchmarks/results.json
+    python benchmarks/run.py compare benchmarks/baseline.json benchmarks/results.json
+
+Each stage runs in its own process so peak RSS is attributed to that stage.
+Tokens are whitespace-separated words, which keeps the numbers comparable
+across models with different tokenizers.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import platform
+import multiprocessing as mp
+from queue import Empty
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import LENGTH_DISTS, README_MEAN_CHARS, build_corpus, write_corpus_csv
+
+STAGES = ["clean_text", "load_dataset_any", "sentiment", "summarize", "keywords", "wordcloud"]
+# Stages that load a model only see the first --model-docs documents
+MODEL_STAGES = {"sentiment", "summarize", "keywords"}
+
+# Defaults from configs/default.yaml as documented in the README
+DEFAULTS = SimpleNamespace(
+    sentiment=SimpleNamespace(model_name="cardiffnlp/twitter-roberta-base-sentiment-latest", batch_size=16, max_length=256),
+    summarization=SimpleNamespace(model_name="t5-small", max_input_length=512, max_summary_length=64, num_beams=4),
+    keywords=SimpleNamespace(method="keybert", top_k=20),
+    viz=SimpleNamespace(wordcloud=SimpleNamespace(width=800, height=400, background_color="white")),
+    device="auto",
+)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _percentile(values, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+def _load_cfg(config_path):
+    if config_path:
+        from mca_ai.config import load_config
+        return load_config(config_path)
+    return DEFAULTS
+
+
+def _stage_clean_text(docs, cfg, opts):
+    from mca_ai.preprocess import clean_text
+    return [_timed(clean_text, d)[1] for d in docs]
+
+
+def _stage_load_dataset_any(docs, cfg, opts):
+    from mca_ai.data_loader import load_dataset_any
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus_csv(docs, tmp)
+        load_cfg = SimpleNamespace(
+            data=SimpleNamespace(source="csv", text_field="text", split_ratio=[0.9, 0.1], fast_limit=None, map_num_proc=opts["num_proc"]),
+            paths=SimpleNamespace(data_dir=tmp),
+            seed=42,
+        )
+        return [_timed(load_dataset_any, load_cfg)[1]]
+
+
+def _stage_sentiment(docs, cfg, opts):
+    from mca_ai.models.sentiment import SentimentPipeline
+    sent = SentimentPipeline(cfg.sentiment.model_name, cfg.sentiment.max_length, cfg.device)
+    bs = cfg.sentiment.batch_size
+    return [_timed(sent.predict, docs[i:i + bs], batch_size=bs)[1] for i in range(0, len(docs), bs)]
+
+
+def _stage_summarize(docs, cfg, opts):
+    from mca_ai.models.summarizer import Summarizer
+    sc = cfg.summarization
+    sumz = Summarizer(sc.model_name, sc.max_input_length, sc.max_summary_length, sc.num_beams, cfg.device)
+    return [_timed(sumz.summarize, d)[1] for d in docs]
+
+
+def _stage_keywords(docs, cfg, opts):
+    from mca_ai.models.keywords import extract_keywords
+    return [_timed(extract_keywords, d, top_k=cfg.keywords.top_k)[1] for d in docs]
+
+
+def _stage_wordcloud(docs, cfg, opts):
+    from mca_ai.viz.wordcloud_utils import build_wordcloud
+    wc = cfg.viz.wordcloud
+    return [_timed(build_wordcloud, " ".join(docs), width=wc.width, height=wc.height, background_color=wc.background_color)[1]]
+
+
+_STAGE_FNS = {
+    "clean_text": _stage_clean_text,
+    "load_dataset_any": _stage_load_dataset_any,
+    "sentiment": _stage_sentiment,
+    "summarize": _stage_summarize,
+    "keywords": _stage_keywords,
+    "wordcloud": _stage_wordcloud,
+}
+
+
+def _run_stage(stage, docs, config_path, opts, queue):
+    """Child-process entry point: run one stage and report its metrics."""
+    try:
+        cfg = _load_cfg(config_path)
+        if stage in ("sentiment", "summarize", "keywords", "wordcloud"):
+            from mca_ai.preprocess import clean_text
+            docs = [clean_text(d) for d in docs]
+        rss_before = _peak_rss_mb()
+        start = time.perf_counter()
+        latencies = _STAGE_FNS[stage](docs, cfg, opts)
+        elapsed = time.perf_counter() - start
+        tokens = sum(len(d.split()) for d in docs)
+        queue.put({
+            "docs": len(docs),
+            "tokens": tokens,
+            "calls": len(latencies),
+            "wall_s": elapsed,
+            "docs_per_sec": len(docs) / elapsed if elapsed else None,
+            "tokens_per_sec": tokens / elapsed if elapsed else None,
+            "latency_p50_s": _percentile(latencies, 0.50),
+            "latency_p95_s": _percentile(latencies, 0.95),
+            "latency_p99_s": _percentile(latencies, 0.99),
+            "peak_rss_mb": _peak_rss_mb(),
+            "baseline_rss_mb": rss_before,
+        })
+    except ImportError as e:
+        queue.put({"skipped": f"{type(e).__name__}: {e}"})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def _await_result(proc, queue, timeout=None, poll=1.0) -> dict:
+    """The stage's result, or an error once the child has died without one or ``timeout`` seconds have passed."""
+    started = time.monotonic()
+    while True:
+        try:
+            return queue.get(timeout=poll)
+        except Empty:
+            pass
+        if not proc.is_alive():
+            # The child may have put its result just before exiting
+            try:
+                return queue.get(timeout=poll)
+            except Empty:
+                return {"error": f"stage process exited with code {proc.exitcode} without a result"}
+        if timeout is not None and time.monotonic() - started > timeout:
+            proc.terminate()
+            return {"error": f"stage timed out after {timeout:.0f}s"}
+
+
+def run_benchmarks(args) -> dict:
+    docs = build_corpus(args.docs, args.dist, args.mean_chars, args.sigma, args.seed)
+    opts = {"num_proc": args.num_proc}
+    ctx = mp.get_context("spawn")
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "corpus": {
+            "docs": len(docs),
+            "dist": args.dist,
+            "mean_chars": sum(len(d) for d in docs) / max(len(docs), 1),
+            "seed": args.seed,
+        },
+        "stages": {},
+    }
+    for stage in args.stages:
+        stage_docs = docs[:args.model_docs] if stage in MODEL_STAGES else docs
+        print(f"Benchmarking {stage} on {len(stage_docs)} docs...")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_stage, args=(stage, stage_docs, args.config, opts, queue))
+        proc.start()
+        result = _await_result(proc, queue, args.stage_timeout)
+        proc.join()
+        results["stages"][stage] = result
+        if "docs_per_sec" in result:
+            print(f"   {result['docs_per_sec']:.2f} docs/s, p95 {result['latency_p95_s']:.4f}s, peak RSS {result['peak_rss_mb']} MB")
+        else:
+            print(f"   {result}")
+    return results
+
+
+# Metric -> True if higher is better
+COMPARED_METRICS = {
+    "docs_per_sec": True,
+    "tokens_per_sec": True,
+    "latency_p50_s": False,
+    "latency_p95_s": False,
+    "latency_p99_s": False,
+    "peak_rss_mb": False,
+}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10):
+    """Return a list of ``(stage, metric, baseline, current, change)`` regressions beyond ``threshold``."""
+    regressions = []
+    for stage, cur in current.get("stages", {}).items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            b, c = base.get(metric), cur.get(metric)
+            if not b or c is None:
+                continue
+            change = (c - b) / b
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append((stage, metric, b, c, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCA AI per-stage benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    bench = sub.add_parser("bench", help="Run the benchmarks and write JSON results")
+    bench.add_argument("--docs", type=int, default=200)
+    bench.add_argument("--model-docs", type=int, default=32, help="Docs fed to the model stages")
+    bench.add_argument("--dist", choices=LENGTH_DISTS, default="readme")
+    bench.add_argument("--mean-chars", type=int, default=README_MEAN_CHARS)
+    bench.add_argument("--sigma", type=float, default=1.0, help="Lognormal shape parameter")
+    bench.add_argument("--seed", type=int, default=42)
+    bench.add_argument("--num-proc", type=int, default=1, help="data.map_num_proc for load_dataset_any")
+    bench.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    bench.add_argument("--config", default=None, help="Config file for model settings (default: README values)")
+    bench.add_argument("--out", default="benchmarks/results.json")
+    bench.add_argument("--stage-timeout", type=float, default=None, help="Seconds before a stage is killed and recorded as failed")
+
+    cmp = sub.add_parser("compare", help="Flag regressions against a saved baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        results = run_benchmarks(args)
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Saved benchmark results: {args.out}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare_results(baseline, current, args.threshold)
+    if not regressions:
+        print(f"✓ No regressions beyond {args.threshold:.0%}")
+        return 0
+    print(f"✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+    for stage, metric, b, c, change in regressions:
+        print(f"   {stage}.{metric}: {b:.4g} -> {c:.4g} ({change:+.1%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import os
+import json
+import heapq
+from typing import List
+
+# Rough characters per subword token for English comment text
+CHARS_PER_TOKEN = 4.0
+
+# Seconds per document and per (model-visible) token on one CPU core; replaced by
+# least-squares fits once the ledger has enough measured chunks
+DEFAULT_COEFFS = {
+	"sentiment": {"per_doc": 0.002, "per_token": 4e-5},
+	"summarize": {"per_doc": 0.05, "per_token": 3.5e-3},
+	"keywords": {"per_doc": 0.01, "per_token": 1e-4},
+}
+
+
+class TimingLedger:
+	"""Append-only JSONL of measured chunk timings: stage, docs, model-visible tokens, seconds."""
+
+	def __init__(self, path: str, max_rows: int = 2000):
+		self.path = path
+		self.max_rows = max_rows
+
+	def record(self, stage: str, docs: int, tokens: int, seconds: float):
+		if not self.path or not docs:
+			return
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+		with open(self.path, "a") as f:
+			f.write(json.dumps({"stage": stage, "docs": docs, "tokens": tokens, "seconds": seconds}) + "\n")
+
+	def rows(self, stage: str) -> List[dict]:
+		if not self.path or not os.path.exists(self.path):
+			return []
+		with open(self.path) as f:
+			rows = [json.loads(line) for line in f if line.strip()]
+		return [r for r in rows if r["stage"] == stage][-self.max_rows:]
+
+
+def _fit(rows: List[dict], default: dict) -> dict:
+	"""Non-negative least squares for ``seconds = per_doc * docs + per_token * tokens``."""
+	if len(rows) < 3:
+		return dict(default)
+	import numpy as np
+
+	X = np.array([[r["docs"], r["tokens"]] for r in rows], dtype=float)
+	y = np.array([r["seconds"] for r in rows], dtype=float)
+	(per_doc, per_token), *_ = np.linalg.lstsq(X, y, rcond=None)
+	if per_doc < 0 or per_token < 0:
+		# Refit with the offending coefficient pinned at zero
+		if per_token < 0:
+			per_doc, per_token = max(y.sum() / max(X[:, 0].sum(), 1), 0.0), 0.0
+		else:
+			per_doc, per_token = 0.0, max(y.sum() / max(X[:, 1].sum(), 1), 0.0)
+	return {"per_doc": float(per_doc), "per_token": float(per_token)}
+
+
+class CostModel:
+	"""Predicted seconds per document from its token count and the enabled stages.
+
+	Each stage only sees as many tokens as its model reads: the sentiment model
+	``max_length`` (times ``max_windows`` when windowed), the summarizer
+	``max_input_length`` (times ``max_windows`` for long documents, nothing below
+	the adaptive passthrough threshold); keyword extraction reads everything.
+	"""
+
+	def __init__(self, app_cfg, ledger: TimingLedger = None, stages=("sentiment", "summarize", "keywords")):
+		self.stages = list(stages)
+		self.ledger = ledger
+		self.coeffs = {s: _fit(ledger.rows(s), DEFAULT_COEFFS[s]) if ledger else dict(DEFAULT_COEFFS[s]) for s in self.stages}
+		sent_cfg, sum_cfg = app_cfg.sentiment, app_cfg.summarization
+		windowed = getattr(sent_cfg, 'windowed', None)
+		long_doc = getattr(sum_cfg, 'long_document', None)
+		adaptive = getattr(sum_cfg, 'adaptive', None)
+		self.caps = {
+			"sentiment": sent_cfg.max_length * (getattr(windowed, 'max_windows', 8) if getattr(windowed, 'enabled', False) else 1),
+			"summarize": sum_cfg.max_input_length * (getattr(long_doc, 'max_windows', 16) if getattr(long_doc, 'enabled', False) else 1),
+			"keywords": None,
+		}
+		self.passthrough = 0
+		if getattr(adaptive, 'enabled', False):
+			self.passthrough = getattr(adaptive, 'passthrough_tokens', None) or sum_cfg.max_summary_length
+
+	def stage_tokens(self, stage: str, tokens: int) -> int:
+		"""Tokens of a ``tokens``-long document that ``stage`` actually processes."""
+		if stage == "summarize" and tokens <= self.passthrough:
+			return 0
+		cap = self.caps.get(stage)
+		return tokens if cap is None else min(tokens, cap)
+
+	def doc_cost(self, tokens: int) -> float:
+		cost = 0.0
+		for stage in self.stages:
+			seen = self.stage_tokens(stage, tokens)
+			if stage == "summarize" and not seen:
+				continue
+			c = self.coeffs[stage]
+			cost += c["per_doc"] + c["per_token"] * seen
+		return cost
+
+	def costs(self, tokens: List[int]) -> List[float]:
+		return [self.doc_cost(t) for t in tokens]
+
+	def record_chunk(self, stage: str, tokens: List[int], seconds: float):
+		"""Log one measured chunk so later runs calibrate on it."""
+		if self.ledger is not None:
+			self.ledger.record(stage, len(tokens), sum(self.stage_tokens(stage, t) for t in tokens), seconds)
+
+
+def estimate_tokens(texts: List[str]) -> List[int]:
+	return [int(len(t) / CHARS_PER_TOKEN) + 1 for t in texts]
+
+
+def split_tokens(split, column: str = "text") -> List[int]:
+	"""Approximate token count of every document in ``split`` from its character length, computed in Arrow."""
+	import pyarrow.compute as pc
+
+	lengths = pc.utf8_length(split.with_format("arrow")[column]).to_pylist()
+	return [int((n or 0) / CHARS_PER_TOKEN) + 1 for n in lengths]
+
+
+def longest_first(costs: List[float]) -> List[int]:
+	"""Row order by descending predicted cost (stable, so ties keep corpus order)."""
+	return sorted(range(len(costs)), key=lambda i: -costs[i])
+
+
+def plan_chunk_sizes(costs: List[float], budget: float, max_rows: int) -> List[int]:
+	"""Split already-sorted ``costs`` into consecutive chunks of about ``budget`` seconds and at most ``max_rows``."""
+	sizes, rows, acc = [], 0, 0.0
+	for cost in costs:
+		if rows and (acc + cost > budget or rows >= max_rows):
+			sizes.append(rows)
+			rows, acc = 0, 0.0
+		rows += 1
+		acc += cost
+	if rows:
+		sizes.append(rows)
+	return sizes
+
+
+def balanced_assignment(costs: List[float], bins: int) -> List[int]:
+	"""Longest-processing-time-first: each document, costliest first, goes to the least loaded bin."""
+	heap = [(0.0, b) for b in range(bins)]
+	assignment = [0] * len(costs)
+	for i in longest_first(costs):
+		load, b = heapq.heappop(heap)
+		assignment[i] = b
+		heapq.heappush(heap, (load + costs[i], b))
+	return assignment
+
+
+def build_cost_model(app_cfg):
+	"""``CostModel`` from ``balance.*`` config, or None when ``balance.enabled`` is off."""
+	b_cfg = getattr(app_cfg, 'balance', None)
+	if not getattr(b_cfg, 'enabled', False):
+		return None
+	ledger_path = getattr(b_cfg, 'ledger', None) or os.path.join(app_cfg.paths.experiments_dir, "cost_ledger.jsonl")
+	return CostModel(app_cfg, TimingLedger(ledger_path))
@@ -1,10 +1,14 @@
 import os
+import glob
+import json
 import shutil
+import tarfile
 import pandas as pd
-from datasets import load_dataset, DatasetDict, Dataset
+from datasets import load_dataset, DatasetDict, Dataset, Features, Value
 from datasets.exceptions import NonMatchingSplitsSizesError
 
-from mca_ai.preprocess import clean_text
+from mca_ai import tracing
+from mca_ai.preprocess import batch_clean_text, estimate_char_budget, truncate_chars
 
 
 def clear_dataset_cache(dataset_name: str):
@@ -71,6 +75,53 @@ def load_dataset_with_fallback(app_cfg) -> DatasetDict:
 	raise RuntimeError(f"All strategies failed to load dataset: {dataset_name}")
 
 
+def _open_tar_member(tar: tarfile.TarFile, member_name: str, index_path: str = None):
+	"""Return a file object for ``member_name``, seeking via the archive index when available."""
+	if index_path and os.path.exists(index_path):
+		with open(index_path) as f:
+			index = json.load(f)
+		entry = index.get(os.path.basename(tar.name or ""), {"members": []})
+		for m in entry["members"]:
+			if m["name"] == member_name:
+				info = tarfile.TarInfo(member_name)
+				info.size = m["size"]
+				info.offset = m["offset"]
+				info.offset_data = m["offset_data"]
+				info.type = tarfile.REGTYPE
+				return tar.extractfile(info)
+	return tar.extractfile(tar.getmember(member_name))
+
+
+def iter_tar_member_chunks(archive_path: str, member_name: str, chunk_size: int = 10000, index_path: str = None, dtype=None):
+	"""Stream a CSV or JSONL archive member as pandas DataFrame chunks without extracting it."""
+	with tarfile.open(archive_path, "r:*") as tar:
+		f = _open_tar_member(tar, member_name, index_path)
+		if member_name.endswith(".csv"):
+			reader = pd.read_csv(f, chunksize=chunk_size, dtype=dtype)
+		elif member_name.endswith((".jsonl", ".json")):
+			# read_json only takes a per-column mapping; dtype=False at least skips its type inference
+			reader = pd.read_json(f, lines=True, chunksize=chunk_size, dtype=False if dtype is not None else None)
+		else:
+			raise ValueError(f"Unsupported archive member type: {member_name}")
+		for chunk in reader:
+			yield chunk
+
+
+def _tar_member_examples(archive_path: str, member_name: str, chunk_size: int, index_path: str):
+	# Every column is read as text so chunks agree on one schema; missing cells become None, not NaN
+	for chunk in iter_tar_member_chunks(archive_path, member_name, chunk_size, index_path, dtype=str):
+		present = chunk.notna()
+		chunk = chunk.astype(str).astype(object).where(present, None)
+		for record in chunk.to_dict(orient="records"):
+			yield record
+
+
+def _tar_member_features(archive_path: str, member_name: str, index_path: str = None) -> Features:
+	"""All-string features from the member's first row, so a column that is empty early on is not typed as null."""
+	head = next(iter_tar_member_chunks(archive_path, member_name, 1, index_path, dtype=str))
+	return Features({c: Value("string") for c in head.columns})
+
+
 def create_synthetic_dataset(num_examples: int = 1000) -> DatasetDict:
 	"""Create a synthetic dataset for testing when real data is not available."""
 	import random
@@ -149,11 +200,17 @@ def create_synthetic_dataset(num_examples: int = 1000) -> DatasetDict:
 	})
 
 
-def load_dataset_any(app_cfg) -> DatasetDict:
+def load_dataset_any(app_cfg, clean: bool = True) -> DatasetDict:
 	"""Load dataset based on config source in app_cfg.
 
-	Returns a DatasetDict with 'train' and 'test' splits. Adds a cleaned 'text' field.
+	Returns a DatasetDict with 'train' and 'test' splits. Adds a cleaned 'text' field
+	unless ``clean`` is False, in which case ``clean_dataset`` can be applied later.
 	"""
+	with tracing.span("load_dataset_any", source=app_cfg.data.source):
+		return _load_dataset_any(app_cfg, clean)
+
+
+def _load_dataset_any(app_cfg, clean: bool = True) -> DatasetDict:
 	source = app_cfg.data.source
 	ds = None
 	
@@ -174,8 +231,12 @@ def load_dataset_any(app_cfg) -> DatasetDict:
 			ds = create_synthetic_dataset(1000)
 	elif source == "local_parquet":
 		parquet_path = f"{app_cfg.paths.data_dir}/train.parquet"
+		parquet_parts = sorted(glob.glob(f"{app_cfg.paths.data_dir}/train-*.parquet"))
 		if os.path.exists(parquet_path):
 			ds = load_dataset("parquet", data_files={"train": parquet_path})
+		elif parquet_parts:
+			# Chunked export, e.g. from scripts/convert_fcc_to_csv.py --format parquet
+			ds = load_dataset("parquet", data_files={"train": parquet_parts})
 		else:
 			print(f"Local Parquet file not found: {parquet_path}")
 			print("Falling back to synthetic dataset...")
@@ -188,6 +249,22 @@ def load_dataset_any(app_cfg) -> DatasetDict:
 			print(f"Local CSV file not found: {csv_path}")
 			print("Falling back to synthetic dataset...")
 			ds = create_synthetic_dataset(1000)
+	elif source == "tar_member":
+		archive_path = app_cfg.data.archive_path
+		member_name = app_cfg.data.archive_member
+		if os.path.exists(archive_path):
+			# Rows are streamed from the archive into the Arrow cache chunk by chunk
+			index_path = getattr(app_cfg.data, 'archive_index', None)
+			ds = DatasetDict({"train": Dataset.from_generator(_tar_member_examples, features=_tar_member_features(archive_path, member_name, index_path), gen_kwargs={
+				"archive_path": archive_path,
+				"member_name": member_name,
+				"chunk_size": getattr(app_cfg.data, 'chunk_size', 10000),
+				"index_path": index_path,
+			})})
+		else:
+			print(f"Archive not found: {archive_path}")
+			print("Falling back to synthetic dataset...")
+			ds = create_synthetic_dataset(1000)
 	elif source == "synthetic":
 		print("Using synthetic dataset for testing...")
 		ds = create_synthetic_dataset(1000)
@@ -197,6 +274,8 @@ def load_dataset_any(app_cfg) -> DatasetDict:
 	if ds is None:
 		raise RuntimeError("Failed to load dataset")
 
+	ds = add_positional_ids(ds)
+
 	# Ensure splits
 	if isinstance(ds, DatasetDict):
 		if "train" in ds and "test" not in ds:
@@ -212,14 +291,146 @@ def load_dataset_any(app_cfg) -> DatasetDict:
 				print(f"Limiting {split_name} split to {app_cfg.data.fast_limit} examples")
 				ds[split_name] = ds[split_name].select(range(app_cfg.data.fast_limit))
 
+	if clean:
+		ds = clean_dataset(ds, app_cfg)
+
+	return ds
+
+
+def add_positional_ids(ds):
+	"""Give splits without an ``id`` column their row positions as ids.
+
+	Done once, straight after loading and before the train/test split, sharding
+	or length ordering, so every later subset still carries its source row.
+	"""
+	for name in list(ds.keys()):
+		if "id" not in ds[name].column_names:
+			ds[name] = ds[name].add_column("id", list(range(len(ds[name]))))
+	return ds
+
+
+def clean_dataset(ds: DatasetDict, app_cfg) -> DatasetDict:
+	"""Write the cleaned ``data.text_field`` of every split into 'text'."""
 	# Clean and standardize text field
 	orig_field = app_cfg.data.text_field
-	def _map_clean(example):
-		text = example.get(orig_field, "")
-		return {"text": clean_text(text)}
+	def _map_clean(batch):
+		n = len(next(iter(batch.values())))
+		texts = batch[orig_field] if orig_field in batch else [""] * n
+		# Spans from map workers stay in those processes; use map_num_proc: 1 to trace batches
+		with tracing.span("clean_text.batch", docs=n) as sp:
+			sp.add_bytes(sum(len(t) for t in texts if isinstance(t, str)))
+			return {"text": batch_clean_text(texts)}
 
 	# Apply text cleaning with parallel processing
 	map_num_proc = getattr(app_cfg.data, 'map_num_proc', 4)
-	ds = ds.map(_map_clean, num_proc=map_num_proc)
-	
+	with tracing.span("clean_text", num_proc=map_num_proc):
+		ds = ds.map(_map_clean, batched=True, num_proc=map_num_proc)
+	if getattr(getattr(app_cfg, 'pretruncate', None), 'enabled', False):
+		ds = pretruncate_dataset(ds, app_cfg)
+	if getattr(getattr(app_cfg, 'pretokenize', None), 'enabled', False):
+		ds = pretokenize_dataset(ds, app_cfg)
 	return ds
+
+
+def pretruncation_targets(app_cfg):
+	"""``(column, tokenizer name, token budget)`` for each model that truncates its input.
+
+	Windowed sentiment and long-document summarization read the full text, so
+	those models get no pre-truncated column.
+	"""
+	targets = []
+	sent_cfg = app_cfg.sentiment
+	if not getattr(getattr(sent_cfg, 'windowed', None), 'enabled', False):
+		targets.append(("sentiment_text", sent_cfg.model_name, sent_cfg.max_length))
+	sum_cfg = app_cfg.summarization
+	if not getattr(getattr(sum_cfg, 'long_document', None), 'enabled', False):
+		targets.append(("summary_text", sum_cfg.model_name, sum_cfg.max_input_length))
+	return targets
+
+
+def pretruncate_dataset(ds: DatasetDict, app_cfg) -> DatasetDict:
+	"""Add per-model text columns cut to a character budget that still fills each model's ``max_length``.
+
+	Budgets are estimated on a sample of the first split and verified by
+	re-tokenizing the cut sample (see ``estimate_char_budget``), so the fast
+	tokenizers no longer scan the full cleaned text only to throw most of it away.
+	"""
+	from transformers import AutoTokenizer
+
+	pt_cfg = app_cfg.pretruncate
+	strategy = getattr(pt_cfg, 'strategy', 'head')
+	head_ratio = getattr(pt_cfg, 'head_ratio', 0.5)
+	sample_size = getattr(pt_cfg, 'sample_size', 500)
+	split = ds["train"] if "train" in ds and len(ds["train"]) else next(iter(ds.values()))
+	sample = split.shuffle(seed=getattr(app_cfg, 'seed', 42)).select(range(min(sample_size, len(split))))["text"]
+
+	budgets = {}
+	for column, model_name, max_length in pretruncation_targets(app_cfg):
+		tokenizer = AutoTokenizer.from_pretrained(model_name)
+		max_tokens = max_length - tokenizer.num_special_tokens_to_add(pair=False)
+		with tracing.span("pretruncate.estimate", column=column):
+			budget, fill = estimate_char_budget(tokenizer, sample, max_tokens, strategy, head_ratio, safety=getattr(pt_cfg, 'safety', 1.1))
+		if budget is None:
+			print(f"Pre-truncation: no sampled text exceeds {max_tokens} {model_name} tokens, {column} keeps full text")
+		else:
+			print(f"Pre-truncation: {column} cut to {budget} chars ({strategy}); {fill:.1%} of long sampled texts still fill {max_tokens} tokens")
+		budgets[column] = budget
+
+	def _map_truncate(batch):
+		return {column: batch["text"] if budget is None else [truncate_chars(t, budget, strategy, head_ratio) for t in batch["text"]] for column, budget in budgets.items()}
+
+	map_num_proc = getattr(app_cfg.data, 'map_num_proc', 4)
+	with tracing.span("pretruncate", num_proc=map_num_proc):
+		return ds.map(_map_truncate, batched=True, num_proc=map_num_proc)
+
+
+def pretokenize_dataset(ds: DatasetDict, app_cfg) -> DatasetDict:
+	"""Store each truncating model's ``input_ids`` and lengths as Arrow columns.
+
+	Columns are named by ``token_columns(model_name, max_length)``, so a run with
+	another model or length tokenizes afresh instead of reusing stale ids. Input
+	is the model's pre-truncated column when there is one, else 'text'.
+	"""
+	from transformers import AutoTokenizer
+	from mca_ai.models.tokenized import SUMMARIZE_PREFIX, token_columns
+
+	map_num_proc = getattr(app_cfg.pretokenize, 'num_proc', getattr(app_cfg.data, 'map_num_proc', 4))
+	for column, model_name, max_length in pretruncation_targets(app_cfg):
+		ids_col, len_col = token_columns(model_name, max_length)
+		split_columns = next(iter(ds.values())).column_names
+		if ids_col in split_columns:
+			continue
+		source = column if column in split_columns else "text"
+		prefix = SUMMARIZE_PREFIX if column == "summary_text" else ""
+		tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+		def _map_tokenize(batch, tokenizer=tokenizer, source=source, prefix=prefix, max_length=max_length, ids_col=ids_col, len_col=len_col):
+			ids = tokenizer([prefix + t for t in batch[source]], truncation=True, max_length=max_length)["input_ids"]
+			return {ids_col: ids, len_col: [len(x) for x in ids]}
+
+		with tracing.span("pretokenize", model=model_name, num_proc=map_num_proc):
+			ds = ds.map(_map_tokenize, batched=True, num_proc=map_num_proc)
+	return ds
+
+
+def iter_record_batches(split: Dataset, batch_size, columns=None):
+	"""Yield ``(start, pyarrow.Table)`` slices of ``split`` straight from its Arrow data.
+
+	Nothing is converted to Python objects here; callers ``to_pylist()`` one
+	column of one batch at a time. ``batch_size`` may be a callable so the
+	memory guard can resize batches between iterations.
+	"""
+	view = split.select_columns([c for c in columns if c in split.column_names]) if columns else split
+	view = view.with_format("arrow")
+	start = 0
+	while start < len(view):
+		n = batch_size() if callable(batch_size) else batch_size
+		batch = view[start:start + n]
+		yield start, batch
+		start += batch.num_rows
+
+
+def batch_column(batch, column: str, default: str = "text"):
+	"""``column`` of an Arrow batch as a Python list, falling back to ``default`` when absent."""
+	name = column if column in batch.column_names else default
+	return batch.column(name).to_pylist()
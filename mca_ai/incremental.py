@@ -0,0 +1,475 @@
+import io
+import os
+import csv
+import glob
+import json
+import time
+import sqlite3
+import argparse
+from collections import Counter
+
+import pandas as pd
+
+from mca_ai import tracing
+from mca_ai.config import load_config
+from mca_ai.rollup import FacetRollup, batch_facets, build_rollup
+
+
+INPUT_PATTERNS = ("*.csv", "*.jsonl", "*.parquet")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+	path TEXT PRIMARY KEY,
+	byte_offset INTEGER NOT NULL DEFAULT 0,
+	rows INTEGER NOT NULL DEFAULT 0,
+	header TEXT,
+	updated REAL
+);
+CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS outputs (name TEXT PRIMARY KEY, size INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, count INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS terms_count ON terms (count);
+CREATE TABLE IF NOT EXISTS rollup (
+	dim TEXT NOT NULL,
+	value TEXT NOT NULL,
+	field TEXT NOT NULL,
+	key TEXT NOT NULL,
+	count INTEGER NOT NULL,
+	PRIMARY KEY (dim, value, field, key)
+);
+"""
+
+# Counts are added to, never rewritten, so a commit costs as much as its batch
+_ADD_TERMS = "INSERT INTO terms (term, count) VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET count = count + excluded.count"
+_ADD_ROLLUP = (
+	"INSERT INTO rollup (dim, value, field, key, count) VALUES (?, ?, ?, ?, ?) "
+	"ON CONFLICT (dim, value, field, key) DO UPDATE SET count = count + excluded.count"
+)
+
+
+class Watermark:
+	"""What has been ingested: per input file the byte offset (CSV/JSONL) or row
+	count (Parquet) already read, plus every processed document id so
+	re-delivered comments are skipped.
+
+	The committed size of each prediction file and the running aggregates are
+	stored in the same transaction, so outputs past the last commit can be
+	discarded after a crash instead of being appended twice. Term and rollup
+	counts are kept one row per term / cell total and added to by each batch.
+	"""
+
+	def __init__(self, path: str):
+		self.path = path
+		os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+		self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.executescript(SCHEMA)
+
+	def close(self):
+		self.conn.close()
+
+	def file_state(self, path: str):
+		row = self.conn.execute("SELECT byte_offset, rows, header FROM files WHERE path = ?", (path,)).fetchone()
+		return row if row else (0, 0, None)
+
+	def unseen(self, ids):
+		"""Positions of ``ids`` not processed before (and not repeated earlier in ``ids``)."""
+		keep, batch = [], set()
+		for i, doc_id in enumerate(ids):
+			if doc_id in batch:
+				continue
+			batch.add(doc_id)
+			if self.conn.execute("SELECT 1 FROM seen WHERE id = ?", (doc_id,)).fetchone() is None:
+				keep.append(i)
+		return keep
+
+	def outputs(self) -> dict:
+		"""Committed ``{file name: size in bytes}`` of the prediction files."""
+		return dict(self.conn.execute("SELECT name, size FROM outputs").fetchall())
+
+	def state(self, key: str):
+		row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+		return json.loads(row[0]) if row else None
+
+	def top_terms(self, n: int = None):
+		return self.conn.execute("SELECT term, count FROM terms ORDER BY count DESC LIMIT ?", (-1 if n is None else n,)).fetchall()
+
+	def rollup_rows(self):
+		return self.conn.execute("SELECT dim, value, field, key, count FROM rollup")
+
+	def advance(self, path: str, byte_offset: int, rows: int, header: str, ids, outputs=None, state=None, terms=None, rollup_rows=None):
+		"""Record a file read up to ``byte_offset``/``rows``, its ``ids`` processed, the
+		prediction file sizes and the aggregates they produced, atomically.
+
+		``terms`` (``(term, count)`` pairs) and ``rollup_rows`` are the batch's own
+		counts, added to the stored ones.
+		"""
+		self.conn.execute("BEGIN IMMEDIATE")
+		try:
+			self.conn.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", [(i,) for i in ids])
+			self.conn.execute(
+				"INSERT OR REPLACE INTO files (path, byte_offset, rows, header, updated) VALUES (?, ?, ?, ?, ?)",
+				(path, byte_offset, rows, header, time.time()),
+			)
+			self.conn.executemany("INSERT OR REPLACE INTO outputs (name, size) VALUES (?, ?)", (outputs or {}).items())
+			self.conn.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", [(k, json.dumps(v)) for k, v in (state or {}).items()])
+			self.conn.executemany(_ADD_TERMS, terms or ())
+			self.conn.executemany(_ADD_ROLLUP, rollup_rows or ())
+			self.conn.execute("COMMIT")
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+
+	def docs(self) -> int:
+		return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+
+def _record_ends(data: bytes, csv_records: bool, eof: bool):
+	"""Offsets in ``data`` just past each complete record.
+
+	CSV records are delimited with the csv module, so a quoted field spanning
+	lines stays whole; JSONL records are lines. Trailing bytes without a newline
+	only count as a record at ``eof``, i.e. once the file has stopped growing.
+	"""
+	lines = io.BytesIO(data).readlines()
+	if not eof and lines and not lines[-1].endswith(b"\n"):
+		lines.pop()
+	ends, pos = [], [0]
+	if not csv_records:
+		for line in lines:
+			pos[0] += len(line)
+			ends.append(pos[0])
+		return ends
+
+	def _decoded():
+		# The reader pulls a line only when its current record needs it
+		for line in lines:
+			pos[0] += len(line)
+			yield line.decode("utf-8")
+
+	try:
+		for _ in csv.reader(_decoded(), strict=True):
+			ends.append(pos[0])
+	except csv.Error:
+		# A quoted field still open where the data stops
+		if eof:
+			ends.append(len(data))
+	return ends
+
+
+def _read_tail(path: str, byte_offset: int, csv_records: bool, settle_seconds: float):
+	"""Bytes of ``path`` past ``byte_offset`` up to the last complete record, and the new offset.
+
+	A drop still being written is picked up on a later pass; once the file has
+	not been modified for ``settle_seconds`` its end also closes the last record.
+	"""
+	st = os.stat(path)
+	with open(path, "rb") as f:
+		f.seek(byte_offset)
+		data = f.read(max(st.st_size - byte_offset, 0))
+	ends = _record_ends(data, csv_records, eof=time.time() - st.st_mtime >= settle_seconds)
+	end = ends[-1] if ends else 0
+	return data[:end], byte_offset + end
+
+
+def read_new_rows(path: str, byte_offset: int, rows: int, header: str = None, settle_seconds: float = 30.0):
+	"""Rows of ``path`` past the watermark: ``(DataFrame, byte_offset, rows, header)``.
+
+	CSV and JSONL are read from the stored byte offset, so appending to a file
+	costs only the appended bytes; Parquet files are skipped row group by row
+	group up to the stored row count.
+	"""
+	if path.endswith(".parquet"):
+		import pyarrow.parquet as pq
+
+		pf = pq.ParquetFile(path)
+		tables, seen = [], 0
+		for i in range(pf.num_row_groups):
+			n = pf.metadata.row_group(i).num_rows
+			if seen + n > rows:
+				tables.append(pf.read_row_group(i).slice(max(rows - seen, 0)))
+			seen += n
+		df = pd.concat([t.to_pandas() for t in tables], ignore_index=True) if tables else pd.DataFrame()
+		return df, byte_offset, seen, header
+
+	csv_records = not path.endswith(".jsonl")
+	data, new_offset = _read_tail(path, byte_offset, csv_records, settle_seconds)
+	if not csv_records:
+		df = pd.read_json(io.BytesIO(data), lines=True, dtype=False) if data.strip() else pd.DataFrame()
+		return df, new_offset, rows + len(df), header
+
+	if header is None:
+		# First read of this CSV: its first record names the columns for every later tail
+		ends = _record_ends(data, True, eof=True)
+		if not ends:
+			return pd.DataFrame(), byte_offset, rows, header
+		header, data = data[:ends[0]].decode("utf-8").rstrip("\r\n"), data[ends[0]:]
+	if not data.strip():
+		return pd.DataFrame(), new_offset, rows, header
+	df = pd.read_csv(io.BytesIO(header.encode("utf-8") + b"\n" + data), dtype=str, keep_default_na=False)
+	return df, new_offset, rows + len(df), header
+
+
+def _doc_ids(df: pd.DataFrame, path: str, first_row: int):
+	# Comments without an ``id`` are keyed by file name and row, which stays stable while a file only grows
+	if "id" in df.columns:
+		return [str(i) for i in df["id"]]
+	name = os.path.basename(path)
+	return [f"{name}:{first_row + i}" for i in range(len(df))]
+
+
+def input_files(input_dir: str):
+	return sorted(p for pattern in INPUT_PATTERNS for p in glob.glob(os.path.join(input_dir, pattern)))
+
+
+class IncrementalRunner:
+	"""Processes comments dropped into ``input_dir`` that the watermark has not seen,
+	appending predictions and folding them into the running aggregates.
+	"""
+
+	def __init__(self, config_path: str, input_dir: str, out_dir: str = None):
+		self.config_path = config_path
+		self.cfg = load_config(config_path)
+		self.input_dir = input_dir
+		self.settle_seconds = getattr(getattr(self.cfg, 'incremental', None), 'settle_seconds', 30)
+		self.out_dir = out_dir or os.path.join(self.cfg.paths.experiments_dir, "incremental")
+		os.makedirs(self.out_dir, exist_ok=True)
+		self.watermark = Watermark(os.path.join(self.out_dir, "watermark.sqlite"))
+		self.max_terms = getattr(getattr(self.cfg, 'incremental', None), 'max_terms', 5000)
+		# Only the batch being processed; the committed rollup lives in the watermark database
+		self.rollup = build_rollup(self.cfg)
+		self.pool = None
+		self.loaded = False
+
+	def _load_models(self):
+		# Only when there is something new, so an idle pass costs no model load
+		from mca_ai.data_loader import load_dataset_any
+		from mca_ai.models.cascade import build_sentiment_model
+		from mca_ai.models.decoding import build_summarizer
+		from mca_ai.workers import _cascade_fit_split, build_replica_pool, init_replica
+
+		cascade_cfg = getattr(self.cfg.sentiment, 'cascade', None)
+		train = None
+		if getattr(cascade_cfg, 'enabled', False) and getattr(cascade_cfg, 'tier', 'lexicon') == "linear":
+			# The linear tier is distilled from the docket's training texts
+			train = _cascade_fit_split(self.cfg, load_dataset_any(self.cfg)["train"])
+		self.pool = build_replica_pool(self.cfg, self.config_path, train)
+		if self.pool is not None:
+			self.pool.start()
+		else:
+			init_replica(self.cfg, build_sentiment_model(self.cfg, train), build_summarizer(self.cfg))
+		self.loaded = True
+
+	def _results(self, tasks):
+		from mca_ai.workers import run_chunk
+
+		if self.pool is not None:
+			return self.pool.imap(tasks)
+		return ((key, run_chunk(inputs)) for key, inputs in tasks)
+
+	def _discard_uncommitted(self):
+		"""Cut prediction files back to their last committed size (a pass that died after writing)."""
+		committed = self.watermark.outputs()
+		csv_path = os.path.join(self.out_dir, "predictions.csv")
+		if os.path.exists(csv_path) and os.path.getsize(csv_path) > committed.get("predictions.csv", 0):
+			print(f"⚠️ Discarding uncommitted rows of {csv_path}")
+			with open(csv_path, "r+b") as f:
+				f.truncate(committed.get("predictions.csv", 0))
+		for part in glob.glob(os.path.join(self.out_dir, "predictions-*.parquet")):
+			if os.path.basename(part) not in committed:
+				print(f"⚠️ Discarding uncommitted {part}")
+				os.remove(part)
+
+	def _process(self, df: pd.DataFrame, ids):
+		"""Model outputs for new rows, written to the prediction files; returns
+		``(sentiments, texts, outputs)`` with ``outputs`` the new prediction file sizes.
+
+		The search index upserts by id, so rows re-processed after a crash replace their earlier entries.
+		"""
+		from datasets import Dataset, DatasetDict
+		from mca_ai.data_loader import clean_dataset, iter_record_batches
+		from mca_ai.models.tokenized import token_columns
+		from mca_ai.output import open_prediction_writers
+		from mca_ai.search import open_search_index
+		from mca_ai.workers import chunk_inputs
+
+		cfg = self.cfg
+		df = df.copy()
+		df["id"] = ids
+		for column in df.columns:
+			# JSONL drops can mix types within a column, which Arrow rejects
+			if df[column].dtype == object:
+				df[column] = [None if pd.isna(v) else str(v) for v in df[column]]
+		split = clean_dataset(DatasetDict({"test": Dataset.from_pandas(df, preserve_index=False)}), cfg)["test"]
+		sentiment_ids_col = token_columns(cfg.sentiment.model_name, cfg.sentiment.max_length)[0]
+		summary_ids_col = token_columns(cfg.summarization.model_name, cfg.summarization.max_input_length)[0]
+		sentiment_ids_col = sentiment_ids_col if sentiment_ids_col in split.column_names else None
+		summary_ids_col = summary_ids_col if summary_ids_col in split.column_names else None
+		extra = getattr(getattr(cfg, 'output', None), 'extra_columns', None) or []
+		columns = ["id", "text", "sentiment_text", "summary_text", sentiment_ids_col, summary_ids_col, *extra]
+		if self.rollup is not None:
+			columns += [c for c in self.rollup.columns() if c not in columns]
+		chunk_size = getattr(getattr(cfg, 'memory', None), 'chunk_size', 100)
+
+		if not self.loaded:
+			self._load_models()
+		writers = open_prediction_writers(cfg, self.out_dir, append=True)
+		search_index = open_search_index(cfg, self.out_dir)
+		sentiments, texts = [], []
+		tasks = (((start, batch), chunk_inputs(batch, start, sentiment_ids_col, summary_ids_col)) for start, batch in iter_record_batches(split, chunk_size, [c for c in columns if c]))
+		for (start, batch), out in self._results(tasks):
+			records = {
+				"id": batch.column("id"),
+				"text": batch.column("text"),
+				"sentiment": out["sentiment"],
+				"summary": out["summary"],
+				"keywords": out["keywords"],
+				"confidence": out["confidence"],
+				**{c: batch.column(c) for c in extra if c in batch.column_names},
+			}
+			for writer in writers:
+				writer.write(records)
+			if search_index is not None:
+				search_index.add(records, extra)
+			chunk = batch.column("text").to_pylist()
+			if self.rollup is not None:
+				self.rollup.update(batch_facets(batch, self.rollup.columns()), chunk, out["sentiment"], out["keywords"])
+			sentiments.extend(out["sentiment"])
+			texts.extend(chunk)
+		outputs = {}
+		for writer in writers:
+			writer.close()
+			if os.path.exists(writer.path):
+				outputs[os.path.basename(writer.path)] = os.path.getsize(writer.path)
+		if search_index is not None:
+			search_index.close()
+		return sentiments, texts, outputs
+
+	def _update_aggregates(self, sentiments, texts):
+		"""A batch's contribution for ``Watermark.advance``: ``(state, terms, rollup rows)``.
+
+		Only the small sentiment summary is read back and rewritten; term and
+		rollup counts are the batch's own and are added to the stored rows.
+		"""
+		from mca_ai.viz.wordfreq import count_terms
+
+		agg = self.watermark.state("aggregates") or {"docs": 0, "sentiment_counts": {}, "runs": 0}
+		counts = Counter(agg["sentiment_counts"])
+		counts.update(sentiments)
+		agg.update(docs=agg["docs"] + len(sentiments), sentiment_counts=dict(counts), runs=agg["runs"] + 1, updated=time.time())
+		if self.rollup is None:
+			return {"aggregates": agg}, count_terms(texts).items(), None
+		# The batch rollup's ("all", "all") cell already holds its term counts
+		return {"aggregates": agg}, self.rollup.corpus_terms().counts.items(), list(self.rollup.rows())
+
+	def _export(self):
+		"""Write the committed aggregates out as ``aggregates.json``, ``word_frequencies.json``
+		(the ``incremental.max_terms`` most frequent terms) and ``rollup.json``; once per pass."""
+		from mca_ai.viz.wordfreq import TermCounter
+
+		def _write(name, data, **kwargs):
+			path = os.path.join(self.out_dir, name)
+			with open(f"{path}.tmp", "w") as f:
+				json.dump(data, f, **kwargs)
+			os.replace(f"{path}.tmp", path)
+
+		agg = self.watermark.state("aggregates")
+		_write("aggregates.json", agg, indent=2)
+		TermCounter(Counter(dict(self.watermark.top_terms(self.max_terms))), agg["docs"]).save(os.path.join(self.out_dir, "word_frequencies.json"))
+		if self.rollup is not None:
+			committed = build_rollup(self.cfg).add_rows(self.watermark.rollup_rows())
+			committed.save(os.path.join(self.out_dir, "rollup.json"))
+
+	def run_once(self) -> int:
+		"""One pass over the input directory; returns how many new comments were processed."""
+		new_docs = 0
+		self._discard_uncommitted()
+		for path in input_files(self.input_dir):
+			byte_offset, rows, header = self.watermark.file_state(path)
+			if path.endswith(".parquet") or os.path.getsize(path) > byte_offset:
+				with tracing.span("incremental.read", file=os.path.basename(path)):
+					df, new_offset, new_rows, header = read_new_rows(path, byte_offset, rows, header, self.settle_seconds)
+			else:
+				continue
+			if new_rows == rows and new_offset == byte_offset:
+				continue
+			ids = _doc_ids(df, path, rows)
+			keep = self.watermark.unseen(ids)
+			outputs, state, terms, rollup_rows = None, None, None, None
+			if keep:
+				print(f"{os.path.basename(path)}: {len(keep)} new comments ({len(ids) - len(keep)} already seen)")
+				self.rollup = build_rollup(self.cfg)
+				with tracing.span("incremental.process", docs=len(keep)):
+					sentiments, texts, outputs = self._process(df.iloc[keep], [ids[i] for i in keep])
+				state, terms, rollup_rows = self._update_aggregates(sentiments, texts)
+				new_docs += len(keep)
+			# Progress, prediction file sizes and aggregates commit together: a crash before
+			# this re-reads the tail and the next pass discards the half-written predictions
+			self.watermark.advance(path, new_offset, new_rows, header, [ids[i] for i in keep], outputs, state, terms, rollup_rows)
+		if new_docs:
+			self._export()
+			print(f"✓ Processed {new_docs} new comments ({self.watermark.docs()} total) into {self.out_dir}")
+		return new_docs
+
+	def watch(self, interval: float = 60.0):
+		"""Poll the input directory every ``interval`` seconds, keeping the models loaded between drops."""
+		print(f"Watching {self.input_dir} every {interval:.0f}s (Ctrl+C to stop)")
+		try:
+			while True:
+				if self.run_once():
+					self.render_wordcloud()
+				time.sleep(interval)
+		except KeyboardInterrupt:
+			pass
+
+	def render_wordcloud(self):
+		from mca_ai.viz.wordfreq import TermCounter, build_wordcloud_from_frequencies
+
+		freq_path = os.path.join(self.out_dir, "word_frequencies.json")
+		if not os.path.exists(freq_path):
+			return
+		wc_cfg = self.cfg.viz.wordcloud
+		try:
+			wc = build_wordcloud_from_frequencies(TermCounter.load(freq_path), width=wc_cfg.width, height=wc_cfg.height, background_color=wc_cfg.background_color)
+			wc.to_file(os.path.join(self.out_dir, "wordcloud.png"))
+		except Exception as e:
+			print(f"Error generating word cloud: {e}")
+		rollup_path = os.path.join(self.out_dir, "rollup.json")
+		if self.rollup is not None and getattr(self.cfg.rollup, 'wordclouds', True) and os.path.exists(rollup_path):
+			FacetRollup.load(rollup_path).render_wordclouds(os.path.join(self.out_dir, "wordclouds"), wc_cfg.width, wc_cfg.height, wc_cfg.background_color, getattr(self.cfg.rollup, 'min_docs', 20))
+
+	def close(self):
+		if self.pool is not None:
+			self.pool.close()
+		self.watermark.close()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Process only comments not seen before from an input directory")
+	parser.add_argument("--config", default="configs/default.yaml")
+	parser.add_argument("--input-dir", default=None, help="Directory of CSV/JSONL/Parquet drops (default: incremental.input_dir)")
+	parser.add_argument("--out", default=None, help="Output directory (default: incremental.output_dir or <experiments_dir>/incremental)")
+	parser.add_argument("--watch", action="store_true", help="Keep polling instead of a single pass")
+	parser.add_argument("--interval", type=float, default=None, help="Seconds between polls (default: incremental.poll_seconds)")
+	args = parser.parse_args()
+
+	cfg = load_config(args.config)
+	inc_cfg = getattr(cfg, 'incremental', None)
+	input_dir = args.input_dir or getattr(inc_cfg, 'input_dir', None) or os.path.join(cfg.paths.data_dir, "incoming")
+	tracing.configure(cfg)
+	runner = IncrementalRunner(args.config, input_dir, args.out or getattr(inc_cfg, 'output_dir', None))
+	try:
+		if args.watch:
+			runner.watch(args.interval or getattr(inc_cfg, 'poll_seconds', 60))
+		elif runner.run_once():
+			runner.render_wordcloud()
+		else:
+			print("No new comments")
+	finally:
+		runner.close()
+		tracing.finish(runner.out_dir)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,173 @@
+import gc
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+
+def current_rss_mb() -> float:
+	"""Resident set size of this process in MB."""
+	try:
+		with open("/proc/self/statm") as f:
+			return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+	except (OSError, ValueError, AttributeError):
+		pass
+	try:
+		import psutil
+		return psutil.Process().memory_info().rss / 1e6
+	except ImportError:
+		pass
+	try:
+		import resource
+	except ImportError:
+		return 0.0
+	# Without /proc or psutil only the high-water mark is available
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def memory_breakdown_mb() -> dict:
+	"""RSS, PSS and private (unshared) memory of this process in MB.
+
+	Pages shared copy-on-write with a parent count fully in RSS but only
+	fractionally in PSS and not at all in ``private``, which is what a forked
+	worker really adds. Falls back to psutil, then to RSS alone.
+	"""
+	try:
+		fields = {}
+		with open("/proc/self/smaps_rollup") as f:
+			for line in f:
+				parts = line.split()
+				if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+					fields[parts[0][:-1]] = int(parts[1]) / 1e3
+		return {
+			"rss": fields["Rss"],
+			"pss": fields["Pss"],
+			"private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+		}
+	except (OSError, KeyError):
+		pass
+	try:
+		import psutil
+		info = psutil.Process().memory_full_info()
+		return {"rss": info.rss / 1e6, "pss": getattr(info, "pss", info.rss) / 1e6, "private": info.uss / 1e6}
+	except (ImportError, AttributeError):
+		return {"rss": current_rss_mb()}
+
+
+class MemoryTracker:
+	"""Per-stage RSS and Python allocation accounting.
+
+	A background thread samples RSS so each stage gets its own peak, not the
+	process-lifetime high-water mark.
+	"""
+
+	def __init__(self, trace_python: bool = False, interval: float = 0.2):
+		self.trace_python = trace_python
+		self.interval = interval
+		self.stages = {}
+		self._peak = 0.0
+		self._stop = threading.Event()
+		self._thread = None
+		if trace_python and not tracemalloc.is_tracing():
+			tracemalloc.start()
+
+	def _sample(self):
+		while not self._stop.wait(self.interval):
+			self._peak = max(self._peak, current_rss_mb())
+
+	def _ensure_sampler(self):
+		if self._thread is None:
+			self._thread = threading.Thread(target=self._sample, daemon=True)
+			self._thread.start()
+
+	@contextmanager
+	def stage(self, name: str):
+		self._ensure_sampler()
+		before = current_rss_mb()
+		self._peak = before
+		if self.trace_python and hasattr(tracemalloc, "reset_peak"):
+			tracemalloc.reset_peak()
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			after = current_rss_mb()
+			st = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "rss_start_mb": before, "rss_end_mb": after, "peak_rss_mb": 0.0, "rss_growth_mb": 0.0})
+			st["calls"] += 1
+			st["seconds"] += time.perf_counter() - start
+			st["rss_end_mb"] = after
+			st["peak_rss_mb"] = max(st["peak_rss_mb"], self._peak, after)
+			st["rss_growth_mb"] += after - before
+			if self.trace_python:
+				st["py_peak_mb"] = max(st.get("py_peak_mb", 0.0), tracemalloc.get_traced_memory()[1] / 1e6)
+
+	def close(self):
+		self._stop.set()
+		if self.trace_python and tracemalloc.is_tracing():
+			tracemalloc.stop()
+
+	def report(self, out_dir: str = None):
+		"""Print the per-stage table and optionally save ``memory_report.json``."""
+		self.close()
+		print(f"\n{'stage':<20}{'calls':>7}{'time (s)':>10}{'peak RSS MB':>13}{'growth MB':>11}{'py peak MB':>12}")
+		for name, st in self.stages.items():
+			py_peak = f"{st['py_peak_mb']:.1f}" if "py_peak_mb" in st else "-"
+			print(f"{name:<20}{st['calls']:>7}{st['seconds']:>10.1f}{st['peak_rss_mb']:>13.1f}{st['rss_growth_mb']:>11.1f}{py_peak:>12}")
+		if out_dir:
+			path = os.path.join(out_dir, "memory_report.json")
+			with open(path, "w") as f:
+				json.dump(self.stages, f, indent=2)
+			print(f"✓ Saved memory report: {path}")
+
+
+class MemoryGuard:
+	"""Shrinks batch sizes before RSS crosses a configured ceiling.
+
+	``check`` runs once per chunk, after the chunk has been written out. Above
+	``soft_ratio * ceiling_mb`` it forces a garbage collection and, if RSS is
+	still high, halves the batch sizes handed out by ``batch_size``; once RSS
+	falls below ``recover_ratio * ceiling_mb`` the scale is doubled back
+	towards 1.
+
+	Resizing batches is all it does: nothing is flushed or spilled. The
+	prediction writers already hold nothing between chunks, but the term
+	counters and the rollup keep growing with the vocabulary, so a ceiling
+	below their size is not enforced.
+	"""
+
+	def __init__(self, ceiling_mb: float = None, soft_ratio: float = 0.85, recover_ratio: float = 0.7):
+		self.ceiling_mb = ceiling_mb
+		self.soft_ratio = soft_ratio
+		self.recover_ratio = recover_ratio
+		self.scale = 1.0
+		self.shrinks = 0
+		self.recoveries = 0
+
+	def over_limit(self) -> bool:
+		if not self.ceiling_mb:
+			return False
+		if current_rss_mb() < self.soft_ratio * self.ceiling_mb:
+			return False
+		gc.collect()
+		return current_rss_mb() >= self.soft_ratio * self.ceiling_mb
+
+	def check(self):
+		"""Adjust the batch scale from the RSS measured between chunks."""
+		if not self.ceiling_mb:
+			return
+		if self.over_limit():
+			if self.scale > 1e-3:
+				self.scale /= 2
+				self.shrinks += 1
+				print(f"⚠️  RSS {current_rss_mb():.0f} MB near ceiling {self.ceiling_mb} MB; batch sizes scaled to {self.scale:.3g}x")
+		elif self.scale < 1.0 and current_rss_mb() < self.recover_ratio * self.ceiling_mb:
+			self.scale = min(1.0, self.scale * 2)
+			self.recoveries += 1
+			print(f"RSS {current_rss_mb():.0f} MB back under {self.recover_ratio:.0%} of ceiling; batch sizes scaled to {self.scale:.3g}x")
+
+	def batch_size(self, requested: int) -> int:
+		return max(1, int(requested * self.scale))
@@ -0,0 +1,228 @@
+import re
+from typing import List
+
+
+POSITIVE_WORDS = {
+	"love", "great", "excellent", "fantastic", "wonderful", "outstanding", "perfect", "happy",
+	"thrilled", "support", "supports", "endorse", "applaud", "benefit", "beneficial", "welcome",
+	"good", "helpful", "appreciate", "agree", "commend", "improve", "improves", "fair",
+}
+NEGATIVE_WORDS = {
+	"terrible", "oppose", "opposed", "bad", "poorly", "disappointed", "waste", "harmful", "harm",
+	"backfire", "outraged", "worse", "disagree", "stifle", "burdensome", "unnecessary", "barriers",
+	"problems", "distortions", "reject", "unfair", "costly", "damage", "hurt", "concerned",
+}
+NEUTRAL_CUES = [
+	"mixed feelings", "more information", "not sure", "pros and cons", "need more time",
+	"deserves consideration", "worth discussing", "questions about", "careful consideration",
+]
+NEGATIONS = {"not", "no", "never", "cannot", "can't", "don't", "won't", "isn't", "nor"}
+
+_TOKEN = re.compile(r"[a-z']+")
+
+# cardiffnlp/twitter-roberta-base-sentiment(-latest) label order
+_LABEL_INDEX = {"label_0": "negative", "label_1": "neutral", "label_2": "positive"}
+
+
+def canonical_label(label: str) -> str:
+	"""Map transformer labels (``LABEL_2``, ``Positive``, ...) onto negative/neutral/positive."""
+	key = str(label).lower()
+	if key in _LABEL_INDEX:
+		return _LABEL_INDEX[key]
+	for name in ("negative", "neutral", "positive"):
+		if key.startswith(name[:3]):
+			return name
+	return key
+
+
+class LexiconScorer:
+	"""Polarity lexicon with a short negation window; confident only on clearly polar text."""
+
+	def __init__(self, negation_window: int = 3):
+		self.negation_window = negation_window
+
+	def score(self, text: str):
+		tokens = _TOKEN.findall(text.lower())
+		pos = neg = 0
+		negate_until = -1
+		for i, tok in enumerate(tokens):
+			if tok in NEGATIONS or tok.endswith("n't"):
+				negate_until = i + self.negation_window
+				continue
+			polarity = 1 if tok in POSITIVE_WORDS else -1 if tok in NEGATIVE_WORDS else 0
+			if polarity and i <= negate_until:
+				polarity = -polarity
+			if polarity > 0:
+				pos += 1
+			elif polarity < 0:
+				neg += 1
+		hits = pos + neg
+		lowered = text.lower()
+		neutral = sum(cue in lowered for cue in NEUTRAL_CUES)
+		if neutral and abs(pos - neg) <= 1:
+			return "neutral", min(1.0, 0.6 + 0.2 * neutral)
+		if not hits:
+			return "neutral", 0.0
+		margin = abs(pos - neg) / hits
+		label = "positive" if pos > neg else "negative" if neg > pos else "neutral"
+		# More evidence -> more confidence, saturating at three polar words
+		return label, margin * min(1.0, hits / 3 + 0.34)
+
+	def predict_with_confidence(self, texts: List[str]):
+		scored = [self.score(t) for t in texts]
+		return [s[0] for s in scored], [s[1] for s in scored]
+
+
+class HashedLinearScorer:
+	"""Logistic regression on hashed word n-grams, distilled from transformer labels."""
+
+	def __init__(self, n_features: int = 2 ** 20, ngram_range=(1, 2)):
+		from sklearn.feature_extraction.text import HashingVectorizer
+		from sklearn.linear_model import SGDClassifier
+
+		self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm="l2")
+		self.clf = SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=20, random_state=42)
+		self.fitted = False
+
+	def fit(self, texts: List[str], labels: List[str]):
+		self.clf.fit(self.vectorizer.transform(texts), [canonical_label(l) for l in labels])
+		self.fitted = True
+		return self
+
+	def predict_with_confidence(self, texts: List[str]):
+		proba = self.clf.predict_proba(self.vectorizer.transform(texts))
+		classes = self.clf.classes_
+		best = proba.argmax(axis=1)
+		return [classes[i] for i in best], [float(proba[r, i]) for r, i in enumerate(best)]
+
+
+class SentimentCascade:
+	"""Cheap first tier for every document; only low-confidence ones go to the transformer.
+
+	``predict`` returns labels in the transformer's own vocabulary, so cascade
+	output can be written and compared exactly like ``SentimentPipeline`` output.
+	"""
+
+	def __init__(self, transformer, tier: str = "lexicon", threshold: float = 0.8):
+		self.transformer = transformer
+		self.threshold = threshold
+		if tier == "lexicon":
+			self.tier1 = LexiconScorer()
+		elif tier == "linear":
+			self.tier1 = HashedLinearScorer()
+		else:
+			raise ValueError(f"Unknown cascade tier: {tier}")
+		self.tier = tier
+		self._to_transformer = self._label_mapping(transformer)
+		self.stats = {"docs": 0, "tier1_docs": 0, "transformer_docs": 0}
+
+	@staticmethod
+	def _label_mapping(transformer) -> dict:
+		id2label = getattr(getattr(getattr(transformer, "model", None), "config", None), "id2label", None) or {}
+		return {canonical_label(v): v for v in id2label.values()}
+
+	def fit(self, texts: List[str], batch_size: int = 16):
+		"""Distill the linear tier from transformer labels on ``texts`` (no-op for the lexicon)."""
+		if self.tier == "linear":
+			self.tier1.fit(texts, self.transformer.predict(texts, batch_size=batch_size))
+		return self
+
+	def predict_with_confidence(self, texts: List[str], batch_size: int = 16, input_ids=None):
+		"""Return ``(labels, confidences)``; confidence is None for transformer-labelled docs.
+
+		``input_ids`` are the transformer's pre-tokenized inputs for ``texts``, if any.
+		"""
+		labels, confidences = self.tier1.predict_with_confidence(texts)
+		labels = [self._to_transformer.get(l, l) for l in labels]
+		deferred = [i for i, c in enumerate(confidences) if c < self.threshold]
+		if deferred:
+			if input_ids is not None:
+				from mca_ai.models.tokenized import predict_sentiment_ids
+				heavy = predict_sentiment_ids(self.transformer, [input_ids[i] for i in deferred], batch_size)
+			else:
+				heavy = self.transformer.predict([texts[i] for i in deferred], batch_size=batch_size)
+			for i, label in zip(deferred, heavy):
+				labels[i] = label
+				confidences[i] = None
+		self.stats["docs"] += len(texts)
+		self.stats["transformer_docs"] += len(deferred)
+		self.stats["tier1_docs"] += len(texts) - len(deferred)
+		return labels, confidences
+
+	def predict(self, texts: List[str], batch_size: int = 16) -> List[str]:
+		return self.predict_with_confidence(texts, batch_size)[0]
+
+	def agreement(self, texts: List[str], batch_size: int = 16) -> float:
+		"""Fraction of ``texts`` where the cascade matches transformer-only labels."""
+		if not texts:
+			return 1.0
+		stats = dict(self.stats)
+		cascade_labels = self.predict(texts, batch_size)
+		self.stats = stats
+		reference = self.transformer.predict(texts, batch_size=batch_size)
+		same = sum(canonical_label(a) == canonical_label(b) for a, b in zip(cascade_labels, reference))
+		self.stats["agreement"] = same / len(texts)
+		self.stats["agreement_docs"] = len(texts)
+		return self.stats["agreement"]
+
+	def report(self) -> dict:
+		docs = max(self.stats["docs"], 1)
+		out = dict(self.stats, tier=self.tier, threshold=self.threshold)
+		out["tier1_fraction"] = self.stats["tier1_docs"] / docs
+		out["transformer_fraction"] = self.stats["transformer_docs"] / docs
+		return out
+
+
+def build_sentiment_model(app_cfg, fit_split=None):
+	"""``SentimentPipeline``, wrapped in a ``WindowedSentiment`` with ``sentiment.windowed.enabled``
+	and in a ``SentimentCascade`` with ``sentiment.cascade.enabled``.
+
+	The linear tier is distilled on the first ``cascade.train_size`` texts of ``fit_split``.
+	"""
+	from mca_ai.models.sentiment import SentimentPipeline
+
+	sent = SentimentPipeline(app_cfg.sentiment.model_name, app_cfg.sentiment.max_length, app_cfg.device)
+	windowed = getattr(app_cfg.sentiment, 'windowed', None)
+	if getattr(windowed, 'enabled', False):
+		from mca_ai.models.windowed import WindowedSentiment
+		sent = WindowedSentiment(
+			sent,
+			max_length=app_cfg.sentiment.max_length,
+			overlap=getattr(windowed, 'overlap', 64),
+			batch_size=getattr(windowed, 'batch_size', app_cfg.sentiment.batch_size),
+			max_windows=getattr(windowed, 'max_windows', 8),
+			aggregate=getattr(windowed, 'aggregate', 'mean'),
+		)
+	cascade_cfg = getattr(app_cfg.sentiment, 'cascade', None)
+	if not getattr(cascade_cfg, 'enabled', False):
+		return sent
+	cascade = SentimentCascade(sent, getattr(cascade_cfg, 'tier', 'lexicon'), getattr(cascade_cfg, 'threshold', 0.8))
+	if cascade.tier == "linear":
+		if fit_split is None or not len(fit_split):
+			raise ValueError("The linear cascade tier needs a split to distill from")
+		fit_texts = fit_split[:getattr(cascade_cfg, 'train_size', 2000)]["text"]
+		cascade.fit(fit_texts, batch_size=app_cfg.sentiment.batch_size)
+	return cascade
+
+
+def predict_sentiment(sent, texts: List[str], batch_size: int = 16, input_ids=None):
+	"""``(labels, confidences)`` from any model ``build_sentiment_model`` returns.
+
+	Confidences are None unless a cascade labelled the docs. Pre-tokenized
+	``input_ids`` replace the transformer's own tokenization when given.
+	"""
+	if isinstance(sent, SentimentCascade):
+		return sent.predict_with_confidence(texts, batch_size=batch_size, input_ids=input_ids)
+	if input_ids is not None:
+		from mca_ai.models.tokenized import predict_sentiment_ids
+		return predict_sentiment_ids(sent, input_ids, batch_size), None
+	return sent.predict(texts, batch_size=batch_size), None
+
+
+def window_stats(sent):
+	"""``WindowedSentiment.report()`` for a sentiment model, looking through a cascade; None if not windowed."""
+	from mca_ai.models.windowed import WindowedSentiment
+
+	if isinstance(sent, SentimentCascade):
+		sent = sent.transformer
+	return sent.report() if isinstance(sent, WindowedSentiment) else None
@@ -0,0 +1,181 @@
+from typing import List
+
+
+class AdaptiveSummarizer:
+	"""Length-aware decoding policy around a ``Summarizer``.
+
+	- inputs of at most ``passthrough_tokens`` tokens are returned without calling
+	  the model, trimmed to ``max_summary_len`` tokens if they are longer than that;
+	- inputs of at most ``greedy_max_tokens`` tokens are decoded greedily;
+	- longer inputs keep the summarizer's configured beam search.
+	"""
+
+	def __init__(self, summarizer, passthrough_tokens: int = None, greedy_max_tokens: int = 256):
+		self.summarizer = summarizer
+		self.passthrough_tokens = passthrough_tokens if passthrough_tokens is not None else summarizer.max_summary_len
+		self.greedy_max_tokens = greedy_max_tokens
+		self.stats = {"passthrough": 0, "greedy": 0, "beam": 0, "trimmed": 0}
+
+	def _token_ids(self, text: str):
+		# Capped at the summarizer's input length since truncation happens there anyway
+		return self.summarizer.tokenizer(text, truncation=True, max_length=self.summarizer.max_input_len, add_special_tokens=False)["input_ids"]
+
+	def count_tokens(self, text: str) -> int:
+		return len(self._token_ids(text))
+
+	def trim(self, text: str) -> str:
+		ids = self._token_ids(text)
+		if len(ids) <= self.summarizer.max_summary_len:
+			return text
+		self.stats["trimmed"] += 1
+		return self.summarizer.tokenizer.decode(ids[:self.summarizer.max_summary_len], skip_special_tokens=True)
+
+	def rule_for(self, n_tokens: int) -> str:
+		if n_tokens <= self.passthrough_tokens:
+			return "passthrough"
+		if n_tokens <= self.greedy_max_tokens:
+			return "greedy"
+		return "beam"
+
+	def summarize(self, text: str) -> str:
+		rule = self.rule_for(self.count_tokens(text))
+		self.stats[rule] += 1
+		if rule == "passthrough":
+			return self.trim(text)
+		if rule == "beam":
+			return self.summarizer.summarize(text)
+		beams = self.summarizer.num_beams
+		self.summarizer.num_beams = 1
+		try:
+			return self.summarizer.summarize(text)
+		finally:
+			self.summarizer.num_beams = beams
+
+	def summarize_many(self, texts: List[str], input_ids: List[List[int]] = None, batch_size: int = 8) -> List[str]:
+		"""Route each text by length, then hand each group to the summarizer in one call where it batches.
+
+		With pre-tokenized ``input_ids`` the stored lengths decide the route and
+		the model runs on those ids instead of re-tokenizing.
+		"""
+		out = [None] * len(texts)
+		groups = {"greedy": [], "beam": []}
+		if input_ids is not None:
+			from mca_ai.models.tokenized import SUMMARIZE_PREFIX
+			# Stored ids also carry the task prefix and EOS
+			overhead = len(self.summarizer.tokenizer(SUMMARIZE_PREFIX)["input_ids"])
+			counts = [len(ids) - overhead for ids in input_ids]
+		else:
+			counts = [self.count_tokens(text) for text in texts]
+		for i, text in enumerate(texts):
+			rule = self.rule_for(counts[i])
+			self.stats[rule] += 1
+			if rule == "passthrough":
+				out[i] = self.trim(text)
+			else:
+				groups[rule].append(i)
+		beams = self.summarizer.num_beams
+		for rule, idx in groups.items():
+			if not idx:
+				continue
+			self.summarizer.num_beams = 1 if rule == "greedy" else beams
+			try:
+				group_ids = [input_ids[i] for i in idx] if input_ids is not None else None
+				for i, summary in zip(idx, _summarize_many(self.summarizer, [texts[i] for i in idx], group_ids, batch_size)):
+					out[i] = summary
+			finally:
+				self.summarizer.num_beams = beams
+		return out
+
+	def report(self) -> dict:
+		total = max(self.stats["passthrough"] + self.stats["greedy"] + self.stats["beam"], 1)
+		out = dict(self.stats)
+		out["generated_docs"] = self.stats["greedy"] + self.stats["beam"]
+		out["skipped_fraction"] = self.stats["passthrough"] / total
+		out["passthrough_tokens"] = self.passthrough_tokens
+		out["greedy_max_tokens"] = self.greedy_max_tokens
+		return out
+
+
+def _summarize_many(summarizer, texts: List[str], input_ids=None, batch_size: int = 8) -> List[str]:
+	if isinstance(summarizer, AdaptiveSummarizer):
+		return summarizer.summarize_many(texts, input_ids, batch_size)
+	if hasattr(summarizer, "summarize_many"):
+		return summarizer.summarize_many(texts)
+	if input_ids is not None:
+		from mca_ai.models.tokenized import generate_summaries_ids
+		return generate_summaries_ids(summarizer, input_ids, batch_size)
+	return [summarizer.summarize(t) for t in texts]
+
+
+def _policy_stats(summarizer):
+	"""``(wrapper, copy of its stats)`` for each policy wrapper around a summarizer."""
+	saved = []
+	while summarizer is not None:
+		if isinstance(getattr(summarizer, "stats", None), dict):
+			saved.append((summarizer, dict(summarizer.stats)))
+		summarizer = getattr(summarizer, "summarizer", None)
+	return saved
+
+
+def summarize_chunk(summarizer, texts: List[str], offset: int = 0, input_ids=None, batch_size: int = 8) -> List[str]:
+	"""Summaries for ``texts``; if the batched call fails, retry one by one so only bad documents get the error marker.
+
+	``input_ids`` are pre-tokenized inputs (see ``pretokenize_dataset``) used instead of the texts where possible.
+	"""
+	saved = _policy_stats(summarizer)
+	try:
+		return _summarize_many(summarizer, texts, input_ids, batch_size)
+	except Exception as e:
+		print(f"Batched summarization failed ({e}), retrying documents one by one")
+	# The failed call already counted part of the chunk; the retry counts it again from scratch
+	for wrapper, stats in saved:
+		wrapper.stats = stats
+	summaries = []
+	for i, text in enumerate(texts, offset):
+		try:
+			summaries.append(summarizer.summarize(text))
+		except Exception as e:
+			print(f"Error summarizing text {i}: {e}")
+			summaries.append("Error in summarization")
+	return summaries
+
+
+def summarizer_stats(summarizer) -> dict:
+	"""Reports of the policy wrappers around a summarizer, keyed ``decoding`` / ``long_document``."""
+	from mca_ai.models.hierarchical import HierarchicalSummarizer
+
+	stats = {}
+	while summarizer is not None:
+		if isinstance(summarizer, AdaptiveSummarizer):
+			stats["decoding"] = summarizer.report()
+		elif isinstance(summarizer, HierarchicalSummarizer):
+			stats["long_document"] = summarizer.report()
+		summarizer = getattr(summarizer, "summarizer", None)
+	return stats
+
+
+def build_summarizer(app_cfg):
+	"""``Summarizer``, wrapped in a ``HierarchicalSummarizer`` with ``summarization.long_document.enabled``
+	and in an ``AdaptiveSummarizer`` with ``summarization.adaptive.enabled``."""
+	from mca_ai.models.summarizer import Summarizer
+
+	sc = app_cfg.summarization
+	sumz = Summarizer(sc.model_name, sc.max_input_length, sc.max_summary_length, sc.num_beams, app_cfg.device)
+	long_doc = getattr(sc, 'long_document', None)
+	if getattr(long_doc, 'enabled', False):
+		from mca_ai.models.hierarchical import HierarchicalSummarizer
+		sumz = HierarchicalSummarizer(
+			sumz,
+			window_tokens=getattr(long_doc, 'window_tokens', None),
+			overlap=getattr(long_doc, 'overlap', 32),
+			batch_size=getattr(long_doc, 'batch_size', 8),
+			max_windows=getattr(long_doc, 'max_windows', 16),
+		)
+	adaptive = getattr(sc, 'adaptive', None)
+	if not getattr(adaptive, 'enabled', False):
+		return sumz
+	return AdaptiveSummarizer(
+		sumz,
+		passthrough_tokens=getattr(adaptive, 'passthrough_tokens', None),
+		greedy_max_tokens=getattr(adaptive, 'greedy_max_tokens', 256),
+	)
@@ -0,0 +1,126 @@
+from typing import List
+
+
+class HierarchicalSummarizer:
+	"""Map-reduce summarization for documents longer than the model's input window.
+
+	Map: every document is cut into token windows and windows from all documents
+	in the call are packed into shared ``generate`` batches. Reduce: the partial
+	summaries of each multi-window document are concatenated and summarized again
+	(also batched across documents) until every document has a single summary.
+	Single-window documents are summarized in the map step as usual.
+	"""
+
+	def __init__(self, summarizer, window_tokens: int = None, overlap: int = 32, batch_size: int = 8, max_windows: int = 16, prefix: str = "summarize: "):
+		self.summarizer = summarizer
+		self.prefix_ids = summarizer.tokenizer(prefix, add_special_tokens=False)["input_ids"] if prefix else []
+		eos = getattr(summarizer.tokenizer, "eos_token_id", None)
+		self.suffix_ids = [eos] if eos is not None else []
+		# The prefix and EOS count against max_input_len
+		room = summarizer.max_input_len - len(self.prefix_ids) - len(self.suffix_ids)
+		self.window_tokens = min(window_tokens or room, room)
+		self.overlap = min(overlap, self.window_tokens // 2)
+		self.batch_size = batch_size
+		self.max_windows = max_windows
+		self.stats = {"docs": 0, "long_docs": 0, "windows": 0, "map_batches": 0, "reduce_rounds": 0, "reduce_batches": 0}
+
+	# Decoding settings stay on the wrapped summarizer so policies that adjust them keep working
+	@property
+	def num_beams(self):
+		return self.summarizer.num_beams
+
+	@num_beams.setter
+	def num_beams(self, value):
+		self.summarizer.num_beams = value
+
+	@property
+	def tokenizer(self):
+		return self.summarizer.tokenizer
+
+	@property
+	def max_input_len(self):
+		return self.summarizer.max_input_len
+
+	@property
+	def max_summary_len(self):
+		return self.summarizer.max_summary_len
+
+	def windows(self, text: str) -> List[List[int]]:
+		"""Overlapping token windows over ``text``, at most ``max_windows`` of them."""
+		ids = self.summarizer.tokenizer(text, add_special_tokens=False)["input_ids"]
+		step = self.window_tokens - self.overlap
+		out = []
+		for start in range(0, max(len(ids), 1), step):
+			out.append(ids[start:start + self.window_tokens])
+			if start + self.window_tokens >= len(ids) or len(out) >= self.max_windows:
+				break
+		return out
+
+	def _generate(self, windows: List[List[int]]) -> List[str]:
+		import torch
+
+		tok = self.summarizer.tokenizer
+		batch = tok.pad({"input_ids": [self.prefix_ids + w + self.suffix_ids for w in windows]}, return_tensors="pt")
+		batch = {k: v.to(self.summarizer.device) for k, v in batch.items()}
+		with torch.inference_mode():
+			out = self.summarizer.model.generate(
+				**batch,
+				max_length=self.summarizer.max_summary_len,
+				num_beams=self.summarizer.num_beams,
+				early_stopping=self.summarizer.num_beams > 1,
+			)
+		return tok.batch_decode(out, skip_special_tokens=True)
+
+	def _run_batched(self, jobs, counter: str):
+		"""Summarize ``(key, window)`` jobs in full batches regardless of which document they belong to."""
+		# Similar lengths together keep padding low inside each forward pass
+		jobs = sorted(jobs, key=lambda j: len(j[1]), reverse=True)
+		results = {}
+		for start in range(0, len(jobs), self.batch_size):
+			part = jobs[start:start + self.batch_size]
+			for (key, _), summary in zip(part, self._generate([w for _, w in part])):
+				results[key] = summary
+			self.stats[counter] += 1
+		return results
+
+	def summarize_many(self, texts: List[str]) -> List[str]:
+		doc_windows = [self.windows(t) for t in texts]
+		self.stats["docs"] += len(texts)
+		self.stats["windows"] += sum(len(w) for w in doc_windows)
+		self.stats["long_docs"] += sum(len(w) > 1 for w in doc_windows)
+
+		mapped = self._run_batched([((d, k), w) for d, ws in enumerate(doc_windows) for k, w in enumerate(ws)], "map_batches")
+		partials = {d: [mapped[(d, k)] for k in range(len(ws))] for d, ws in enumerate(doc_windows)}
+
+		summaries = {d: parts[0] for d, parts in partials.items() if len(parts) == 1}
+		pending = {d: " ".join(parts) for d, parts in partials.items() if len(parts) > 1}
+		counts = {d: len(partials[d]) for d in pending}
+		while pending:
+			self.stats["reduce_rounds"] += 1
+			jobs, next_pending = [], {}
+			for d, joined in pending.items():
+				ws = self.windows(joined)
+				if len(ws) == 1 or len(ws) >= counts[d]:
+					# One window left, or summaries too long to shrink further: finish on the first window
+					jobs.append((d, ws[0]))
+				else:
+					# Concatenated partials still overflow the window: reduce them in pieces first
+					jobs.extend(((d, k), w) for k, w in enumerate(ws))
+					next_pending[d] = len(ws)
+			reduced = self._run_batched(jobs, "reduce_batches")
+			for d in list(pending):
+				if d in next_pending:
+					pending[d] = " ".join(reduced[(d, k)] for k in range(next_pending[d]))
+					counts[d] = next_pending[d]
+				else:
+					summaries[d] = reduced[d]
+					del pending[d]
+		return [summaries[d] for d in range(len(texts))]
+
+	def summarize(self, text: str) -> str:
+		return self.summarize_many([text])[0]
+
+	def report(self) -> dict:
+		out = dict(self.stats, window_tokens=self.window_tokens, overlap=self.overlap, batch_size=self.batch_size)
+		out["windows_per_doc"] = self.stats["windows"] / max(self.stats["docs"], 1)
+		return out
@@ -0,0 +1,54 @@
+from typing import List
+
+SUMMARIZE_PREFIX = "summarize: "
+
+
+def token_columns(model_name: str, max_length: int):
+	"""``(input_ids column, length column)`` for a tokenizer and max length."""
+	key = f"{model_name.replace('/', '__')}__{max_length}"
+	return f"input_ids__{key}", f"length__{key}"
+
+
+def _length_batches(input_ids: List[List[int]], batch_size: int):
+	# Exact length bucketing: sort by stored length so each batch pads to its own longest row
+	order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]), reverse=True)
+	for start in range(0, len(order), batch_size):
+		yield order[start:start + batch_size]
+
+
+def predict_sentiment_ids(pipeline, input_ids: List[List[int]], batch_size: int = 16) -> List[str]:
+	"""Labels for already tokenized inputs, skipping the pipeline's own tokenization."""
+	import torch
+
+	tok = pipeline.tokenizer
+	id2label = pipeline.model.config.id2label
+	labels = [None] * len(input_ids)
+	for idx in _length_batches(input_ids, batch_size):
+		batch = tok.pad({"input_ids": [input_ids[i] for i in idx]}, return_tensors="pt")
+		batch = {k: v.to(pipeline.device) for k, v in batch.items()}
+		with torch.inference_mode():
+			best = pipeline.model(**batch).logits.argmax(dim=1).tolist()
+		for i, b in zip(idx, best):
+			labels[i] = id2label[b]
+	return labels
+
+
+def generate_summaries_ids(summarizer, input_ids: List[List[int]], batch_size: int = 8) -> List[str]:
+	"""Summaries for inputs tokenized from ``SUMMARIZE_PREFIX + text``, batched by length."""
+	import torch
+
+	tok = summarizer.tokenizer
+	summaries = [None] * len(input_ids)
+	for idx in _length_batches(input_ids, batch_size):
+		batch = tok.pad({"input_ids": [input_ids[i] for i in idx]}, return_tensors="pt")
+		batch = {k: v.to(summarizer.device) for k, v in batch.items()}
+		with torch.inference_mode():
+			out = summarizer.model.generate(
+				**batch,
+				max_length=summarizer.max_summary_len,
+				num_beams=summarizer.num_beams,
+				early_stopping=summarizer.num_beams > 1,
+			)
+		for i, summary in zip(idx, tok.batch_decode(out, skip_special_tokens=True)):
+			summaries[i] = summary
+	return summaries
@@ -0,0 +1,104 @@
+from typing import List
+
+AGGREGATIONS = ("mean", "max", "length_weighted")
+
+
+class WindowedSentiment:
+	"""Sentiment over overlapping token windows instead of the first ``max_length`` tokens.
+
+	Windows from all documents in a call are packed into shared forward passes;
+	each document's window logits are then combined with ``aggregate``:
+	``mean``, ``max`` (per class) or ``length_weighted`` (mean weighted by window
+	token count). Documents longer than ``max_windows`` windows are covered by
+	evenly spaced windows. Exposes ``predict`` like ``SentimentPipeline`` so it
+	can sit behind ``SentimentCascade``.
+	"""
+
+	def __init__(self, pipeline, max_length: int = 256, overlap: int = 64, batch_size: int = 32, max_windows: int = 8, aggregate: str = "mean"):
+		if aggregate not in AGGREGATIONS:
+			raise ValueError(f"Unknown window aggregation: {aggregate}")
+		self.pipeline = pipeline
+		tok = pipeline.tokenizer
+		self.window_tokens = max_length - tok.num_special_tokens_to_add(pair=False)
+		self.overlap = min(overlap, self.window_tokens // 2)
+		self.batch_size = batch_size
+		self.max_windows = max_windows
+		self.aggregate = aggregate
+		self.stats = {"docs": 0, "windows": 0, "batches": 0, "multi_window_docs": 0, "capped_docs": 0}
+
+	@property
+	def model(self):
+		return self.pipeline.model
+
+	@property
+	def tokenizer(self):
+		return self.pipeline.tokenizer
+
+	@property
+	def device(self):
+		return self.pipeline.device
+
+	def windows(self, text: str) -> List[List[int]]:
+		ids = self.pipeline.tokenizer(text, add_special_tokens=False)["input_ids"]
+		step = self.window_tokens - self.overlap
+		starts = list(range(0, max(len(ids) - self.overlap, 1), step))
+		if len(starts) > self.max_windows:
+			self.stats["capped_docs"] += 1
+			last = len(starts) - 1
+			starts = [starts[round(k * last / (self.max_windows - 1))] for k in range(self.max_windows)] if self.max_windows > 1 else starts[:1]
+		return [ids[s:s + self.window_tokens] for s in starts]
+
+	def _logits(self, windows: List[List[int]]):
+		import torch
+
+		tok = self.pipeline.tokenizer
+		batch = tok.pad({"input_ids": [tok.build_inputs_with_special_tokens(w) for w in windows]}, return_tensors="pt")
+		batch = {k: v.to(self.pipeline.device) for k, v in batch.items()}
+		with torch.inference_mode():
+			return self.pipeline.model(**batch).logits.float().cpu()
+
+	def _combine(self, logits, lengths):
+		if self.aggregate == "max":
+			return logits.max(dim=0).values
+		if self.aggregate == "length_weighted":
+			weights = logits.new_tensor(lengths).unsqueeze(1)
+			return (logits * weights).sum(dim=0) / weights.sum()
+		return logits.mean(dim=0)
+
+	def predict_logits(self, texts: List[str]):
+		"""One aggregated logit row per text."""
+		import torch
+
+		jobs = [(d, w) for d, text in enumerate(texts) for w in self.windows(text)]
+		per_doc = [0] * len(texts)
+		for d, _ in jobs:
+			per_doc[d] += 1
+		self.stats["docs"] += len(texts)
+		self.stats["windows"] += len(jobs)
+		self.stats["multi_window_docs"] += sum(n > 1 for n in per_doc)
+
+		# Similar lengths together keep padding low inside each forward pass
+		order = sorted(range(len(jobs)), key=lambda j: len(jobs[j][1]), reverse=True)
+		window_logits = [None] * len(jobs)
+		for start in range(0, len(order), self.batch_size):
+			part = order[start:start + self.batch_size]
+			for j, row in zip(part, self._logits([jobs[j][1] for j in part])):
+				window_logits[j] = row
+			self.stats["batches"] += 1
+
+		grouped = [[] for _ in texts]
+		for (d, w), row in zip(jobs, window_logits):
+			grouped[d].append((row, len(w)))
+		return torch.stack([self._combine(torch.stack([r for r, _ in g]), [n for _, n in g]) for g in grouped])
+
+	def predict(self, texts: List[str], batch_size: int = None) -> List[str]:
+		# ``batch_size`` is accepted for interface compatibility; windows are batched by ``self.batch_size``
+		if not texts:
+			return []
+		id2label = self.pipeline.model.config.id2label
+		return [id2label[int(i)] for i in self.predict_logits(texts).argmax(dim=1)]
+
+	def report(self) -> dict:
+		out = dict(self.stats, window_tokens=self.window_tokens, overlap=self.overlap, aggregate=self.aggregate, max_windows=self.max_windows)
+		out["windows_per_doc"] = self.stats["windows"] / max(self.stats["docs"], 1)
+		return out
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import argparse
+from collections import Counter
+
+from mca_ai import tracing
+from mca_ai.config import load_config
+from mca_ai.data_loader import iter_record_batches, load_dataset_any
+from mca_ai.models.tokenized import token_columns
+from mca_ai.output import batch_ids, open_prediction_writers
+from mca_ai.pipeline import stage_config
+from mca_ai.viz.wordfreq import TermCounter, build_wordcloud_from_frequencies
+from mca_ai.workers import build_replica_pool, chunk_inputs, init_replica, run_chunk
+
+
+# Config sections that decide which models are loaded; every docket in a batch must agree on them
+MODEL_STAGES = ("sentiment", "summarize", "keywords")
+
+
+def model_signature(app_cfg) -> dict:
+	return {"device": getattr(app_cfg, 'device', None), **{s: stage_config(app_cfg, s) for s in MODEL_STAGES}}
+
+
+class Docket:
+	"""One consultation: its config, test split, output directory and running totals."""
+
+	def __init__(self, name: str, config_path: str, out_root: str = None):
+		self.name = name
+		self.config_path = config_path
+		self.cfg = load_config(config_path)
+		self.exp_dir = os.path.join(out_root or self.cfg.paths.experiments_dir, name)
+		os.makedirs(self.exp_dir, exist_ok=True)
+		self.ds = None
+		self.writers = []
+		self.term_counts = TermCounter()
+		self.sentiment_counts = Counter()
+		self.docs = 0
+
+	def load(self):
+		with tracing.span("multidocket.load", docket=self.name):
+			self.ds = load_dataset_any(self.cfg)
+		split = self.ds["test"]
+		cfg = self.cfg
+		self.sentiment_ids_col = token_columns(cfg.sentiment.model_name, cfg.sentiment.max_length)[0]
+		self.summary_ids_col = token_columns(cfg.summarization.model_name, cfg.summarization.max_input_length)[0]
+		self.sentiment_ids_col = self.sentiment_ids_col if self.sentiment_ids_col in split.column_names else None
+		self.summary_ids_col = self.summary_ids_col if self.summary_ids_col in split.column_names else None
+		self.extra_columns = getattr(getattr(cfg, 'output', None), 'extra_columns', None) or []
+		self.columns = [c for c in ["id", "text", "sentiment_text", "summary_text", self.sentiment_ids_col, self.summary_ids_col, *self.extra_columns] if c]
+		self.writers = open_prediction_writers(cfg, self.exp_dir)
+		print(f"Docket {self.name}: {len(split)} test examples -> {self.exp_dir}")
+
+	def batches(self, rows: int):
+		return iter_record_batches(self.ds["test"], rows, self.columns)
+
+	def write(self, start: int, batch, out: dict):
+		self.sentiment_counts.update(out["sentiment"])
+		self.term_counts.update(batch.column("text").to_pylist())
+		self.docs += batch.num_rows
+		records = {
+			"id": batch_ids(batch),
+			"text": batch.column("text"),
+			"sentiment": out["sentiment"],
+			"summary": out["summary"],
+			"keywords": out["keywords"],
+			"confidence": out["confidence"],
+			**{c: batch.column(c) for c in self.extra_columns},
+		}
+		for writer in self.writers:
+			writer.write(records)
+
+	def finish(self):
+		for writer in self.writers:
+			writer.close()
+			print(f"✓ Saved predictions: {writer.path}")
+		self.term_counts.save(os.path.join(self.exp_dir, "word_frequencies.json"))
+		wc_cfg = self.cfg.viz.wordcloud
+		try:
+			wc = build_wordcloud_from_frequencies(self.term_counts, width=wc_cfg.width, height=wc_cfg.height, background_color=wc_cfg.background_color)
+			wc.to_file(os.path.join(self.exp_dir, "wordcloud.png"))
+		except Exception as e:
+			print(f"Error generating word cloud for {self.name}: {e}")
+		with open(os.path.join(self.exp_dir, "summary_stats.json"), "w") as f:
+			json.dump({"docket": self.name, "config": self.config_path, "docs": self.docs, "sentiment_counts": dict(self.sentiment_counts)}, f, indent=2)
+
+
+def _merge_inputs(parts):
+	"""Concatenate ``chunk_inputs`` of several docket slices into one model batch."""
+	merged = {"start": 0}
+	for key in ("text", "sentiment_text", "summary_text", "sentiment_ids", "summary_ids"):
+		values = [p[key] for p in parts]
+		# Pre-tokenized ids are only usable when every docket in the batch has them
+		merged[key] = None if any(v is None for v in values) else [x for v in values for x in v]
+	return merged
+
+
+def _split_output(out: dict, sizes):
+	pieces, pos = [], 0
+	for n in sizes:
+		# Confidences are None for the whole batch unless a cascade labelled it
+		pieces.append({k: out[k][pos:pos + n] if out[k] is not None else None for k in ("sentiment", "confidence", "summary", "keywords")})
+		pos += n
+	return pieces
+
+
+def mixed_batches(dockets, batch_rows: int):
+	"""Model batches of ``batch_rows`` documents filled across dockets in order.
+
+	Yields ``(segments, inputs)`` where ``segments`` is ``[(docket, start, arrow_slice)]``;
+	a docket's last, partial batch is topped up from the next docket instead of
+	running half empty.
+	"""
+	segments, filled = [], 0
+	for docket in dockets:
+		stream = docket.batches(lambda: batch_rows - filled)
+		for start, batch in stream:
+			segments.append((docket, start, batch))
+			filled += batch.num_rows
+			if filled >= batch_rows:
+				yield segments, _merge_inputs([chunk_inputs(b, s, d.sentiment_ids_col, d.summary_ids_col) for d, s, b in segments])
+				segments, filled = [], 0
+	if segments:
+		yield segments, _merge_inputs([chunk_inputs(b, s, d.sentiment_ids_col, d.summary_ids_col) for d, s, b in segments])
+
+
+def run_dockets(config_paths, out_root: str = None, batch_rows: int = None) -> dict:
+	"""Process several dockets through one warm set of models, each into its own directory."""
+	names = {}
+	dockets = []
+	for path in config_paths:
+		name = os.path.splitext(os.path.basename(path))[0]
+		names[name] = names.get(name, 0) + 1
+		dockets.append(Docket(name if names[name] == 1 else f"{name}-{names[name]}", path, out_root))
+
+	base = dockets[0]
+	signature = model_signature(base.cfg)
+	for docket in dockets[1:]:
+		if model_signature(docket.cfg) != signature:
+			raise ValueError(f"{docket.config_path} configures different models than {base.config_path}; run it in a separate batch")
+	tracing.configure(base.cfg)
+	for docket in dockets:
+		docket.load()
+
+	# Models are loaded once, from the first docket's config; the linear cascade tier distills on its train split
+	t0 = time.perf_counter()
+	pool = build_replica_pool(base.cfg, base.config_path, base.ds["train"])
+	if pool is None:
+		from mca_ai.models.cascade import build_sentiment_model
+		from mca_ai.models.decoding import build_summarizer
+
+		print("Initializing models...")
+		init_replica(base.cfg, build_sentiment_model(base.cfg, base.ds["train"]), build_summarizer(base.cfg))
+	else:
+		print(f"Starting {pool.replicas} model replicas ({pool.intra} intra-op threads each)...")
+		pool.start()
+	load_seconds = time.perf_counter() - t0
+
+	batch_rows = batch_rows or getattr(getattr(base.cfg, 'memory', None), 'chunk_size', 100)
+	tasks = ((segments, inputs) for segments, inputs in mixed_batches(dockets, batch_rows))
+	results = pool.imap(tasks) if pool is not None else ((segments, run_chunk(inputs)) for segments, inputs in tasks)
+	batches = mixed = 0
+	for segments, out in results:
+		batches += 1
+		mixed += len({d.name for d, _, _ in segments}) > 1
+		print(f"Batch {batches}: " + ", ".join(f"{d.name}[{s}:{s + b.num_rows}]" for d, s, b in segments))
+		for (docket, start, batch), piece in zip(segments, _split_output(out, [b.num_rows for _, _, b in segments])):
+			docket.write(start, batch, piece)
+	if pool is not None:
+		pool.close()
+
+	for docket in dockets:
+		docket.finish()
+	stats = {
+		"dockets": {d.name: {"config": d.config_path, "exp_dir": d.exp_dir, "docs": d.docs} for d in dockets},
+		"batch_rows": batch_rows,
+		"batches": batches,
+		"mixed_batches": mixed,
+		"model_load_seconds": load_seconds,
+	}
+	stats_dir = out_root or base.cfg.paths.experiments_dir
+	os.makedirs(stats_dir, exist_ok=True)
+	with open(os.path.join(stats_dir, "multidocket_stats.json"), "w") as f:
+		json.dump(stats, f, indent=2)
+	tracing.finish(stats_dir)
+	print(f"\n🎉 Processed {len(dockets)} dockets ({sum(d.docs for d in dockets)} docs) in {batches} batches; models loaded once in {load_seconds:.1f}s")
+	return stats
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Run several dockets through one set of loaded models")
+	parser.add_argument("configs", nargs="+", help="One config per docket; model settings must match")
+	parser.add_argument("--out", default=None, help="Root for the per-docket output directories (default: each config's experiments_dir)")
+	parser.add_argument("--batch-rows", type=int, default=None, help="Documents per model batch (default: memory.chunk_size)")
+	args = parser.parse_args()
+	run_dockets(args.configs, args.out, args.batch_rows)
+
+
+if __name__ == "__main__":
+	main()
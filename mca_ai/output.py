@@ -0,0 +1,147 @@
+import os
+import csv
+
+import pandas as pd
+
+
+KEYWORD_ERROR = "Error in keyword extraction"
+
+
+def _pylist(values):
+	# Arrow columns from iter_record_batches are converted only here, one chunk at a time
+	return values.to_pylist() if hasattr(values, "to_pylist") else values
+
+
+class CsvPredictionWriter:
+	"""Appends prediction chunks to ``predictions.csv`` (keywords joined with "; ").
+
+	With ``append`` an existing file is continued instead of overwritten.
+	"""
+
+	def __init__(self, exp_dir: str, extra_columns=None, append: bool = False):
+		self.path = os.path.join(exp_dir, "predictions.csv")
+		self.extra_columns = list(extra_columns or [])
+		self.rows = 0
+		self.has_header = append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+	def write(self, records: dict):
+		df = pd.DataFrame({
+			"id": _pylist(records["id"]),
+			"text": _pylist(records["text"]),
+			"sentiment": records["sentiment"],
+			"summary": records["summary"],
+			"keywords": ["; ".join(k) if k is not None else KEYWORD_ERROR for k in records["keywords"]],
+			**{c: _pylist(records[c]) for c in self.extra_columns},
+		})
+		if records.get("confidence") is not None:
+			df["confidence"] = records["confidence"]
+		before = os.path.getsize(self.path) if self.has_header else 0
+		df.to_csv(self.path, index=False, quoting=csv.QUOTE_MINIMAL, mode="a" if self.has_header else "w", header=not self.has_header)
+		self.has_header = True
+		self.rows += len(df)
+		return os.path.getsize(self.path) - before
+
+	def close(self):
+		pass
+
+
+class ParquetPredictionWriter:
+	"""Writes ``predictions.parquet`` one row group per chunk.
+
+	``id`` is kept as a string so joins back to the source metadata are by key,
+	``sentiment`` is dictionary-encoded, ``keywords`` is a list column and
+	``confidence`` is a nullable float. Parquet files cannot be appended to, so
+	with ``append`` each run writes the next ``predictions-NNNNN.parquet`` part.
+	"""
+
+	def __init__(self, exp_dir: str, extra_columns=None, append: bool = False):
+		import pyarrow as pa
+
+		self.pa = pa
+		self.path = os.path.join(exp_dir, "predictions.parquet")
+		if append:
+			part = 0
+			while os.path.exists(os.path.join(exp_dir, f"predictions-{part:05d}.parquet")):
+				part += 1
+			self.path = os.path.join(exp_dir, f"predictions-{part:05d}.parquet")
+		self.extra_columns = list(extra_columns or [])
+		self.schema = pa.schema(
+			[
+				("id", pa.string()),
+				("text", pa.string()),
+				("sentiment", pa.dictionary(pa.int32(), pa.string())),
+				("summary", pa.string()),
+				("keywords", pa.list_(pa.string())),
+				("confidence", pa.float32()),
+			]
+			+ [(c, pa.string()) for c in self.extra_columns]
+		)
+		self.writer = None
+		self.rows = 0
+
+	def _strings(self, values):
+		"""String array from an Arrow column (cast without a Python round trip) or a list."""
+		pa = self.pa
+		if isinstance(values, pa.ChunkedArray):
+			values = values.combine_chunks()
+		if isinstance(values, pa.Array):
+			return values.cast(pa.string())
+		return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+	def write(self, records: dict):
+		import pyarrow.parquet as pq
+
+		pa = self.pa
+		n = len(records["text"])
+		confidence = records.get("confidence")
+		arrays = [
+			self._strings(records["id"]),
+			self._strings(records["text"]),
+			pa.array(records["sentiment"], pa.string()).dictionary_encode(),
+			pa.array(records["summary"], pa.string()),
+			pa.array(records["keywords"], pa.list_(pa.string())),
+			pa.array(confidence if confidence is not None else [None] * n, pa.float32()),
+		] + [self._strings(records[c]) for c in self.extra_columns]
+		table = pa.Table.from_arrays(arrays, schema=self.schema)
+		if self.writer is None:
+			self.writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+		self.writer.write_table(table)
+		self.rows += n
+		return table.nbytes
+
+	def close(self):
+		if self.writer is not None:
+			self.writer.close()
+
+
+def open_prediction_writers(app_cfg, exp_dir: str, append: bool = False):
+	"""Writers for ``output.format`` (csv | parquet | both; default csv)."""
+	out_cfg = getattr(app_cfg, 'output', None)
+	fmt = getattr(out_cfg, 'format', 'csv')
+	extra = getattr(out_cfg, 'extra_columns', None) or []
+	if fmt not in ("csv", "parquet", "both"):
+		raise ValueError(f"Unknown output format: {fmt}")
+	writers = []
+	if fmt in ("csv", "both"):
+		writers.append(CsvPredictionWriter(exp_dir, extra, append))
+	if fmt in ("parquet", "both"):
+		writers.append(ParquetPredictionWriter(exp_dir, extra, append))
+	return writers
+
+
+def _missing_ids():
+	return KeyError("no 'id' column; load the data with load_dataset_any, which adds positional ids")
+
+
+def source_ids(split):
+	"""Original ``id`` column of a split (``load_dataset_any`` adds one where the source has none)."""
+	if "id" not in split.column_names:
+		raise _missing_ids()
+	return split["id"]
+
+
+def batch_ids(batch):
+	"""``id`` column of an Arrow batch from ``iter_record_batches``."""
+	if "id" not in batch.column_names:
+		raise _missing_ids()
+	return batch.column("id")
@@ -0,0 +1,411 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+
+from mca_ai import tracing
+from mca_ai.memory import MemoryGuard, MemoryTracker
+
+
+# Bump a stage's version when its code changes in a way that alters its output
+STAGE_VERSIONS = {
+	"load": 2,
+	"clean": 1,
+	"sentiment": 1,
+	"summarize": 1,
+	"keywords": 1,
+	"wordcloud": 1,
+	"write": 2,
+}
+
+STAGE_DEPS = {
+	"load": [],
+	"clean": ["load"],
+	"sentiment": ["clean"],
+	"summarize": ["clean"],
+	"keywords": ["clean"],
+	"wordcloud": ["clean"],
+	"write": ["clean", "sentiment", "summarize", "keywords"],
+}
+
+STAGES = list(STAGE_VERSIONS)
+
+
+def _plain(obj):
+	"""Turn a config section into JSON-serialisable data for fingerprinting."""
+	if isinstance(obj, dict):
+		return {k: _plain(v) for k, v in obj.items()}
+	if isinstance(obj, (list, tuple)):
+		return [_plain(v) for v in obj]
+	if hasattr(obj, "__dict__"):
+		return {k: _plain(v) for k, v in vars(obj).items() if not k.startswith("_")}
+	return obj
+
+
+def _section(app_cfg, path: str, drop=()):
+	obj = app_cfg
+	for part in path.split("."):
+		obj = getattr(obj, part, None)
+	plain = _plain(obj)
+	if isinstance(plain, dict):
+		plain = {k: v for k, v in plain.items() if k not in drop}
+	return plain
+
+
+def _data_files(app_cfg):
+	"""Name, size and mtime of the source files so edits to the data invalidate ``load``."""
+	data_dir = getattr(app_cfg.paths, 'data_dir', None)
+	archive = getattr(app_cfg.data, 'archive_path', None)
+	paths = sorted(glob.glob(os.path.join(data_dir, "train*"))) if data_dir else []
+	if archive:
+		paths.append(archive)
+	files = []
+	for p in paths:
+		if os.path.isfile(p):
+			st = os.stat(p)
+			files.append([os.path.basename(p), st.st_size, int(st.st_mtime)])
+	return files
+
+
+def stage_config(app_cfg, stage: str):
+	"""The part of the config that can change a stage's output."""
+	if stage == "load":
+		return {"data": _section(app_cfg, "data", drop=("map_num_proc", "text_field")), "seed": getattr(app_cfg, 'seed', None), "files": _data_files(app_cfg)}
+	if stage == "clean":
+		out = {"text_field": app_cfg.data.text_field}
+		from mca_ai.data_loader import pretruncation_targets
+		if getattr(getattr(app_cfg, 'pretruncate', None), 'enabled', False):
+			out["pretruncate"] = _section(app_cfg, "pretruncate")
+		if getattr(getattr(app_cfg, 'pretokenize', None), 'enabled', False):
+			out["pretokenize"] = True
+		if "pretruncate" in out or "pretokenize" in out:
+			out["targets"] = [list(t) for t in pretruncation_targets(app_cfg)]
+		return out
+	if stage == "sentiment":
+		return _section(app_cfg, "sentiment", drop=("batch_size",))
+	if stage == "summarize":
+		return _section(app_cfg, "summarization")
+	if stage == "keywords":
+		return _section(app_cfg, "keywords")
+	if stage == "wordcloud":
+		return _section(app_cfg, "viz.wordcloud", drop=("num_proc",))
+	if stage == "write":
+		# The search index and facet rollup are written alongside the predictions
+		out = _section(app_cfg, "output")
+		if getattr(getattr(app_cfg, 'search', None), 'enabled', False):
+			out["search"] = True
+		if getattr(getattr(app_cfg, 'rollup', None), 'enabled', False):
+			out["rollup"] = _section(app_cfg, "rollup", drop=("wordclouds", "min_docs"))
+		return out
+	raise ValueError(f"Unknown stage: {stage}")
+
+
+def fingerprints(app_cfg, shard=None, shard_by: str = "hash") -> dict:
+	"""Fingerprint every stage from its config, code version and upstream fingerprints.
+
+	``shard`` is ``(shard_index, num_shards)`` when only one shard of the corpus is
+	processed, assigned by id hash or by the saved cost plan (``shard_by``).
+	"""
+	fps = {}
+	for stage in STAGES:
+		payload = {
+			"stage": stage,
+			"version": STAGE_VERSIONS[stage],
+			"config": stage_config(app_cfg, stage),
+			"deps": [fps[d] for d in STAGE_DEPS[stage]],
+		}
+		if stage == "load" and shard is not None:
+			payload["shard"] = list(shard)
+			payload["shard_by"] = shard_by
+		fps[stage] = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+	return fps
+
+
+class ArtifactStore:
+	"""Stage outputs under ``<root>/<stage>/<fingerprint>/`` with a ``manifest.json`` marking completion."""
+
+	def __init__(self, root: str):
+		self.root = root
+
+	def path(self, stage: str, fp: str) -> str:
+		return os.path.join(self.root, stage, fp)
+
+	def exists(self, stage: str, fp: str) -> bool:
+		return os.path.exists(os.path.join(self.path(stage, fp), "manifest.json"))
+
+	def begin(self, stage: str, fp: str) -> str:
+		path = self.path(stage, fp)
+		shutil.rmtree(path, ignore_errors=True)
+		Path(path).mkdir(parents=True, exist_ok=True)
+		return path
+
+	def commit(self, stage: str, fp: str, manifest: dict):
+		with open(os.path.join(self.path(stage, fp), "manifest.json"), "w") as f:
+			json.dump(manifest, f, indent=2)
+
+	def manifest(self, stage: str, fp: str) -> dict:
+		with open(os.path.join(self.path(stage, fp), "manifest.json")) as f:
+			return json.load(f)
+
+	def prune(self, stage: str, keep: str):
+		"""Drop artifacts of ``stage`` other than fingerprint ``keep``."""
+		for old in glob.glob(os.path.join(self.root, stage, "*")):
+			if os.path.basename(old) != keep:
+				shutil.rmtree(old, ignore_errors=True)
+
+
+def _save_json(path: str, obj):
+	with open(path, "w") as f:
+		json.dump(obj, f)
+
+
+def _load_json(path: str):
+	with open(path) as f:
+		return json.load(f)
+
+
+class StagedPipeline:
+	"""Runs load → clean → sentiment/summarize/keywords/wordcloud → write, reusing cached stage outputs."""
+
+	def __init__(self, app_cfg, exp_dir: str, cache_dir: str = None, shard=None, shard_by: str = "hash", plan_dir: str = None):
+		self.cfg = app_cfg
+		self.exp_dir = exp_dir
+		self.shard = shard
+		self.shard_by = shard_by
+		# Where shard_plan.json lives: the run directory above the shard folders
+		self.plan_dir = plan_dir or os.path.dirname(exp_dir)
+		cache_cfg = getattr(app_cfg, 'cache', None)
+		cache_dir = cache_dir or getattr(cache_cfg, 'dir', None) or os.path.join(app_cfg.paths.experiments_dir, "cache")
+		if shard is not None:
+			# Pruning keeps only the current fingerprint of a stage, so shards must not share a store
+			from mca_ai.shards import shard_dir
+			cache_dir = shard_dir(cache_dir, *shard)
+		self.store = ArtifactStore(cache_dir)
+		self.keep_old = getattr(cache_cfg, 'keep_old', False)
+		self.fps = fingerprints(app_cfg, shard, shard_by)
+		self.tracker = MemoryTracker()
+		self.guard = MemoryGuard(getattr(getattr(app_cfg, 'memory', None), 'ceiling_mb', None))
+		self._loaded = {}
+		self.ran = []
+
+	def _batches(self, *columns):
+		"""Arrow record batches of the cleaned test split, ``memory.chunk_size`` rows at a time."""
+		from mca_ai.data_loader import iter_record_batches
+		chunk = getattr(getattr(self.cfg, 'memory', None), 'chunk_size', 100)
+		for start, batch in iter_record_batches(self.output("clean")["test"], lambda: self.guard.batch_size(chunk), ["text", *[c for c in columns if c]]):
+			yield start, batch
+			# The caller has finished this chunk; resize the next one from what is left resident
+			self.guard.check()
+
+	def _token_column(self, model_name: str, max_length: int):
+		"""Name of the pre-tokenized ``input_ids`` column for a model, or None if it was not stored."""
+		from mca_ai.models.tokenized import token_columns
+		col = token_columns(model_name, max_length)[0]
+		return col if col in self.output("clean")["test"].column_names else None
+
+	def output(self, stage: str):
+		"""Return a stage's output, running the stage (and missing upstream stages) if needed."""
+		if stage in self._loaded:
+			return self._loaded[stage]
+		fp = self.fps[stage]
+		if not self.store.exists(stage, fp):
+			self.run_stage(stage)
+		path = self.store.path(stage, fp)
+		if stage in ("load", "clean"):
+			from datasets import load_from_disk
+			value = load_from_disk(os.path.join(path, "dataset"))
+		elif stage in ("sentiment", "summarize", "keywords"):
+			value = _load_json(os.path.join(path, "results.json"))
+		else:
+			value = self.store.manifest(stage, fp)
+		self._loaded[stage] = value
+		return value
+
+	def run_stage(self, stage: str):
+		fp = self.fps[stage]
+		print(f"▶ Running stage {stage} [{fp}]")
+		inputs = {d: self.output(d) for d in STAGE_DEPS[stage]}
+		path = self.store.begin(stage, fp)
+		with self.tracker.stage(stage), tracing.span(f"stage.{stage}"):
+			manifest = getattr(self, f"_run_{stage}")(path, inputs) or {}
+		manifest.update({"stage": stage, "fingerprint": fp, "config": stage_config(self.cfg, stage)})
+		self.store.commit(stage, fp, manifest)
+		if not self.keep_old:
+			self.store.prune(stage, fp)
+		self._loaded.pop(stage, None)
+		self.ran.append(stage)
+
+	def _run_load(self, path, inputs):
+		from mca_ai.data_loader import load_dataset_any
+		ds = load_dataset_any(self.cfg, clean=False)
+		if self.shard is not None:
+			from mca_ai.shards import cost_shard_plan, select_shard
+			plan = None
+			if self.shard_by == "cost":
+				from mca_ai.costmodel import build_cost_model
+				cost_model = build_cost_model(self.cfg)
+				if cost_model is None:
+					raise ValueError("--shard-by cost needs balance.enabled")
+				# The loaded text is not cleaned yet; a plan saved by another node is read back as is
+				text_column = "text" if "text" in ds["test"].column_names else self.cfg.data.text_field
+				plan = cost_shard_plan(self.plan_dir, ds["test"], self.shard[1], cost_model, text_column)
+			ds = select_shard(ds, *self.shard, plan=plan)
+		ds.save_to_disk(os.path.join(path, "dataset"))
+		return {"rows": {k: len(v) for k, v in ds.items()}}
+
+	def _run_clean(self, path, inputs):
+		from mca_ai.data_loader import clean_dataset
+		ds = clean_dataset(inputs["load"], self.cfg)
+		ds.save_to_disk(os.path.join(path, "dataset"))
+		return {"rows": {k: len(v) for k, v in ds.items()}}
+
+	def _run_sentiment(self, path, inputs):
+		from mca_ai.data_loader import batch_column
+		from mca_ai.models.cascade import SentimentCascade, build_sentiment_model, predict_sentiment, window_stats
+		cfg = self.cfg
+		ids_col = self._token_column(cfg.sentiment.model_name, cfg.sentiment.max_length)
+		sent = build_sentiment_model(cfg, self.output("clean")["train"])
+		labels = []
+		for _, batch in self._batches("sentiment_text", ids_col):
+			with tracing.span("sentiment.predict", docs=batch.num_rows):
+				input_ids = batch_column(batch, ids_col) if ids_col else None
+				labels.extend(predict_sentiment(sent, batch_column(batch, "sentiment_text"), self.guard.batch_size(cfg.sentiment.batch_size), input_ids)[0])
+		_save_json(os.path.join(path, "results.json"), labels)
+		stats = {"docs": len(labels)}
+		if isinstance(sent, SentimentCascade):
+			stats["cascade"] = sent.report()
+		windows = window_stats(sent)
+		if windows is not None:
+			stats["windowed"] = windows
+		return stats
+
+	def _run_summarize(self, path, inputs):
+		from mca_ai.data_loader import batch_column
+		from mca_ai.models.decoding import build_summarizer, summarize_chunk, summarizer_stats
+		sc = self.cfg.summarization
+		ids_col = self._token_column(sc.model_name, sc.max_input_length)
+		sumz = build_summarizer(self.cfg)
+		summaries = []
+		for start, batch in self._batches("summary_text", ids_col):
+			with tracing.span("summarizer.summarize", docs=batch.num_rows):
+				input_ids = batch_column(batch, ids_col) if ids_col else None
+				summaries.extend(summarize_chunk(sumz, batch_column(batch, "summary_text"), start, input_ids, self.guard.batch_size(getattr(sc, 'batch_size', 8))))
+		_save_json(os.path.join(path, "results.json"), summaries)
+		return {"docs": len(summaries), **summarizer_stats(sumz)}
+
+	def _run_keywords(self, path, inputs):
+		from mca_ai.data_loader import batch_column
+		from mca_ai.models.keywords import extract_keywords
+		keywords_list = []
+		for start, batch in self._batches():
+			for i, text in enumerate(batch_column(batch, "text"), start):
+				try:
+					with tracing.span("keywords.extract"):
+						keywords_list.append(list(extract_keywords(text, top_k=self.cfg.keywords.top_k)))
+				except Exception as e:
+					print(f"Error extracting keywords for text {i}: {e}")
+					keywords_list.append(None)
+		_save_json(os.path.join(path, "results.json"), keywords_list)
+		return {"docs": len(keywords_list)}
+
+	def _run_wordcloud(self, path, inputs):
+		from mca_ai.data_loader import batch_column
+		from mca_ai.viz.wordfreq import build_wordcloud_from_frequencies, count_terms_parallel
+		wc_cfg = self.cfg.viz.wordcloud
+		texts = (text for _, batch in self._batches() for text in batch_column(batch, "text"))
+		term_counts = count_terms_parallel(texts, num_proc=getattr(wc_cfg, 'num_proc', 1))
+		term_counts.save(os.path.join(path, "word_frequencies.json"))
+		wc = build_wordcloud_from_frequencies(term_counts, width=wc_cfg.width, height=wc_cfg.height, background_color=wc_cfg.background_color)
+		wc.to_file(os.path.join(path, "wordcloud.png"))
+		return {"files": ["word_frequencies.json", "wordcloud.png"]}
+
+	def _run_write(self, path, inputs):
+		from mca_ai.data_loader import batch_column
+		from mca_ai.output import batch_ids, open_prediction_writers
+		from mca_ai.rollup import batch_facets, build_rollup
+		from mca_ai.search import SearchIndex
+		extra = getattr(getattr(self.cfg, 'output', None), 'extra_columns', None) or []
+		writers = open_prediction_writers(self.cfg, path)
+		# Built in the artifact directory and published with the predictions
+		search_index = SearchIndex(os.path.join(path, "search.sqlite")) if getattr(getattr(self.cfg, 'search', None), 'enabled', False) else None
+		rollup = build_rollup(self.cfg)
+		available = self.output("clean")["test"].column_names
+		facet_columns = [c for c in rollup.columns() if c in available] if rollup is not None else []
+		files = [os.path.basename(w.path) for w in writers]
+		for start, batch in self._batches("id", *extra, *facet_columns):
+			end = start + batch.num_rows
+			records = {
+				"id": batch_ids(batch),
+				"text": batch.column("text"),
+				"sentiment": inputs["sentiment"][start:end],
+				"summary": inputs["summarize"][start:end],
+				"keywords": inputs["keywords"][start:end],
+				**{c: batch.column(c) for c in extra},
+			}
+			for writer in writers:
+				writer.write(records)
+			if search_index is not None:
+				search_index.add(records, extra)
+			if rollup is not None:
+				rollup.update(batch_facets(batch, facet_columns), batch_column(batch, "text"), records["sentiment"], records["keywords"])
+		for writer in writers:
+			writer.close()
+		if search_index is not None:
+			search_index.optimize()
+			search_index.close()
+			files.append("search.sqlite")
+		if rollup is not None:
+			rollup.save(os.path.join(path, "rollup.json"))
+			files.append("rollup.json")
+		return {"files": files}
+
+	def _publish(self, stage: str):
+		"""Copy a file-producing stage's outputs into the experiment directory."""
+		fp = self.fps[stage]
+		for name in self.store.manifest(stage, fp).get("files", []):
+			shutil.copyfile(os.path.join(self.store.path(stage, fp), name), os.path.join(self.exp_dir, name))
+			print(f"✓ Saved {os.path.join(self.exp_dir, name)}")
+
+	def run(self, stages=None, force=()):
+		"""Run ``stages`` (default: all), skipping those whose fingerprint already has an artifact."""
+		Path(self.exp_dir).mkdir(parents=True, exist_ok=True)
+		for stage in stages or STAGES:
+			if stage in force or not self.store.exists(stage, self.fps[stage]):
+				self.run_stage(stage)
+			else:
+				print(f"✓ Stage {stage} cached [{self.fps[stage]}]")
+			if stage in ("wordcloud", "write"):
+				self._publish(stage)
+		self.tracker.report()
+		return self.ran
+
+
+def main():
+	from mca_ai.config import load_config
+
+	parser = argparse.ArgumentParser(description="Run the MCA AI pipeline as cached stages")
+	parser.add_argument("--config", default="configs/default.yaml")
+	parser.add_argument("--stage", action="append", choices=STAGES, help="Run only this stage (repeatable); missing upstream stages run too")
+	parser.add_argument("--force", action="append", choices=STAGES, default=[], help="Re-run this stage even if cached")
+	parser.add_argument("--status", action="store_true", help="Show which stages are cached and exit")
+	args = parser.parse_args()
+
+	cfg = load_config(args.config)
+	tracing.configure(cfg)
+	exp_dir = os.path.join(cfg.paths.experiments_dir, "baseline")
+	pipeline = StagedPipeline(cfg, exp_dir)
+	if args.status:
+		for stage in STAGES:
+			state = "cached" if pipeline.store.exists(stage, pipeline.fps[stage]) else "to run"
+			print(f"{stage:<10} {pipeline.fps[stage]}  {state}")
+		return
+	ran = pipeline.run(args.stage, set(args.force))
+	tracing.finish(exp_dir)
+	print(f"\n🎉 Stages run: {', '.join(ran) if ran else 'none (all cached)'}")
+
+
+if __name__ == "__main__":
+	main()
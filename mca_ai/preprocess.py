@@ -1,4 +1,5 @@
 import html
+import math
 import re
 from typing import List
 
@@ -22,3 +23,82 @@ def clean_text(text: str) -> str:
 
 def batch_clean_text(texts: List[str]) -> List[str]:
 	return [clean_text(t) for t in texts]
+
+
+TRUNCATION_STRATEGIES = ("head", "tail", "head_tail")
+
+
+def _strategy(strategy: str, head_ratio: float) -> str:
+	"""``head_tail`` with nothing kept on one side is just ``head`` or ``tail``."""
+	if strategy != "head_tail":
+		return strategy
+	if not 0 <= head_ratio <= 1:
+		raise ValueError(f"head_ratio must be between 0 and 1, got {head_ratio}")
+	if head_ratio == 0:
+		return "tail"
+	if head_ratio == 1:
+		return "head"
+	return strategy
+
+
+def truncate_chars(text: str, budget: int, strategy: str = "head", head_ratio: float = 0.5) -> str:
+	"""Cut ``text`` to about ``budget`` characters on word boundaries.
+
+	``head`` keeps the start, ``tail`` the end and ``head_tail`` both, split by ``head_ratio``
+	(0 and 1 behave as ``tail`` and ``head``).
+	"""
+	strategy = _strategy(strategy, head_ratio)
+	if len(text) <= budget:
+		return text
+	if strategy == "head":
+		return text[:budget].rsplit(" ", 1)[0]
+	if strategy == "tail":
+		return text[len(text) - budget:].split(" ", 1)[-1]
+	if strategy == "head_tail":
+		head = int(budget * head_ratio)
+		return truncate_chars(text, head, "head") + " " + truncate_chars(text, budget - head, "tail")
+	raise ValueError(f"Unknown truncation strategy: {strategy}")
+
+
+def _quantile(values: List[float], q: float) -> float:
+	values = sorted(values)
+	return values[min(len(values) - 1, int(math.ceil(q * len(values))) - 1)]
+
+
+def estimate_char_budget(tokenizer, texts: List[str], max_tokens: int, strategy: str = "head", head_ratio: float = 0.5, quantile: float = 0.95, safety: float = 1.1, min_fill: float = 0.98):
+	"""Character budget after which cutting ``texts`` still leaves at least ``max_tokens`` tokens.
+
+	Measures, on the sample ``texts``, how many characters the first/last
+	``max_tokens`` tokens span, takes ``quantile`` of that times ``safety``,
+	then verifies by re-tokenizing the cut sample and widening the budget until
+	at least ``min_fill`` of the long texts still reach ``max_tokens``. Returns
+	``(budget, fill)``; budget is None when no sample text exceeds ``max_tokens``.
+	"""
+	strategy = _strategy(strategy, head_ratio)
+	needs = []
+	long_texts = []
+	for text in texts:
+		enc = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+		offsets = enc["offset_mapping"]
+		if len(offsets) <= max_tokens:
+			continue
+		long_texts.append(text)
+		if strategy == "head":
+			needs.append(offsets[max_tokens - 1][1])
+		elif strategy == "tail":
+			needs.append(len(text) - offsets[-max_tokens][0])
+		else:
+			# truncate_chars splits the budget by head_ratio, so scale each side's need back up
+			h = min(max(int(max_tokens * head_ratio), 1), max_tokens - 1)
+			needs.append(max(offsets[h - 1][1] / head_ratio, (len(text) - offsets[-(max_tokens - h)][0]) / (1 - head_ratio)))
+	if not needs:
+		return None, 1.0
+	budget = int(_quantile(needs, quantile) * safety)
+	for _ in range(5):
+		cut = [truncate_chars(t, budget, strategy, head_ratio) for t in long_texts]
+		lengths = [len(ids) for ids in tokenizer(cut, add_special_tokens=False)["input_ids"]]
+		fill = sum(n >= max_tokens for n in lengths) / len(lengths)
+		if fill >= min_fill:
+			break
+		budget = int(budget * 1.25)
+	return budget, fill
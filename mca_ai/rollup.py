@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import bisect
+import argparse
+import datetime
+from collections import Counter
+
+from mca_ai.viz.aggregates import LENGTH_EDGES
+from mca_ai.viz.wordfreq import TermCounter, count_terms
+
+
+DEFAULT_DIMENSIONS = ("stakeholder_type", "consultation_topic", "author_type")
+TIME_GRAINS = ("day", "week", "month")
+UNKNOWN = "unknown"
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def time_window(value, grain: str) -> str:
+	"""``YYYY-MM-DD`` / ``YYYY-Www`` / ``YYYY-MM`` bucket of an ISO-ish date string."""
+	try:
+		day = datetime.date.fromisoformat(str(value)[:10])
+	except (TypeError, ValueError):
+		return UNKNOWN
+	if grain == "day":
+		return day.isoformat()
+	if grain == "week":
+		year, week, _ = day.isocalendar()
+		return f"{year}-W{week:02d}"
+	return day.strftime("%Y-%m")
+
+
+class _Cell:
+	"""Running totals of one facet value: sentiment counts, lengths, keywords and (optionally) terms."""
+
+	__slots__ = ("docs", "sentiment", "length_sum", "lengths", "keywords", "terms")
+
+	def __init__(self, terms: bool = True):
+		self.docs = 0
+		self.sentiment = Counter()
+		self.length_sum = 0
+		self.lengths = [0] * len(LENGTH_EDGES)
+		self.keywords = Counter()
+		self.terms = Counter() if terms else None
+
+	def add(self, sentiment: str, length: int, keywords, terms: Counter = None):
+		self.docs += 1
+		self.sentiment[sentiment] += 1
+		self.length_sum += length
+		self.lengths[bisect.bisect_right(LENGTH_EDGES, length) - 1] += 1
+		if keywords:
+			self.keywords.update(keywords)
+		if self.terms is not None and terms:
+			self.terms.update(terms)
+
+	def merge(self, other: "_Cell"):
+		self.docs += other.docs
+		self.sentiment.update(other.sentiment)
+		self.length_sum += other.length_sum
+		self.lengths = [a + b for a, b in zip(self.lengths, other.lengths)]
+		self.keywords.update(other.keywords)
+		if self.terms is not None and other.terms is not None:
+			self.terms.update(other.terms)
+
+	def rows(self):
+		"""``(field, key, count)`` of every total; summing rows of two cells merges them."""
+		yield "docs", "", self.docs
+		yield "length_sum", "", self.length_sum
+		for label, n in self.sentiment.items():
+			yield "sentiment", str(label), n
+		for b, n in enumerate(self.lengths):
+			if n:
+				yield "lengths", str(b), n
+		for keyword, n in self.keywords.items():
+			yield "keywords", keyword, n
+		for term, n in (self.terms or {}).items():
+			yield "terms", term, n
+
+	def add_row(self, field: str, key: str, n: int):
+		if field == "docs":
+			self.docs += n
+		elif field == "length_sum":
+			self.length_sum += n
+		elif field == "lengths":
+			self.lengths[int(key)] += n
+		elif field == "terms":
+			if self.terms is None:
+				self.terms = Counter()
+			self.terms[key] += n
+		else:
+			getattr(self, field)[key] += n
+
+	def to_dict(self, max_terms: int) -> dict:
+		out = {
+			"docs": self.docs,
+			"sentiment": dict(self.sentiment),
+			"length_sum": self.length_sum,
+			"lengths": self.lengths,
+			"keywords": dict(self.keywords.most_common(max_terms)),
+		}
+		if self.terms is not None:
+			out["terms"] = dict(self.terms.most_common(max_terms))
+		return out
+
+	@classmethod
+	def from_dict(cls, data: dict) -> "_Cell":
+		cell = cls(terms="terms" in data)
+		cell.docs = data["docs"]
+		cell.sentiment = Counter(data["sentiment"])
+		cell.length_sum = data["length_sum"]
+		cell.lengths = list(data["lengths"])
+		cell.keywords = Counter(data["keywords"])
+		if cell.terms is not None:
+			cell.terms = Counter(data["terms"])
+		return cell
+
+
+class FacetRollup:
+	"""Sentiment counts, keyword and term frequencies and comment lengths per facet value,
+	updated chunk by chunk so reports never rescan the text.
+
+	Cells exist for every value of each dimension and each time window of
+	``date_column``, and for each dimension value x time window (trends; no term
+	tables there). Frequency tables are capped at ``max_terms`` when saved, so
+	counts in the long tail are approximate after incremental updates.
+	"""
+
+	def __init__(self, dimensions=DEFAULT_DIMENSIONS, date_column: str = "date", time_grains=("month",), max_terms: int = 5000):
+		self.dimensions = list(dimensions)
+		self.date_column = date_column
+		self.time_grains = list(time_grains)
+		self.max_terms = max_terms
+		self.cells = {}
+		self.docs = 0
+
+	def columns(self):
+		"""Input columns the rollup reads besides the text."""
+		return self.dimensions + ([self.date_column] if self.date_column else [])
+
+	def _cell(self, key, terms: bool) -> _Cell:
+		cell = self.cells.get(key)
+		if cell is None:
+			cell = self.cells[key] = _Cell(terms)
+		return cell
+
+	def update(self, facets: dict, texts, sentiments, keywords) -> int:
+		"""Fold one processed chunk in; ``facets`` maps column names to that chunk's values."""
+		n = len(texts)
+		dims = [(d, facets[d]) for d in self.dimensions if facets.get(d) is not None]
+		dates = facets.get(self.date_column) if self.date_column else None
+		for i in range(n):
+			text = texts[i] if isinstance(texts[i], str) else ""
+			terms = count_terms([text])
+			windows = [(g, time_window(dates[i], g)) for g in self.time_grains] if dates is not None else []
+			args = (sentiments[i], len(text), keywords[i])
+			self._cell(("all", "all"), True).add(*args, terms)
+			for dim, values in dims:
+				value = UNKNOWN if values[i] in (None, "") else str(values[i])
+				self._cell((dim, value), True).add(*args, terms)
+				for grain, window in windows:
+					self._cell((f"{dim}|{grain}", f"{value}|{window}"), False).add(*args)
+			for grain, window in windows:
+				self._cell((grain, window), True).add(*args, terms)
+		self.docs += n
+		return n
+
+	def merge(self, other: "FacetRollup") -> "FacetRollup":
+		"""Add another rollup's cells (e.g. another shard's) into this one."""
+		for key, cell in other.cells.items():
+			self._cell(key, cell.terms is not None).merge(cell)
+		self.docs += other.docs
+		return self
+
+	def rows(self):
+		"""``(dimension, value, field, key, count)`` rows of every cell, for stores that add counts up
+		row by row (``mca_ai.incremental`` upserts a chunk's rows instead of rewriting the rollup)."""
+		for (dim, value), cell in self.cells.items():
+			for field, key, n in cell.rows():
+				yield dim, value, field, key, n
+
+	def add_rows(self, rows) -> "FacetRollup":
+		"""Fold ``rows`` (as from ``rows``) in."""
+		for dim, value, field, key, n in rows:
+			# As in ``update``, only the dimension x time window trend cells have no term table
+			self._cell((dim, value), "|" not in dim).add_row(field, key, n)
+		cell = self.cells.get(("all", "all"))
+		self.docs = cell.docs if cell is not None else 0
+		return self
+
+	def corpus_terms(self) -> TermCounter:
+		"""Term frequencies of every document so far, from the ("all", "all") cell."""
+		cell = self.cells.get(("all", "all"))
+		return TermCounter(Counter(cell.terms) if cell is not None else Counter(), self.docs)
+
+	def facet(self, dimension: str) -> dict:
+		"""``{value: cell dict}`` for one dimension, time grain or ``dimension|grain`` trend."""
+		return {value: cell.to_dict(self.max_terms) for (dim, value), cell in sorted(self.cells.items()) if dim == dimension}
+
+	def to_dict(self) -> dict:
+		return {
+			"dimensions": self.dimensions,
+			"date_column": self.date_column,
+			"time_grains": self.time_grains,
+			"max_terms": self.max_terms,
+			"docs": self.docs,
+			"cells": [[dim, value, cell.to_dict(self.max_terms)] for (dim, value), cell in sorted(self.cells.items())],
+		}
+
+	@classmethod
+	def from_dict(cls, data: dict) -> "FacetRollup":
+		rollup = cls(data["dimensions"], data["date_column"], data["time_grains"], data["max_terms"])
+		rollup.docs = data["docs"]
+		rollup.cells = {(dim, value): _Cell.from_dict(cell) for dim, value, cell in data["cells"]}
+		return rollup
+
+	def save(self, path: str):
+		tmp_path = f"{path}.tmp"
+		with open(tmp_path, "w") as f:
+			json.dump(self.to_dict(), f)
+		os.replace(tmp_path, path)
+
+	@classmethod
+	def load(cls, path: str) -> "FacetRollup":
+		with open(path) as f:
+			return cls.from_dict(json.load(f))
+
+	def render_wordclouds(self, out_dir: str, width: int = 800, height: int = 400, background_color: str = "white", min_docs: int = 20) -> int:
+		"""One word cloud per facet value from its term table (values with fewer than ``min_docs`` are skipped)."""
+		from mca_ai.viz.wordfreq import build_wordcloud_from_frequencies
+
+		rendered = 0
+		for (dim, value), cell in sorted(self.cells.items()):
+			if cell.terms is None or dim == "all" or cell.docs < min_docs or not cell.terms:
+				continue
+			path = os.path.join(out_dir, dim, _UNSAFE.sub("_", value) + ".png")
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			try:
+				build_wordcloud_from_frequencies(cell.terms, width, height, background_color).to_file(path)
+				rendered += 1
+			except Exception as e:
+				print(f"Error generating word cloud for {dim}={value}: {e}")
+		return rendered
+
+
+def build_rollup(app_cfg, path: str = None):
+	"""``FacetRollup`` from ``rollup.*`` config (continuing ``path`` if it exists), or None when ``rollup.enabled`` is off."""
+	r_cfg = getattr(app_cfg, 'rollup', None)
+	if not getattr(r_cfg, 'enabled', False):
+		return None
+	if path and os.path.exists(path):
+		return FacetRollup.load(path)
+	return FacetRollup(
+		getattr(r_cfg, 'dimensions', None) or DEFAULT_DIMENSIONS,
+		getattr(r_cfg, 'date_column', 'date'),
+		getattr(r_cfg, 'time_grains', None) or ("month",),
+		getattr(r_cfg, 'max_terms', 5000),
+	)
+
+
+def batch_facets(batch, columns) -> dict:
+	"""Facet columns of an Arrow batch as Python lists (absent columns are left out)."""
+	return {c: batch.column(c).to_pylist() for c in columns if c in batch.column_names}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Print a facet of a saved rollup or render its per-facet word clouds")
+	parser.add_argument("rollup", nargs="?", default="experiments/baseline/rollup.json")
+	parser.add_argument("--facet", default="stakeholder_type", help="Dimension, time grain (e.g. month) or trend (e.g. stakeholder_type|month)")
+	parser.add_argument("--wordclouds", default=None, metavar="DIR", help="Render per-facet word clouds into DIR")
+	parser.add_argument("--min-docs", type=int, default=20)
+	args = parser.parse_args()
+
+	rollup = FacetRollup.load(args.rollup)
+	if args.wordclouds:
+		n = rollup.render_wordclouds(args.wordclouds, min_docs=args.min_docs)
+		print(f"✓ Rendered {n} facet word clouds into {args.wordclouds}")
+		return
+	print(f"{args.facet:<32}{'docs':>8}{'avg len':>10}  sentiment / top keywords")
+	for value, cell in rollup.facet(args.facet).items():
+		top = ", ".join(k for k, _ in Counter(cell["keywords"]).most_common(5))
+		print(f"{value:<32}{cell['docs']:>8}{cell['length_sum'] / max(cell['docs'], 1):>10.0f}  {cell['sentiment']}  {top}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import argparse
+from urllib.parse import parse_qs, urlparse
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+	rowid INTEGER PRIMARY KEY,
+	id TEXT UNIQUE NOT NULL,
+	sentiment TEXT,
+	confidence REAL,
+	length INTEGER,
+	text TEXT,
+	summary TEXT,
+	keywords TEXT,
+	meta TEXT
+);
+CREATE INDEX IF NOT EXISTS docs_sentiment ON docs (sentiment);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+	text, summary, keywords,
+	content='docs', content_rowid='rowid',
+	tokenize='porter unicode61'
+);
+"""
+
+# bm25 column weights: a hit in the keywords or summary says more than one in the body
+WEIGHTS = (1.0, 2.0, 4.0)
+
+_FTS_SYNTAX = re.compile(r'["*()]|\b(AND|OR|NOT|NEAR)\b')
+_TERM = re.compile(r"\w+")
+
+
+def fts_query(query: str) -> str:
+	"""Plain words become an implicit AND of quoted terms; FTS5 syntax (quotes, AND/OR/NOT, prefix*) passes through."""
+	if _FTS_SYNTAX.search(query):
+		return query
+	return " ".join(f'"{t}"' for t in _TERM.findall(query))
+
+
+def _values(column):
+	# Arrow columns from the writers' records, or plain lists
+	return column.to_pylist() if hasattr(column, "to_pylist") else list(column)
+
+
+class SearchIndex:
+	"""SQLite FTS5 index over cleaned text, summaries and keywords of analysed comments.
+
+	Sentiment, confidence, length and the ``output.extra_columns`` metadata are
+	plain columns for filtering. ``add`` is called once per written chunk and
+	upserts by document id, so re-runs and incremental drops keep it current.
+	"""
+
+	def __init__(self, path: str, readonly: bool = False):
+		self.path = path
+		if readonly:
+			self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+		else:
+			os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+			self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+			self.conn.execute("PRAGMA journal_mode=WAL")
+			self.conn.execute("PRAGMA synchronous=NORMAL")
+			self.conn.executescript(SCHEMA)
+
+	def close(self):
+		self.conn.close()
+
+	def add(self, records: dict, extra_columns=()) -> int:
+		"""Index one chunk of prediction records (the dict the prediction writers receive)."""
+		ids = [str(i) for i in _values(records["id"])]
+		texts = _values(records["text"])
+		confidence = records.get("confidence")
+		confidence = _values(confidence) if confidence is not None else [None] * len(ids)
+		meta = {c: _values(records[c]) for c in extra_columns if c in records}
+		rows = []
+		for i, doc_id in enumerate(ids):
+			text = texts[i] or ""
+			keywords = records["keywords"][i]
+			rows.append((
+				doc_id,
+				records["sentiment"][i],
+				confidence[i],
+				len(text),
+				text,
+				records["summary"][i],
+				" ; ".join(keywords) if keywords else "",
+				json.dumps({c: None if v[i] is None else str(v[i]) for c, v in meta.items()}),
+			))
+
+		self.conn.execute("BEGIN IMMEDIATE")
+		try:
+			for row in rows:
+				old = self.conn.execute("SELECT rowid, text, summary, keywords FROM docs WHERE id = ?", (row[0],)).fetchone()
+				if old is not None:
+					# External-content FTS5 tables must be told the old values before a row changes
+					self.conn.execute("INSERT INTO docs_fts (docs_fts, rowid, text, summary, keywords) VALUES ('delete', ?, ?, ?, ?)", old)
+					self.conn.execute("DELETE FROM docs WHERE rowid = ?", (old[0],))
+				cur = self.conn.execute(
+					"INSERT INTO docs (id, sentiment, confidence, length, text, summary, keywords, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row
+				)
+				self.conn.execute("INSERT INTO docs_fts (rowid, text, summary, keywords) VALUES (?, ?, ?, ?)", (cur.lastrowid, row[4], row[5], row[6]))
+			self.conn.execute("COMMIT")
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+		return len(rows)
+
+	def _where(self, query: str, sentiment=None, filters=None, min_confidence=None):
+		clauses, params = ["docs_fts MATCH ?"], [fts_query(query)]
+		if sentiment:
+			clauses.append("d.sentiment = ?")
+			params.append(sentiment)
+		if min_confidence is not None:
+			clauses.append("d.confidence >= ?")
+			params.append(min_confidence)
+		for key, value in (filters or {}).items():
+			clauses.append("json_extract(d.meta, ?) = ?")
+			params.extend([f'$."{key}"', str(value)])
+		return " AND ".join(clauses), params
+
+	def search(self, query: str, sentiment: str = None, filters: dict = None, min_confidence: float = None, page: int = 0, page_size: int = 20, with_text: bool = False) -> dict:
+		"""Ranked hits (best first) for ``query``, ``page_size`` per page, with a highlighted snippet each."""
+		t0 = time.perf_counter()
+		where, params = self._where(query, sentiment, filters, min_confidence)
+		text_col = ", d.text" if with_text else ""
+		rows = self.conn.execute(
+			f"SELECT d.id, d.sentiment, d.confidence, d.length, d.summary, d.keywords, d.meta, "
+			f"snippet(docs_fts, 0, '[', ']', '…', 16), bm25(docs_fts, {', '.join(map(str, WEIGHTS))}) AS score{text_col} "
+			f"FROM docs_fts JOIN docs d ON d.rowid = docs_fts.rowid WHERE {where} ORDER BY score LIMIT ? OFFSET ?",
+			params + [page_size, page * page_size],
+		).fetchall()
+		total = self.conn.execute(f"SELECT COUNT(*) FROM docs_fts JOIN docs d ON d.rowid = docs_fts.rowid WHERE {where}", params).fetchone()[0]
+		hits = []
+		for r in rows:
+			hit = {
+				"id": r[0],
+				"sentiment": r[1],
+				"confidence": r[2],
+				"length": r[3],
+				"summary": r[4],
+				"keywords": r[5].split(" ; ") if r[5] else [],
+				"meta": json.loads(r[6]) if r[6] else {},
+				"snippet": r[7],
+				"score": -r[8],
+			}
+			if with_text:
+				hit["text"] = r[9]
+			hits.append(hit)
+		return {"query": query, "total": total, "page": page, "page_size": page_size, "hits": hits, "ms": (time.perf_counter() - t0) * 1000}
+
+	def docs(self) -> int:
+		return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+	def optimize(self):
+		"""Merge the FTS segments written chunk by chunk; run once a run is done."""
+		self.conn.execute("INSERT INTO docs_fts (docs_fts) VALUES ('optimize')")
+
+
+def open_search_index(app_cfg, exp_dir: str):
+	"""``SearchIndex`` from ``search.*`` config, or None when ``search.enabled`` is off."""
+	s_cfg = getattr(app_cfg, 'search', None)
+	if not getattr(s_cfg, 'enabled', False):
+		return None
+	return SearchIndex(getattr(s_cfg, 'path', None) or os.path.join(exp_dir, "search.sqlite"))
+
+
+def serve(index_path: str, host: str = "127.0.0.1", port: int = 8765):
+	"""Local JSON endpoint: ``GET /api/search?q=audit+rotation&sentiment=negative&page=0&page_size=20``.
+
+	Any other query parameter filters on a metadata column (e.g. ``stakeholder_type=industry``).
+	"""
+	from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+	index = SearchIndex(index_path, readonly=True)
+	reserved = {"q", "sentiment", "page", "page_size", "min_confidence", "text"}
+
+	class Handler(BaseHTTPRequestHandler):
+		def do_GET(self):
+			url = urlparse(self.path)
+			if url.path != "/api/search":
+				self.send_error(404)
+				return
+			args = {k: v[0] for k, v in parse_qs(url.query).items()}
+			try:
+				result = index.search(
+					args.get("q", ""),
+					sentiment=args.get("sentiment"),
+					filters={k: v for k, v in args.items() if k not in reserved},
+					min_confidence=float(args["min_confidence"]) if "min_confidence" in args else None,
+					page=int(args.get("page", 0)),
+					page_size=min(int(args.get("page_size", 20)), 200),
+					with_text=args.get("text") == "1",
+				)
+				status = 200
+			except (sqlite3.OperationalError, ValueError) as e:
+				result, status = {"error": str(e)}, 400
+			body = json.dumps(result).encode("utf-8")
+			self.send_response(status)
+			self.send_header("Content-Type", "application/json")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+	server = ThreadingHTTPServer((host, port), Handler)
+	print(f"Serving {index_path} ({index.docs()} docs) at http://{host}:{port}/api/search")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		index.close()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Query or serve the full-text index of analysed comments")
+	parser.add_argument("--index", default="experiments/baseline/search.sqlite")
+	sub = parser.add_subparsers(dest="command", required=True)
+	p_query = sub.add_parser("query", help="Print ranked hits")
+	p_query.add_argument("q")
+	p_query.add_argument("--sentiment", default=None)
+	p_query.add_argument("--filter", action="append", default=[], metavar="COLUMN=VALUE", help="Metadata filter, repeatable")
+	p_query.add_argument("--page", type=int, default=0)
+	p_query.add_argument("--page-size", type=int, default=20)
+	p_serve = sub.add_parser("serve", help="Local JSON endpoint for the dashboard")
+	p_serve.add_argument("--host", default="127.0.0.1")
+	p_serve.add_argument("--port", type=int, default=8765)
+	args = parser.parse_args()
+
+	if args.command == "serve":
+		serve(args.index, args.host, args.port)
+		return
+	index = SearchIndex(args.index, readonly=True)
+	filters = dict(f.split("=", 1) for f in args.filter)
+	print(json.dumps(index.search(args.q, args.sentiment, filters, page=args.page, page_size=args.page_size), indent=2, ensure_ascii=False))
+	index.close()
+
+
+if __name__ == "__main__":
+	main()
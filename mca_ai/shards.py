@@ -0,0 +1,225 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from collections import Counter
+
+from mca_ai.output import source_ids
+from mca_ai.rollup import FacetRollup
+from mca_ai.viz.wordfreq import TermCounter, build_wordcloud_from_frequencies
+
+
+SHARD_MANIFEST = "shard.json"
+SHARD_PLAN = "shard_plan.json"
+
+
+def shard_of(doc_id, num_shards: int) -> int:
+	"""Shard of a document: a stable hash of its id, so the split is the same on every machine and run."""
+	digest = hashlib.sha1(str(doc_id).encode("utf-8")).digest()
+	return int.from_bytes(digest[:8], "big") % num_shards
+
+
+def _split_ids(split):
+	return [str(i) for i in source_ids(split)]
+
+
+def cost_shard_plan(exp_dir: str, split, num_shards: int, cost_model, text_column: str = "text") -> dict:
+	"""The frozen ``{doc id: shard}`` assignment of a cost-balanced run, computed once.
+
+	The first node (or ``python -m mca_ai.shards plan``) fits the cost model,
+	balances the test split longest-processing-time-first and saves the result
+	to ``shard_plan.json``; every other node and every re-run reads that file,
+	so later ledger updates cannot move documents between shards.
+	"""
+	from mca_ai.costmodel import balanced_assignment, split_tokens
+
+	path = os.path.join(exp_dir, SHARD_PLAN)
+	if not os.path.exists(path):
+		ids = _split_ids(split)
+		plan = {"num_shards": num_shards, "docs": len(ids), "assignment": dict(zip(ids, balanced_assignment(cost_model.costs(split_tokens(split, text_column)), num_shards)))}
+		os.makedirs(exp_dir, exist_ok=True)
+		tmp_path = f"{path}.{os.getpid()}.tmp"
+		with open(tmp_path, "w") as f:
+			json.dump(plan, f)
+		try:
+			# link() fails if another node saved its plan first; theirs wins
+			os.link(tmp_path, path)
+			print(f"✓ Saved shard plan: {path}")
+		except FileExistsError:
+			pass
+		finally:
+			os.remove(tmp_path)
+	with open(path) as f:
+		plan = json.load(f)
+	if plan["num_shards"] != num_shards:
+		raise ValueError(f"{path} was planned for {plan['num_shards']} shards, not {num_shards}; remove it to re-plan")
+	return plan
+
+
+def select_shard(ds, shard_index: int, num_shards: int, splits=("test",), plan=None):
+	"""Keep only this shard's documents in ``splits`` (the train split stays whole for cascade distillation).
+
+	Documents go to shards by a hash of their id, or by a saved ``plan``
+	(see ``cost_shard_plan``) for the test split.
+	"""
+	if not 0 <= shard_index < num_shards:
+		raise ValueError(f"shard index {shard_index} out of range for {num_shards} shards")
+
+	for name in splits:
+		if name in ds:
+			split = ds[name]
+			if plan is not None and name == "test":
+				assignment = plan["assignment"]
+				ids = _split_ids(split)
+				missing = sum(1 for i in ids if i not in assignment)
+				if missing:
+					raise ValueError(f"{missing} test documents are not in the shard plan; the dataset changed since it was planned")
+				keep = [row for row, doc_id in enumerate(ids) if assignment[doc_id] == shard_index]
+			else:
+				ids = source_ids(split)
+				keep = [row for row, doc_id in enumerate(ids) if shard_of(doc_id, num_shards) == shard_index]
+			# Rewrite the selection contiguously so Arrow batch slicing stays zero-copy
+			ds[name] = split.select(keep).flatten_indices()
+	return ds
+
+
+def shard_dir(exp_dir: str, shard_index: int, num_shards: int) -> str:
+	return os.path.join(exp_dir, f"shard-{shard_index:05d}-of-{num_shards:05d}")
+
+
+def mark_shard_done(out_dir: str, shard_index: int, num_shards: int, docs: int, sentiment_counts=None):
+	"""Written last, so a shard without it is known to be incomplete and can be re-run alone."""
+	with open(os.path.join(out_dir, SHARD_MANIFEST), "w") as f:
+		json.dump({"shard_index": shard_index, "num_shards": num_shards, "docs": docs, "sentiment_counts": dict(sentiment_counts or {})}, f, indent=2)
+
+
+def _sum_counts(total: dict, stats: dict):
+	"""Add integer counters (recursively); ratios and settings are not additive and are left out."""
+	for key, value in stats.items():
+		if isinstance(value, bool):
+			continue
+		if isinstance(value, int):
+			total[key] = total.get(key, 0) + value
+		elif isinstance(value, dict):
+			_sum_counts(total.setdefault(key, {}), value)
+	return total
+
+
+def _merge_csv(paths, out_path: str):
+	# Shard files share the header; copy the first one whole and the rest without it
+	with open(out_path, "wb") as out:
+		for n, path in enumerate(paths):
+			with open(path, "rb") as f:
+				if n:
+					f.readline()
+				shutil.copyfileobj(f, out)
+
+
+def _merge_parquet(paths, out_path: str):
+	import pyarrow.parquet as pq
+
+	writer = None
+	for path in paths:
+		pf = pq.ParquetFile(path)
+		if writer is None:
+			writer = pq.ParquetWriter(out_path, pf.schema_arrow, compression="zstd")
+		for i in range(pf.num_row_groups):
+			writer.write_table(pf.read_row_group(i))
+	if writer is not None:
+		writer.close()
+
+
+def merge_shards(exp_dir: str, num_shards: int, out_dir: str = None, wordcloud_size=(800, 400), background_color: str = "white") -> dict:
+	"""Combine the outputs of all shards under ``exp_dir`` into ``out_dir`` (default ``exp_dir``).
+
+	Refuses to merge while any shard lacks its ``shard.json``, listing the
+	shards to re-run.
+	"""
+	out_dir = out_dir or exp_dir
+	os.makedirs(out_dir, exist_ok=True)
+	dirs = [shard_dir(exp_dir, i, num_shards) for i in range(num_shards)]
+	missing = [i for i, d in enumerate(dirs) if not os.path.exists(os.path.join(d, SHARD_MANIFEST))]
+	if missing:
+		raise RuntimeError(f"Shards not finished: {missing}; re-run them with --shard-index <i> --num-shards {num_shards}")
+
+	manifests = []
+	for d in dirs:
+		with open(os.path.join(d, SHARD_MANIFEST)) as f:
+			manifests.append(json.load(f))
+
+	for name, merge in (("predictions.csv", _merge_csv), ("predictions.parquet", _merge_parquet)):
+		paths = [os.path.join(d, name) for d in dirs if os.path.exists(os.path.join(d, name))]
+		if paths:
+			merge(paths, os.path.join(out_dir, name))
+			print(f"✓ Merged {len(paths)} x {name}")
+
+	term_counts = TermCounter()
+	for d in dirs:
+		path = os.path.join(d, "word_frequencies.json")
+		if os.path.exists(path):
+			term_counts.merge(TermCounter.load(path))
+	if term_counts.docs:
+		term_counts.save(os.path.join(out_dir, "word_frequencies.json"))
+		try:
+			wc = build_wordcloud_from_frequencies(term_counts, wordcloud_size[0], wordcloud_size[1], background_color)
+			wc.to_file(os.path.join(out_dir, "wordcloud.png"))
+			print("✓ Rendered merged word cloud")
+		except Exception as e:
+			print(f"Error generating word cloud: {e}")
+
+	rollup_paths = [os.path.join(d, "rollup.json") for d in dirs if os.path.exists(os.path.join(d, "rollup.json"))]
+	if rollup_paths:
+		rollup = FacetRollup.load(rollup_paths[0])
+		for path in rollup_paths[1:]:
+			rollup.merge(FacetRollup.load(path))
+		rollup.save(os.path.join(out_dir, "rollup.json"))
+		n = rollup.render_wordclouds(os.path.join(out_dir, "wordclouds"), wordcloud_size[0], wordcloud_size[1], background_color)
+		print(f"✓ Merged {len(rollup_paths)} x rollup.json ({n} facet word clouds)")
+
+	sentiment_counts = Counter()
+	for m in manifests:
+		sentiment_counts.update(m.get("sentiment_counts", {}))
+	stage_stats = {}
+	for d in dirs:
+		for name in sorted(os.listdir(d)):
+			if name.endswith("_stats.json") or name == "sentiment_windows.json":
+				with open(os.path.join(d, name)) as f:
+					_sum_counts(stage_stats.setdefault(name, {}), json.load(f))
+	summary = {
+		"num_shards": num_shards,
+		"docs": sum(m["docs"] for m in manifests),
+		"docs_per_shard": [m["docs"] for m in manifests],
+		"sentiment_counts": dict(sentiment_counts),
+		"stage_stats": stage_stats,
+	}
+	with open(os.path.join(out_dir, "summary_stats.json"), "w") as f:
+		json.dump(summary, f, indent=2)
+	print(f"✓ Merged {num_shards} shards ({summary['docs']} docs) into {out_dir}")
+	return summary
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Merge per-shard outputs of project.py --shard-index/--num-shards")
+	parser.add_argument("command", nargs="?", choices=("merge", "plan"), default="merge", help="plan: save the cost-balanced shard plan before starting any node")
+	parser.add_argument("--exp-dir", default="experiments/baseline", help="Directory holding the shard-XXXXX-of-YYYYY folders")
+	parser.add_argument("--num-shards", type=int, required=True)
+	parser.add_argument("--out", default=None, help="Output directory (default: --exp-dir)")
+	parser.add_argument("--config", default="configs/default.yaml", help="Config for plan (needs balance.enabled)")
+	args = parser.parse_args()
+	if args.command == "plan":
+		from mca_ai.config import load_config
+		from mca_ai.costmodel import build_cost_model
+		from mca_ai.data_loader import load_dataset_any
+
+		cfg = load_config(args.config)
+		cost_model = build_cost_model(cfg)
+		if cost_model is None:
+			raise SystemExit("Cost-balanced sharding needs balance.enabled")
+		cost_shard_plan(args.exp_dir, load_dataset_any(cfg)["test"], args.num_shards, cost_model)
+		return
+	merge_shards(args.exp_dir, args.num_shards, args.out)
+
+
+if __name__ == "__main__":
+	main()
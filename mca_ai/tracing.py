@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import threading
+
+
+class _NullSpan:
+	"""Shared no-op span returned while tracing is disabled."""
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+	def add_bytes(self, n: int):
+		pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+	def __init__(self, tracer, name: str, args: dict):
+		self.tracer = tracer
+		self.name = name
+		self.args = args
+		self.bytes = 0
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc):
+		self.tracer._record(self, time.perf_counter() - self.start)
+		return False
+
+	def add_bytes(self, n: int):
+		self.bytes += n
+
+
+class Tracer:
+	"""Collects spans and counters; all methods are cheap no-ops unless enabled."""
+
+	def __init__(self):
+		self.enabled = False
+		self._lock = threading.Lock()
+		self._origin = time.perf_counter()
+		self.events = []
+		self.stats = {}
+		self.counters = {}
+
+	def enable(self):
+		self.enabled = True
+		self._origin = time.perf_counter()
+
+	def span(self, name: str, **args):
+		if not self.enabled:
+			return _NULL_SPAN
+		return _Span(self, name, args)
+
+	def count(self, name: str, value: int = 1):
+		if not self.enabled:
+			return
+		with self._lock:
+			self.counters[name] = self.counters.get(name, 0) + value
+
+	def _record(self, span: _Span, duration: float):
+		event = {
+			"name": span.name,
+			"ph": "X",
+			"ts": (span.start - self._origin) * 1e6,
+			"dur": duration * 1e6,
+			"pid": os.getpid(),
+			"tid": threading.get_ident(),
+		}
+		if span.args or span.bytes:
+			event["args"] = dict(span.args, bytes=span.bytes)
+		with self._lock:
+			self.events.append(event)
+			st = self.stats.setdefault(span.name, {"calls": 0, "seconds": 0.0, "bytes": 0})
+			st["calls"] += 1
+			st["seconds"] += duration
+			st["bytes"] += span.bytes
+
+	def export_chrome_trace(self, path: str):
+		"""Write events in the Chrome trace format (chrome://tracing, Perfetto)."""
+		with open(path, "w") as f:
+			json.dump({"traceEvents": self.events, "otherData": {"counters": self.counters}}, f)
+
+	def summary_rows(self):
+		return sorted(
+			({"stage": name, **st} for name, st in self.stats.items()),
+			key=lambda r: r["seconds"], reverse=True,
+		)
+
+	def print_summary(self):
+		print(f"\n{'stage':<28}{'time (s)':>12}{'calls':>10}{'bytes':>14}")
+		for r in self.summary_rows():
+			print(f"{r['stage']:<28}{r['seconds']:>12.3f}{r['calls']:>10}{r['bytes']:>14}")
+		for name, value in sorted(self.counters.items()):
+			print(f"  {name}: {value}")
+
+
+tracer = Tracer()
+span = tracer.span
+count = tracer.count
+
+
+def configure(app_cfg=None):
+	"""Enable tracing from ``cfg.tracing.enabled`` or the ``MCA_TRACE`` environment variable."""
+	tracing_cfg = getattr(app_cfg, 'tracing', None)
+	if os.environ.get("MCA_TRACE") or getattr(tracing_cfg, 'enabled', False):
+		tracer.enable()
+	return tracer.enabled
+
+
+def finish(out_dir: str):
+	"""Export ``trace.json`` and ``trace_summary.json`` to ``out_dir`` and print the stage table."""
+	if not tracer.enabled:
+		return None
+	trace_path = os.path.join(out_dir, "trace.json")
+	tracer.export_chrome_trace(trace_path)
+	with open(os.path.join(out_dir, "trace_summary.json"), "w") as f:
+		json.dump({"stages": tracer.summary_rows(), "counters": tracer.counters}, f, indent=2)
+	tracer.print_summary()
+	print(f"✓ Saved trace: {trace_path}")
+	return trace_path
+
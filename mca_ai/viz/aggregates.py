@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import bisect
+import argparse
+from collections import Counter
+
+from mca_ai.output import KEYWORD_ERROR
+
+
+AGGREGATES_DIR = "aggregates"
+DOCUMENTS_FILE = "documents.parquet"
+SUMMARY_FILE = "aggregates.json"
+
+# Comment length bins in characters (the last bin is open-ended)
+LENGTH_EDGES = [0, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+
+# Label for documents without a predicted sentiment
+UNKNOWN = "unknown"
+
+# Columns a document table view needs; ``text`` is only read when asked for
+LIST_COLUMNS = ["id", "sentiment", "confidence", "length", "summary", "keywords"]
+
+
+def _prediction_batches(exp_dir: str, batch_rows: int = 10000):
+	"""Stream ``predictions.parquet`` (or ``predictions.csv``) as Arrow record batches."""
+	import pyarrow as pa
+	import pyarrow.compute as pc
+
+	parquet_path = os.path.join(exp_dir, "predictions.parquet")
+	if os.path.exists(parquet_path):
+		import pyarrow.parquet as pq
+
+		for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=batch_rows):
+			if pa.types.is_dictionary(batch.schema.field("sentiment").type):
+				batch = batch.set_column(batch.schema.get_field_index("sentiment"), "sentiment", batch.column("sentiment").cast(pa.string()))
+			yield batch
+		return
+
+	import pyarrow.csv as pcsv
+
+	csv_path = os.path.join(exp_dir, "predictions.csv")
+	convert = pcsv.ConvertOptions(column_types={"id": pa.string(), "text": pa.string(), "summary": pa.string(), "keywords": pa.string()})
+	for batch in pcsv.open_csv(csv_path, read_options=pcsv.ReadOptions(block_size=1 << 24), convert_options=convert):
+		# The CSV joins keywords with "; "; turn them back into lists, and failed
+		# extractions (written as the error marker) into nulls as in the parquet file
+		raw = batch.column("keywords")
+		keywords = pc.split_pattern(pc.fill_null(raw, ""), "; ")
+		keywords = pc.if_else(pc.equal(raw, KEYWORD_ERROR), pa.scalar(None, keywords.type), keywords)
+		batch = batch.set_column(batch.schema.get_field_index("keywords"), "keywords", keywords)
+		# pandas writes a missing sentiment as an empty string
+		sentiment = batch.column("sentiment").cast(pa.string())
+		sentiment = pc.if_else(pc.equal(sentiment, ""), pa.scalar(None, pa.string()), sentiment)
+		yield batch.set_column(batch.schema.get_field_index("sentiment"), "sentiment", sentiment)
+
+
+def _documents(batch, mask=None):
+	"""The stored document columns of ``batch`` (filtered by ``mask``)."""
+	import pyarrow as pa
+	import pyarrow.compute as pc
+
+	table = pa.Table.from_batches([batch])
+	if mask is not None:
+		table = table.filter(mask)
+	confidence = table.column("confidence").cast(pa.float32()) if "confidence" in table.column_names else pa.nulls(table.num_rows, pa.float32())
+	return pa.table({
+		"id": table.column("id").cast(pa.string()),
+		"sentiment": table.column("sentiment"),
+		"confidence": confidence,
+		"length": pc.utf8_length(table.column("text")).cast(pa.int32()),
+		"summary": table.column("summary"),
+		"keywords": table.column("keywords"),
+		"text": table.column("text"),
+	})
+
+
+def _concat(tables):
+	import pyarrow as pa
+
+	return tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+
+def build_aggregates(exp_dir: str, out_dir: str = None, page_size: int = 200, top_keywords: int = 500) -> dict:
+	"""Precompute what the dashboard shows from ``exp_dir``'s predictions.
+
+	Writes ``aggregates.json`` (sentiment counts, keyword frequencies, length
+	histograms overall and per sentiment) and ``documents.parquet``: documents
+	grouped by sentiment, one row group per page, so a page of any view is a
+	single column-pruned row-group read. Predictions are streamed once; full
+	pages are spilled to one temporary file per sentiment, which are then
+	concatenated. Rows without a sentiment are grouped under ``"unknown"``.
+	"""
+	import pyarrow.compute as pc
+	import pyarrow.parquet as pq
+
+	out_dir = out_dir or os.path.join(exp_dir, AGGREGATES_DIR)
+	os.makedirs(out_dir, exist_ok=True)
+	t0 = time.perf_counter()
+
+	sentiment_counts = Counter()
+	keyword_counts = Counter()
+	bins = len(LENGTH_EDGES)
+	histogram = {"all": [0] * bins}
+	spills, pending, buffered = {}, {}, Counter()
+
+	def spill(label, table):
+		if label not in spills:
+			part_path = os.path.join(out_dir, f"{DOCUMENTS_FILE}.{len(spills)}.tmp")
+			spills[label] = (part_path, pq.ParquetWriter(part_path, table.schema, compression="zstd"))
+		spills[label][1].write_table(table, row_group_size=page_size)
+
+	for batch in _prediction_batches(exp_dir):
+		column = pc.fill_null(batch.column("sentiment"), UNKNOWN)
+		batch = batch.set_column(batch.schema.get_field_index("sentiment"), "sentiment", column)
+		sentiments = column.to_pylist()
+		lengths = pc.utf8_length(batch.column("text")).to_pylist()
+		sentiment_counts.update(sentiments)
+		for keywords in batch.column("keywords").to_pylist():
+			keyword_counts.update(k for k in keywords or [] if k)
+		for label, n in zip(sentiments, lengths):
+			b = bisect.bisect_right(LENGTH_EDGES, n or 0) - 1
+			histogram["all"][b] += 1
+			histogram.setdefault(label, [0] * bins)[b] += 1
+
+		docs = _documents(batch)
+		for label in pc.unique(column).to_pylist():
+			pending.setdefault(label, []).append(docs.filter(pc.equal(column, label)))
+			buffered[label] += pending[label][-1].num_rows
+			# Only whole pages are spilled so each label's file holds page-aligned row groups
+			if buffered[label] >= page_size:
+				table = _concat(pending[label])
+				full = buffered[label] // page_size * page_size
+				spill(label, table.slice(0, full))
+				pending[label], buffered[label] = [table.slice(full)], buffered[label] - full
+	for label, tables in pending.items():
+		if buffered[label]:
+			spill(label, _concat(tables))
+
+	# Sections in label order, each starting on a fresh row group
+	tmp_path = os.path.join(out_dir, f"{DOCUMENTS_FILE}.tmp")
+	writer, sections, row, groups = None, {}, 0, 0
+	for label in sorted(spills):
+		part_path, part_writer = spills[label]
+		part_writer.close()
+		part = pq.ParquetFile(part_path)
+		if writer is None:
+			writer = pq.ParquetWriter(tmp_path, part.schema_arrow, compression="zstd")
+		sections[label] = {"start": row, "docs": sentiment_counts[label], "first_page": groups}
+		for group in range(part.num_row_groups):
+			writer.write_table(part.read_row_group(group), row_group_size=page_size)
+		row += sentiment_counts[label]
+		groups += part.num_row_groups
+		os.remove(part_path)
+	if writer is not None:
+		writer.close()
+		os.replace(tmp_path, os.path.join(out_dir, DOCUMENTS_FILE))
+
+	summary = {
+		"docs": sum(sentiment_counts.values()),
+		"sentiment_counts": dict(sentiment_counts),
+		"keywords": keyword_counts.most_common(top_keywords),
+		"length_histogram": {"edges": LENGTH_EDGES, "counts": histogram},
+		"page_size": page_size,
+		"sections": sections,
+		"built": time.time(),
+		"build_seconds": time.perf_counter() - t0,
+	}
+	with open(os.path.join(out_dir, SUMMARY_FILE), "w") as f:
+		json.dump(summary, f)
+	print(f"✓ Built dashboard aggregates for {summary['docs']} docs in {summary['build_seconds']:.1f}s: {out_dir}")
+	return summary
+
+
+class AggregateStore:
+	"""Read side for the dashboard: everything is loaded on first use and cached.
+
+	Counts and histograms come from ``aggregates.json``; ``page`` reads one row
+	group of ``documents.parquet`` with only the requested columns.
+	"""
+
+	def __init__(self, agg_dir: str):
+		self.agg_dir = agg_dir
+		self._summary = None
+		self._file = None
+
+	@property
+	def summary(self) -> dict:
+		if self._summary is None:
+			with open(os.path.join(self.agg_dir, SUMMARY_FILE)) as f:
+				self._summary = json.load(f)
+		return self._summary
+
+	@property
+	def documents(self):
+		if self._file is None:
+			import pyarrow.parquet as pq
+
+			self._file = pq.ParquetFile(os.path.join(self.agg_dir, DOCUMENTS_FILE))
+		return self._file
+
+	def sentiment_counts(self) -> dict:
+		return self.summary["sentiment_counts"]
+
+	def top_keywords(self, n: int = 50):
+		return self.summary["keywords"][:n]
+
+	def length_histogram(self, sentiment: str = None):
+		"""``(edges, counts)`` over all documents or one sentiment."""
+		hist = self.summary["length_histogram"]
+		return hist["edges"], hist["counts"].get(sentiment or "all", [0] * len(hist["edges"]))
+
+	def num_pages(self, sentiment: str = None) -> int:
+		size = self.summary["page_size"]
+		if sentiment is None:
+			return sum(-(-s["docs"] // size) for s in self.summary["sections"].values())
+		section = self.summary["sections"].get(sentiment)
+		return -(-section["docs"] // size) if section else 0
+
+	def page(self, page: int = 0, sentiment: str = None, columns=None) -> list:
+		"""Documents of one page as a list of dicts, ``columns`` defaulting to everything but ``text``."""
+		columns = list(columns or LIST_COLUMNS)
+		if sentiment is None:
+			# The "all" view walks the sentiment sections in order
+			group = page
+		else:
+			section = self.summary["sections"].get(sentiment)
+			if section is None or page >= self.num_pages(sentiment):
+				return []
+			group = section["first_page"] + page
+		if not 0 <= group < self.documents.num_row_groups:
+			return []
+		return self.documents.read_row_group(group, columns=columns).to_pylist()
+
+	def document(self, doc_id: str, columns=None):
+		"""One document by id (full text included by default); scans the id column only."""
+		import pyarrow.compute as pc
+
+		ids = self.documents.read(columns=["id"]).column("id")
+		hits = pc.index(ids, str(doc_id)).as_py()
+		if hits < 0:
+			return None
+		columns = list(columns or LIST_COLUMNS + ["text"])
+		offset = 0
+		for group in range(self.documents.num_row_groups):
+			n = self.documents.metadata.row_group(group).num_rows
+			if hits < offset + n:
+				return self.documents.read_row_group(group, columns=columns).slice(hits - offset, 1).to_pylist()[0]
+			offset += n
+		return None
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Precompute dashboard aggregates from a run's predictions, or query them")
+	parser.add_argument("exp_dir", nargs="?", default="experiments/baseline")
+	parser.add_argument("--out", default=None, help=f"Aggregates directory (default: <exp_dir>/{AGGREGATES_DIR})")
+	parser.add_argument("--page-size", type=int, default=200)
+	parser.add_argument("--query", action="store_true", help="Print counts and the first page instead of building")
+	parser.add_argument("--sentiment", default=None)
+	parser.add_argument("--page", type=int, default=0)
+	args = parser.parse_args()
+
+	agg_dir = args.out or os.path.join(args.exp_dir, AGGREGATES_DIR)
+	if not args.query:
+		build_aggregates(args.exp_dir, agg_dir, args.page_size)
+		return
+	store = AggregateStore(agg_dir)
+	t0 = time.perf_counter()
+	rows = store.page(args.page, args.sentiment)
+	print(json.dumps({
+		"sentiment_counts": store.sentiment_counts(),
+		"top_keywords": store.top_keywords(10),
+		"pages": store.num_pages(args.sentiment),
+		"page": rows[:3],
+		"ms": (time.perf_counter() - t0) * 1000,
+	}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,120 @@
+import re
+import json
+import argparse
+from collections import Counter
+from multiprocessing import Pool
+
+try:
+	from wordcloud import STOPWORDS
+except ImportError:
+	STOPWORDS = set()
+
+
+# Same token pattern WordCloud.process_text uses by default
+_WORD = re.compile(r"\w[\w']+")
+
+
+def count_terms(texts, stopwords=None) -> Counter:
+	"""Count terms across ``texts`` the way WordCloud tokenizes a single string."""
+	stopwords = STOPWORDS if stopwords is None else stopwords
+	counts = Counter()
+	for text in texts:
+		if not isinstance(text, str):
+			continue
+		for word in _WORD.findall(text.lower()):
+			if word.endswith("'s"):
+				word = word[:-2]
+			if word not in stopwords and not word.isdigit():
+				counts[word] += 1
+	return counts
+
+
+def _iter_chunks(texts, chunk_size: int):
+	chunk = []
+	for text in texts:
+		chunk.append(text)
+		if len(chunk) >= chunk_size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+class TermCounter:
+	"""Incrementally accumulated corpus term frequencies."""
+
+	def __init__(self, counts: Counter = None, docs: int = 0):
+		self.counts = counts if counts is not None else Counter()
+		self.docs = docs
+
+	def update(self, texts):
+		texts = list(texts)
+		self.counts.update(count_terms(texts))
+		self.docs += len(texts)
+		return self
+
+	def merge(self, other: "TermCounter"):
+		self.counts.update(other.counts)
+		self.docs += other.docs
+		return self
+
+	def most_common(self, n: int = None):
+		return self.counts.most_common(n)
+
+	def save(self, path: str, max_terms: int = None):
+		"""Save the frequency table so the cloud can be re-rendered without rescanning."""
+		with open(path, "w") as f:
+			json.dump({"docs": self.docs, "frequencies": dict(self.counts.most_common(max_terms))}, f)
+
+	@classmethod
+	def load(cls, path: str) -> "TermCounter":
+		with open(path) as f:
+			data = json.load(f)
+		return cls(Counter(data["frequencies"]), data.get("docs", 0))
+
+
+def _count_chunk(chunk):
+	return count_terms(chunk), len(chunk)
+
+
+def count_terms_parallel(texts, num_proc: int = 1, chunk_size: int = 1000) -> TermCounter:
+	"""Count terms chunk by chunk, fanning chunks out to ``num_proc`` processes and merging."""
+	total = TermCounter()
+	if num_proc <= 1:
+		for chunk in _iter_chunks(texts, chunk_size):
+			total.update(chunk)
+		return total
+	with Pool(num_proc) as pool:
+		for chunk_counts, n in pool.imap_unordered(_count_chunk, _iter_chunks(texts, chunk_size)):
+			total.merge(TermCounter(chunk_counts, n))
+	return total
+
+
+def build_wordcloud_from_frequencies(frequencies, width: int = 800, height: int = 400, background_color: str = "white", max_words: int = 200):
+	"""Render a WordCloud from a term->count mapping, a Counter or a TermCounter."""
+	from wordcloud import WordCloud
+
+	if isinstance(frequencies, TermCounter):
+		frequencies = frequencies.counts
+	top = dict(Counter(frequencies).most_common(max_words))
+	wc = WordCloud(width=width, height=height, background_color=background_color, max_words=max_words)
+	return wc.generate_from_frequencies(top)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Re-render a word cloud from a saved frequency table")
+	parser.add_argument("frequencies", help="word_frequencies.json written by the pipeline")
+	parser.add_argument("output", help="PNG path")
+	parser.add_argument("--width", type=int, default=800)
+	parser.add_argument("--height", type=int, default=400)
+	parser.add_argument("--background-color", default="white")
+	parser.add_argument("--max-words", type=int, default=200)
+	args = parser.parse_args()
+
+	wc = build_wordcloud_from_frequencies(TermCounter.load(args.frequencies), args.width, args.height, args.background_color, args.max_words)
+	wc.to_file(args.output)
+	print(f"✓ Saved word cloud: {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,334 @@
+import gc
+import os
+import time
+import multiprocessing as mp
+from collections import deque
+
+from mca_ai.config import load_config
+from mca_ai.data_loader import batch_column
+from mca_ai.memory import memory_breakdown_mb
+from mca_ai.models.cascade import SentimentCascade, build_sentiment_model, predict_sentiment, window_stats
+from mca_ai.models.decoding import build_summarizer, summarize_chunk, summarizer_stats
+
+
+# Per-process state of a replica, filled by _init_worker
+_REPLICA = {}
+
+
+def available_cpus():
+	"""CPUs this process may run on (respects cgroup/taskset limits where the OS exposes them)."""
+	if hasattr(os, "sched_getaffinity"):
+		return sorted(os.sched_getaffinity(0))
+	return list(range(os.cpu_count() or 1))
+
+
+def plan_topology(replicas: int, intra_op_threads: int = None, pin_cpus: bool = True):
+	"""Intra-op thread count and the CPU set each replica is pinned to (None when not pinning).
+
+	By default the available cores are split evenly, so ``replicas * intra_op_threads``
+	equals the core count. CPU sets are contiguous and wrap around when the
+	requested threads exceed the cores.
+	"""
+	cpus = available_cpus()
+	intra = intra_op_threads or max(1, len(cpus) // replicas)
+	if not pin_cpus:
+		return intra, [None] * replicas
+	sets = [[cpus[(r * intra + k) % len(cpus)] for k in range(min(intra, len(cpus)))] for r in range(replicas)]
+	return intra, sets
+
+
+def check_oversubscription(replicas: int, intra_op_threads: int, inter_op_threads: int = 1, map_num_proc: int = 1) -> list:
+	"""Print and return warnings when the configured thread pools exceed the available cores."""
+	cores = len(available_cpus())
+	warnings = []
+	threads = replicas * (intra_op_threads + max(inter_op_threads - 1, 0))
+	if threads > cores:
+		warnings.append(f"{replicas} replicas x ({intra_op_threads} intra-op + {inter_op_threads} inter-op) threads = {threads} > {cores} cores")
+	if replicas > 1 and os.environ.get("TOKENIZERS_PARALLELISM", "").lower() in ("1", "true"):
+		warnings.append("TOKENIZERS_PARALLELISM=true with several replicas: every replica's tokenizer spawns a pool over all cores")
+	if map_num_proc > 1 and os.environ.get("TOKENIZERS_PARALLELISM", "").lower() not in ("0", "false"):
+		warnings.append(f"datasets.map(num_proc={map_num_proc}) with tokenizer parallelism on; set TOKENIZERS_PARALLELISM=false")
+	for w in warnings:
+		print(f"⚠️  Thread oversubscription: {w}")
+	return warnings
+
+
+def _set_threads(cpus, intra: int, inter: int):
+	# Replicas parallelize across processes, so each tokenizer runs on its own thread
+	os.environ["TOKENIZERS_PARALLELISM"] = "false"
+	os.environ["OMP_NUM_THREADS"] = str(intra)
+	os.environ["MKL_NUM_THREADS"] = str(intra)
+	if cpus and hasattr(os, "sched_setaffinity"):
+		os.sched_setaffinity(0, cpus)
+	import torch
+	torch.set_num_threads(intra)
+	try:
+		torch.set_num_interop_threads(inter)
+	except RuntimeError:
+		# Only settable before the first parallel op in this process
+		pass
+
+
+def torch_modules(*models):
+	"""The torch modules inside sentiment/summarizer objects, looking through cascade and policy wrappers."""
+	found = []
+	stack = list(models)
+	while stack:
+		obj = stack.pop()
+		if obj is None:
+			continue
+		module = getattr(obj, "model", None)
+		if module is not None and hasattr(module, "parameters") and all(module is not m for m in found):
+			found.append(module)
+		stack.extend(getattr(obj, name, None) for name in ("transformer", "pipeline", "summarizer"))
+	return found
+
+
+def weights_mb(*models) -> float:
+	return sum(p.numel() * p.element_size() for m in torch_modules(*models) for p in m.parameters()) / 1e6
+
+
+def _freeze(*models):
+	# Inference only: no grads, so workers never write to the shared weight pages
+	for module in torch_modules(*models):
+		module.eval()
+		for p in module.parameters():
+			p.requires_grad_(False)
+
+
+def _init_worker(config_path: str, cpu_queue, intra: int, inter: int, fit_split, models=None):
+	cpus = cpu_queue.get()
+	_set_threads(cpus, intra, inter)
+	if models is not None:
+		# shared_memory: weights arrive as handles to the parent's shared tensors
+		sent, sumz = models
+		cfg = load_config(config_path)
+	elif "sent" in _REPLICA:
+		# fork: models were preloaded by the parent and are inherited copy-on-write
+		cfg, sent, sumz = _REPLICA["cfg"], _REPLICA["sent"], _REPLICA["sumz"]
+	else:
+		cfg = load_config(config_path)
+		sent, sumz = build_sentiment_model(cfg, fit_split), build_summarizer(cfg)
+	init_replica(cfg, sent, sumz, cpus)
+
+
+def init_replica(cfg, sent, sumz, cpus=None):
+	"""Make ``run_chunk`` in this process use these models."""
+	_REPLICA.update(cfg=cfg, cpus=cpus, sent=sent, sumz=sumz, memory_start=memory_breakdown_mb())
+
+
+def _keywords(texts, top_k: int, offset: int = 0):
+	from mca_ai.models.keywords import extract_keywords
+
+	out = []
+	for i, text in enumerate(texts, offset):
+		try:
+			out.append(list(extract_keywords(text, top_k=top_k)))
+		except Exception as e:
+			print(f"Error extracting keywords for text {i}: {e}")
+			out.append(None)
+	return out
+
+
+def model_reports(sent, sumz) -> dict:
+	"""Cascade, window and summarization-policy stats of one replica's models."""
+	reports = {}
+	if isinstance(sent, SentimentCascade):
+		reports["cascade"] = sent.report()
+	windows = window_stats(sent)
+	if windows is not None:
+		reports["windowed"] = windows
+	reports.update(summarizer_stats(sumz))
+	return reports
+
+
+def chunk_inputs(batch, start: int, sentiment_ids_col=None, summary_ids_col=None) -> dict:
+	"""Model inputs of one Arrow batch as Python lists."""
+	return {
+		"start": start,
+		"text": batch_column(batch, "text"),
+		"sentiment_text": batch_column(batch, "sentiment_text"),
+		"summary_text": batch_column(batch, "summary_text"),
+		"sentiment_ids": batch_column(batch, sentiment_ids_col) if sentiment_ids_col else None,
+		"summary_ids": batch_column(batch, summary_ids_col) if summary_ids_col else None,
+	}
+
+
+def run_chunk(inputs: dict) -> dict:
+	"""Sentiment, summaries and keywords for one chunk on this process's replica.
+
+	``inputs`` holds ``start``, ``text``, ``sentiment_text``, ``summary_text`` and
+	optionally pre-tokenized ``sentiment_ids`` / ``summary_ids``.
+	"""
+	cfg, sent, sumz = _REPLICA["cfg"], _REPLICA["sent"], _REPLICA["sumz"]
+	start = inputs["start"]
+	t0 = t = time.perf_counter()
+	labels, confidences = predict_sentiment(sent, inputs["sentiment_text"], cfg.sentiment.batch_size, inputs.get("sentiment_ids"))
+	stage_seconds = {"sentiment": time.perf_counter() - t}
+	t = time.perf_counter()
+	summaries = summarize_chunk(sumz, inputs["summary_text"], start, inputs.get("summary_ids"), getattr(cfg.summarization, 'batch_size', 8))
+	stage_seconds["summarize"] = time.perf_counter() - t
+	t = time.perf_counter()
+	keywords = _keywords(inputs["text"], cfg.keywords.top_k, start)
+	stage_seconds["keywords"] = time.perf_counter() - t
+	return {
+		"sentiment": labels,
+		"confidence": confidences,
+		"summary": summaries,
+		"keywords": keywords,
+		"stage_seconds": stage_seconds,
+		"pid": os.getpid(),
+		"cpus": _REPLICA["cpus"],
+		"docs": len(inputs["text"]),
+		"seconds": time.perf_counter() - t0,
+		"reports": model_reports(sent, sumz),
+		"memory_start": _REPLICA["memory_start"],
+		"memory": memory_breakdown_mb(),
+	}
+
+
+SHARE_MODES = (None, "fork", "shared_memory")
+
+
+class ReplicaPool:
+	"""N model replicas in separate processes, each with its own torch thread pool and CPU set.
+
+	``share_weights`` decides where weights live:
+
+	- None: every replica loads its own copy;
+	- ``fork``: the parent loads them once and forks, replicas share the pages copy-on-write;
+	- ``shared_memory``: the parent moves them to shared memory and spawned
+	  replicas map the same tensors.
+	"""
+
+	def __init__(self, config_path: str, replicas: int, intra_op_threads: int = None, inter_op_threads: int = 1, pin_cpus: bool = True, fit_split=None, max_in_flight: int = None, share_weights: str = None):
+		if share_weights not in SHARE_MODES:
+			raise ValueError(f"Unknown share_weights mode: {share_weights}")
+		self.config_path = config_path
+		self.replicas = replicas
+		self.intra, self.cpu_sets = plan_topology(replicas, intra_op_threads, pin_cpus)
+		self.inter = inter_op_threads
+		self.fit_split = fit_split
+		self.max_in_flight = max_in_flight or 2 * replicas
+		self.share_weights = share_weights
+		self.workers = {}
+		self.pool = None
+		self.parent_memory = None
+		self.weights_mb = None
+
+	def _preload(self):
+		cfg = load_config(self.config_path)
+		sent, sumz = build_sentiment_model(cfg, self.fit_split), build_summarizer(cfg)
+		_freeze(sent, sumz)
+		self.weights_mb = weights_mb(sent, sumz)
+		return cfg, sent, sumz
+
+	def start(self):
+		models = None
+		if self.share_weights == "fork":
+			cfg, sent, sumz = self._preload()
+			_REPLICA.update(cfg=cfg, sent=sent, sumz=sumz)
+			# Keep the collector from touching (and so copying) the inherited objects' pages
+			gc.collect()
+			gc.freeze()
+			ctx = mp.get_context("fork")
+		elif self.share_weights == "shared_memory":
+			import torch.multiprocessing as tmp
+			_, sent, sumz = self._preload()
+			for module in torch_modules(sent, sumz):
+				module.share_memory()
+			models = (sent, sumz)
+			ctx = tmp.get_context("spawn")
+		else:
+			ctx = mp.get_context("spawn")
+		self.parent_memory = memory_breakdown_mb()
+		cpu_queue = ctx.Queue()
+		for cpus in self.cpu_sets:
+			cpu_queue.put(cpus)
+		self.pool = ctx.Pool(self.replicas, initializer=_init_worker, initargs=(self.config_path, cpu_queue, self.intra, self.inter, self.fit_split, models))
+		return self
+
+	def imap(self, tasks):
+		"""Run ``(key, inputs)`` tasks, yielding ``(key, result)`` in submission order.
+
+		At most ``max_in_flight`` chunks are queued, so the input iterator is
+		consumed only as fast as replicas free up.
+		"""
+		pending = deque()
+		for key, inputs in tasks:
+			pending.append((key, self.pool.apply_async(run_chunk, (inputs,))))
+			if len(pending) >= self.max_in_flight:
+				yield self._collect(*pending.popleft())
+		while pending:
+			yield self._collect(*pending.popleft())
+
+	def _collect(self, key, handle):
+		result = handle.get()
+		w = self.workers.setdefault(result["pid"], {"cpus": result["cpus"], "chunks": 0, "docs": 0, "seconds": 0.0})
+		w["chunks"] += 1
+		w["docs"] += result["docs"]
+		w["seconds"] += result["seconds"]
+		w["reports"] = result["reports"]
+		w["memory_start_mb"] = result["memory_start"]
+		w["memory_mb"] = result["memory"]
+		return key, result
+
+	def report(self) -> dict:
+		for w in self.workers.values():
+			w["docs_per_sec"] = w["docs"] / w["seconds"] if w["seconds"] else 0.0
+		# What each replica adds on top of what it shares: private pages, not RSS
+		private = [w["memory_mb"]["private"] for w in self.workers.values() if "private" in w.get("memory_mb", {})]
+		return {
+			"replicas": self.replicas,
+			"intra_op_threads": self.intra,
+			"inter_op_threads": self.inter,
+			"share_weights": self.share_weights,
+			"weights_mb": self.weights_mb,
+			"parent_memory_mb": self.parent_memory,
+			"incremental_mb_per_worker": sum(private) / len(private) if private else None,
+			"workers": {str(pid): w for pid, w in self.workers.items()},
+		}
+
+	def close(self):
+		if self.pool is not None:
+			self.pool.close()
+			self.pool.join()
+			self.pool = None
+		if self.share_weights == "fork":
+			gc.unfreeze()
+			_REPLICA.clear()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+def build_replica_pool(app_cfg, config_path: str, train_split=None):
+	"""``ReplicaPool`` from ``workers.*`` config, or None when ``workers.replicas`` is 1 or unset."""
+	w_cfg = getattr(app_cfg, 'workers', None)
+	replicas = getattr(w_cfg, 'replicas', 1) or 1
+	if replicas <= 1:
+		return None
+	pool = ReplicaPool(
+		config_path,
+		replicas,
+		intra_op_threads=getattr(w_cfg, 'intra_op_threads', None),
+		inter_op_threads=getattr(w_cfg, 'inter_op_threads', 1),
+		pin_cpus=getattr(w_cfg, 'pin_cpus', True),
+		fit_split=_cascade_fit_split(app_cfg, train_split),
+		max_in_flight=getattr(w_cfg, 'max_in_flight', None),
+		share_weights=getattr(w_cfg, 'share_weights', None),
+	)
+	check_oversubscription(replicas, pool.intra, pool.inter, getattr(app_cfg.data, 'map_num_proc', 4))
+	return pool
+
+
+def _cascade_fit_split(app_cfg, train_split):
+	# Only the linear cascade tier needs training texts; ship just those to the replicas
+	cascade_cfg = getattr(app_cfg.sentiment, 'cascade', None)
+	if train_split is None or not getattr(cascade_cfg, 'enabled', False) or getattr(cascade_cfg, 'tier', 'lexicon') != "linear":
+		return None
+	n = min(getattr(cascade_cfg, 'train_size', 2000), len(train_split))
+	return train_split.select(range(n)).select_columns(["text"]).flatten_indices()
@@ -0,0 +1,382 @@
+import os
+import re
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+
+from mca_ai import tracing
+from mca_ai.config import load_config
+
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+	id INTEGER PRIMARY KEY,
+	doc_ids TEXT NOT NULL,
+	cost REAL NOT NULL DEFAULT 0,
+	status TEXT NOT NULL DEFAULT 'queued',
+	attempts INTEGER NOT NULL DEFAULT 0,
+	owner TEXT,
+	lease_expires REAL,
+	result_path TEXT,
+	error TEXT,
+	updated REAL
+);
+CREATE INDEX IF NOT EXISTS chunks_status ON chunks (status, cost DESC, id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class WorkQueue:
+	"""Durable chunk queue in SQLite (WAL) with leases, heartbeats and bounded retries.
+
+	A chunk is leased to one worker for ``lease_seconds``; the worker extends the
+	lease by heartbeating. Chunks whose lease expired (dead or stuck worker) go
+	back to the queue on the next ``lease`` call, up to ``max_attempts`` tries.
+	"""
+
+	def __init__(self, path: str, lease_seconds: float = 300, max_attempts: int = 3):
+		self.path = path
+		self.lease_seconds = lease_seconds
+		self.max_attempts = max_attempts
+		os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+		self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute("PRAGMA synchronous=NORMAL")
+		self.conn.executescript(SCHEMA)
+
+	def close(self):
+		self.conn.close()
+
+	def _write(self, sql: str, params=()):
+		# BEGIN IMMEDIATE takes the write lock up front, so concurrent lessees serialize instead of deadlocking
+		self.conn.execute("BEGIN IMMEDIATE")
+		try:
+			cur = self.conn.execute(sql, params)
+			self.conn.execute("COMMIT")
+			return cur
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+
+	def set_meta(self, key: str, value):
+		self._write("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+	def get_meta(self, key: str, default=None):
+		row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+		return json.loads(row[0]) if row else default
+
+	def enqueue(self, chunks, costs=None):
+		"""Add chunks of document ids; returns how many were added."""
+		costs = costs or [0.0] * len(chunks)
+		now = time.time()
+		self.conn.execute("BEGIN IMMEDIATE")
+		try:
+			self.conn.executemany(
+				"INSERT INTO chunks (doc_ids, cost, updated) VALUES (?, ?, ?)",
+				[(json.dumps(ids), cost, now) for ids, cost in zip(chunks, costs)],
+			)
+			self.conn.execute("COMMIT")
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+		return len(chunks)
+
+	def lease(self, owner: str):
+		"""Claim the costliest queued chunk: ``(chunk_id, doc_ids)``, or None when nothing is queued."""
+		now = time.time()
+		self.conn.execute("BEGIN IMMEDIATE")
+		try:
+			# Reclaim chunks of workers that stopped heartbeating
+			self.conn.execute(
+				"UPDATE chunks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, owner = NULL, error = 'lease expired', updated = ? "
+				"WHERE status = 'leased' AND lease_expires < ?",
+				(self.max_attempts, now, now),
+			)
+			row = self.conn.execute("SELECT id, doc_ids FROM chunks WHERE status = 'queued' ORDER BY cost DESC, id LIMIT 1").fetchone()
+			if row is not None:
+				self.conn.execute(
+					"UPDATE chunks SET status = 'leased', owner = ?, attempts = attempts + 1, lease_expires = ?, updated = ? WHERE id = ?",
+					(owner, now + self.lease_seconds, now, row[0]),
+				)
+			self.conn.execute("COMMIT")
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+		return (row[0], json.loads(row[1])) if row else None
+
+	def heartbeat(self, chunk_id: int, owner: str) -> bool:
+		"""Extend the lease; False if it was lost (expired and taken over), so the work should be dropped."""
+		now = time.time()
+		cur = self._write(
+			"UPDATE chunks SET lease_expires = ?, updated = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+			(now + self.lease_seconds, now, chunk_id, owner),
+		)
+		return cur.rowcount == 1
+
+	def complete(self, chunk_id: int, owner: str, result_path: str) -> bool:
+		cur = self._write(
+			"UPDATE chunks SET status = 'done', result_path = ?, error = NULL, updated = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+			(result_path, time.time(), chunk_id, owner),
+		)
+		return cur.rowcount == 1
+
+	def fail(self, chunk_id: int, owner: str, error: str):
+		self._write(
+			"UPDATE chunks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, owner = NULL, error = ?, updated = ? "
+			"WHERE id = ? AND owner = ?",
+			(self.max_attempts, error[:2000], time.time(), chunk_id, owner),
+		)
+
+	def counts(self) -> dict:
+		return dict(self.conn.execute("SELECT status, COUNT(*) FROM chunks GROUP BY status").fetchall())
+
+	def done_chunks(self):
+		return self.conn.execute("SELECT id, result_path FROM chunks WHERE status = 'done' ORDER BY id").fetchall()
+
+
+def _heartbeat_loop(path: str, chunk_id: int, owner: str, interval: float, lease_seconds: float, stop: threading.Event, lost: threading.Event):
+	queue = WorkQueue(path, lease_seconds)
+	try:
+		while not stop.wait(interval):
+			if not queue.heartbeat(chunk_id, owner):
+				lost.set()
+				return
+	finally:
+		queue.close()
+
+
+def _rows(split, cfg):
+	"""Test-split row of every document id, and the columns a chunk needs (as for project.py)."""
+	from mca_ai.models.tokenized import token_columns
+	from mca_ai.output import source_ids
+
+	rows_by_id = {str(doc_id): row for row, doc_id in enumerate(source_ids(split))}
+	ids_cols = [
+		token_columns(cfg.sentiment.model_name, cfg.sentiment.max_length)[0],
+		token_columns(cfg.summarization.model_name, cfg.summarization.max_input_length)[0],
+	]
+	ids_cols = [c if c in split.column_names else None for c in ids_cols]
+	return rows_by_id, ids_cols
+
+
+def _chunk_table(split, rows_by_id, doc_ids, columns):
+	"""The chunk's documents as one Arrow table, in ``doc_ids`` order."""
+	part = split.select([rows_by_id[str(i)] for i in doc_ids])
+	return part.select_columns([c for c in columns if c and c in part.column_names]).with_format("arrow")[:]
+
+
+def queue_settings(app_cfg) -> dict:
+	"""``queue.*`` config: database path, lease length and retry budget."""
+	q_cfg = getattr(app_cfg, 'queue', None)
+	return {
+		"path": getattr(q_cfg, 'path', None) or os.path.join(app_cfg.paths.experiments_dir, "queue", "work.sqlite"),
+		"lease_seconds": getattr(q_cfg, 'lease_seconds', 300),
+		"max_attempts": getattr(q_cfg, 'max_attempts', 3),
+	}
+
+
+def init_queue(config_path: str, queue_path: str = None) -> WorkQueue:
+	"""Create the queue for the configured test split, chunked by ``memory.chunk_size`` or by predicted cost."""
+	from mca_ai.costmodel import build_cost_model, longest_first, plan_chunk_sizes, split_tokens
+	from mca_ai.data_loader import load_dataset_any
+	from mca_ai.output import source_ids
+
+	cfg = load_config(config_path)
+	settings = queue_settings(cfg)
+	queue_path = queue_path or settings["path"]
+	queue = WorkQueue(queue_path, settings["lease_seconds"], settings["max_attempts"])
+	if sum(queue.counts().values()):
+		print(f"⚠️  Queue {queue_path} already holds chunks {queue.counts()}; leaving it as is")
+		return queue
+	split = load_dataset_any(cfg)["test"]
+	ids = [str(i) for i in source_ids(split)]
+	chunk_size = getattr(getattr(cfg, 'memory', None), 'chunk_size', 100)
+	cost_model = build_cost_model(cfg)
+	if cost_model is not None:
+		# Costliest chunks are leased first, so the long tail finishes early
+		costs = cost_model.costs(split_tokens(split))
+		order = longest_first(costs)
+		budget = getattr(cfg.balance, 'chunk_seconds', None) or 60.0
+		sizes = plan_chunk_sizes([costs[i] for i in order], budget, chunk_size)
+	else:
+		costs, order = [0.0] * len(ids), list(range(len(ids)))
+		sizes = [chunk_size] * (len(ids) // chunk_size + 1)
+	chunks, chunk_costs, pos = [], [], 0
+	for size in sizes:
+		rows = order[pos:pos + size]
+		if not rows:
+			break
+		chunks.append([ids[r] for r in rows])
+		chunk_costs.append(sum(costs[r] for r in rows))
+		pos += size
+	queue.set_meta("config_path", os.path.abspath(config_path))
+	queue.set_meta("docs", len(ids))
+	queue.set_meta("settings", settings)
+	queue.enqueue(chunks, chunk_costs)
+	print(f"✓ Queued {len(chunks)} chunks ({len(ids)} docs) in {queue_path}")
+	return queue
+
+
+def _open(queue_path: str) -> WorkQueue:
+	# Lease length and retry budget come from the config the queue was created with
+	queue = WorkQueue(queue_path)
+	settings = queue.get_meta("settings")
+	if settings is None:
+		raise RuntimeError(f"{queue_path} is not an initialized queue; run `python -m mca_ai.workqueue init` first")
+	queue.lease_seconds, queue.max_attempts = settings["lease_seconds"], settings["max_attempts"]
+	return queue
+
+
+def work(queue_path: str, owner: str = None, poll_seconds: float = 5.0):
+	"""Pull and process chunks until none is queued or leased.
+
+	While other workers still hold leases this one keeps polling every
+	``poll_seconds``, so it can pick up the chunk of a worker that died once
+	that lease expires.
+	"""
+	from mca_ai.data_loader import load_dataset_any
+	from mca_ai.models.cascade import build_sentiment_model
+	from mca_ai.models.decoding import build_summarizer
+	from mca_ai.workers import chunk_inputs, init_replica, run_chunk
+
+	owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+	queue = _open(queue_path)
+	cfg = load_config(queue.get_meta("config_path"))
+	tracing.configure(cfg)
+	ds = load_dataset_any(cfg)
+	split = ds["test"]
+	rows_by_id, (sentiment_ids_col, summary_ids_col) = _rows(split, cfg)
+	columns = ["text", "sentiment_text", "summary_text", sentiment_ids_col, summary_ids_col]
+	init_replica(cfg, build_sentiment_model(cfg, ds["train"]), build_summarizer(cfg))
+	result_dir = os.path.join(os.path.dirname(os.path.abspath(queue_path)), "chunk_results")
+	os.makedirs(result_dir, exist_ok=True)
+
+	print(f"Worker {owner} pulling from {queue_path}")
+	while True:
+		leased = queue.lease(owner)
+		if leased is None:
+			counts = queue.counts()
+			if not counts.get("queued") and not counts.get("leased"):
+				print(f"Worker {owner}: queue drained {counts}")
+				break
+			time.sleep(poll_seconds)
+			continue
+		chunk_id, doc_ids = leased
+		stop, lost = threading.Event(), threading.Event()
+		beat = threading.Thread(
+			target=_heartbeat_loop,
+			args=(queue_path, chunk_id, owner, queue.lease_seconds / 3, queue.lease_seconds, stop, lost),
+			daemon=True,
+		)
+		beat.start()
+		try:
+			table = _chunk_table(split, rows_by_id, doc_ids, columns)
+			with tracing.span("workqueue.chunk", chunk=chunk_id, docs=len(doc_ids)):
+				out = run_chunk(chunk_inputs(table, 0, sentiment_ids_col, summary_ids_col))
+			# Write-then-rename, so a crash never leaves a half-written result behind
+			result_path = os.path.join(result_dir, f"chunk-{chunk_id:06d}.json")
+			tmp_path = f"{result_path}.{os.getpid()}.tmp"
+			with open(tmp_path, "w") as f:
+				json.dump({"id": doc_ids, **{k: out[k] for k in ("sentiment", "confidence", "summary", "keywords", "stage_seconds")}}, f)
+			os.replace(tmp_path, result_path)
+		except Exception as e:
+			print(f"Worker {owner}: chunk {chunk_id} failed: {e}")
+			queue.fail(chunk_id, owner, repr(e))
+			continue
+		finally:
+			stop.set()
+			beat.join()
+		if lost.is_set() or not queue.complete(chunk_id, owner, result_path):
+			print(f"⚠️  Worker {owner}: lease on chunk {chunk_id} was lost; result left to the new owner")
+		else:
+			print(f"Worker {owner}: chunk {chunk_id} done ({len(doc_ids)} docs, {out['seconds']:.1f}s)")
+	queue.close()
+	if tracing.tracer.enabled:
+		# One trace per worker, next to the queue
+		trace_dir = os.path.join(os.path.dirname(os.path.abspath(queue_path)), "traces", _UNSAFE.sub("_", owner))
+		os.makedirs(trace_dir, exist_ok=True)
+		tracing.finish(trace_dir)
+
+
+def collect(queue_path: str, exp_dir: str = None):
+	"""Write predictions and word frequencies of all finished chunks, in queue order."""
+	from mca_ai.data_loader import load_dataset_any
+	from mca_ai.output import open_prediction_writers
+	from mca_ai.viz.wordfreq import TermCounter
+
+	queue = _open(queue_path)
+	counts = queue.counts()
+	if counts.get("queued") or counts.get("leased"):
+		raise RuntimeError(f"Queue not finished: {counts}")
+	cfg = load_config(queue.get_meta("config_path"))
+	exp_dir = exp_dir or os.path.join(cfg.paths.experiments_dir, "baseline")
+	os.makedirs(exp_dir, exist_ok=True)
+	split = load_dataset_any(cfg)["test"]
+	rows_by_id, _ = _rows(split, cfg)
+	extra = getattr(getattr(cfg, 'output', None), 'extra_columns', None) or []
+	writers = open_prediction_writers(cfg, exp_dir)
+	term_counts = TermCounter()
+	sentiment_counts = {}
+	for _, result_path in queue.done_chunks():
+		with open(result_path) as f:
+			res = json.load(f)
+		table = _chunk_table(split, rows_by_id, res["id"], ["id", "text", *extra])
+		texts = table.column("text").to_pylist()
+		term_counts.update(texts)
+		for label in res["sentiment"]:
+			sentiment_counts[label] = sentiment_counts.get(label, 0) + 1
+		records = {
+			"id": table.column("id"),
+			"text": texts,
+			"sentiment": res["sentiment"],
+			"summary": res["summary"],
+			"keywords": res["keywords"],
+			"confidence": res["confidence"],
+			**{c: table.column(c) for c in extra},
+		}
+		for writer in writers:
+			writer.write(records)
+	for writer in writers:
+		writer.close()
+		print(f"✓ Saved predictions: {writer.path}")
+	term_counts.save(os.path.join(exp_dir, "word_frequencies.json"))
+	with open(os.path.join(exp_dir, "queue_stats.json"), "w") as f:
+		json.dump({"chunks": counts, "docs": queue.get_meta("docs"), "sentiment_counts": sentiment_counts}, f, indent=2)
+	if counts.get("failed"):
+		print(f"⚠️  {counts['failed']} chunks failed after {queue.max_attempts} attempts and are missing from the output")
+	queue.close()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="SQLite-backed work queue for the MCA AI model stages")
+	parser.add_argument("--queue", default=None, help="Queue database (default: queue.path from the config)")
+	parser.add_argument("--config", default="configs/default.yaml")
+	sub = parser.add_subparsers(dest="command", required=True)
+	sub.add_parser("init", help="Chunk the test split into the queue")
+	p_work = sub.add_parser("work", help="Pull and process chunks; start as many as the machines allow")
+	p_work.add_argument("--poll-seconds", type=float, default=5.0, help="Wait between lease attempts while other workers hold chunks")
+	sub.add_parser("status", help="Chunk counts by status")
+	p_collect = sub.add_parser("collect", help="Write predictions from finished chunks")
+	p_collect.add_argument("--out", default=None, help="Output directory (default: <experiments_dir>/baseline)")
+	args = parser.parse_args()
+
+	queue_path = args.queue or queue_settings(load_config(args.config))["path"]
+	if args.command == "init":
+		init_queue(args.config, queue_path).close()
+	elif args.command == "work":
+		work(queue_path, poll_seconds=args.poll_seconds)
+	elif args.command == "status":
+		queue = _open(queue_path)
+		print(json.dumps({"chunks": queue.counts(), "docs": queue.get_meta("docs")}, indent=2))
+		queue.close()
+	else:
+		collect(queue_path, args.out)
+
+
+if __name__ == "__main__":
+	main()
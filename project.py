@@ -1,105 +1,319 @@
 import os
-import csv
+import json
+import time
+import random
+import argparse
+from collections import Counter
 from pathlib import Path
 
-import pandas as pd
 from datasets import DatasetDict
 
+from mca_ai import tracing
 from mca_ai.config import load_config
-from mca_ai.data_loader import load_dataset_any
-from mca_ai.models.sentiment import SentimentPipeline
-from mca_ai.models.summarizer import Summarizer
+from mca_ai.costmodel import build_cost_model, estimate_tokens, longest_first, plan_chunk_sizes, split_tokens
+from mca_ai.data_loader import batch_column, iter_record_batches, load_dataset_any
+from mca_ai.memory import MemoryGuard, MemoryTracker
+from mca_ai.output import batch_ids, open_prediction_writers
+from mca_ai.rollup import FacetRollup, batch_facets, build_rollup
+from mca_ai.search import open_search_index
+from mca_ai.models.cascade import SentimentCascade, build_sentiment_model, predict_sentiment, window_stats
+from mca_ai.models.decoding import build_summarizer, summarize_chunk, summarizer_stats
+from mca_ai.models.tokenized import token_columns
 from mca_ai.models.keywords import extract_keywords
-from mca_ai.viz.wordcloud_utils import build_wordcloud
+from mca_ai.viz.wordfreq import TermCounter, build_wordcloud_from_frequencies
+from mca_ai.shards import SHARD_MANIFEST, cost_shard_plan, mark_shard_done, select_shard, shard_dir
+from mca_ai.workers import build_replica_pool, chunk_inputs
 
 
 def ensure_dir(p: str):
 	Path(p).mkdir(parents=True, exist_ok=True)
 
 
-def main(config_path: str = "configs/default.yaml"):
+def main(config_path: str = "configs/default.yaml", shard_index: int = None, num_shards: int = None, shard_by: str = "hash"):
 	cfg = load_config(config_path)
-	exp_dir = os.path.join(cfg.paths.experiments_dir, "baseline")
+	tracing.configure(cfg)
+	exp_dir = base_dir = os.path.join(cfg.paths.experiments_dir, "baseline")
+	shard = (shard_index, num_shards) if num_shards else None
+	if shard:
+		# Each shard writes to its own folder; merge them with python -m mca_ai.shards
+		exp_dir = shard_dir(exp_dir, *shard)
 	ensure_dir(exp_dir)
+	if shard and os.path.exists(os.path.join(exp_dir, SHARD_MANIFEST)):
+		os.remove(os.path.join(exp_dir, SHARD_MANIFEST))
+
+	if getattr(getattr(cfg, 'cache', None), 'enabled', False):
+		# Stage-level caching: only stages whose inputs or config changed are re-run
+		from mca_ai.pipeline import StagedPipeline
+		if (getattr(getattr(cfg, 'workers', None), 'replicas', 1) or 1) > 1:
+			raise ValueError("workers.replicas > 1 is not supported with cache.enabled; the staged pipeline runs each model stage in-process")
+		pipeline = StagedPipeline(cfg, exp_dir, shard=shard, shard_by=shard_by, plan_dir=base_dir)
+		ran = pipeline.run()
+		# The write stage publishes search.sqlite and rollup.json next to the predictions
+		rollup_path = os.path.join(exp_dir, "rollup.json")
+		if getattr(getattr(cfg, 'rollup', None), 'enabled', False) and getattr(cfg.rollup, 'wordclouds', True) and os.path.exists(rollup_path):
+			wc_cfg = cfg.viz.wordcloud
+			n = FacetRollup.load(rollup_path).render_wordclouds(os.path.join(exp_dir, "wordclouds"), wc_cfg.width, wc_cfg.height, wc_cfg.background_color, getattr(cfg.rollup, 'min_docs', 20))
+			print(f"✓ Rendered {n} facet word clouds")
+		dash_cfg = getattr(cfg, 'dashboard', None)
+		if getattr(dash_cfg, 'precompute', False):
+			from mca_ai.viz.aggregates import build_aggregates
+			with tracing.span("dashboard.aggregates"):
+				build_aggregates(exp_dir, page_size=getattr(dash_cfg, 'page_size', 200))
+		tracing.finish(exp_dir)
+		if shard:
+			mark_shard_done(exp_dir, *shard, len(pipeline.output("clean")["test"]), Counter(pipeline.output("sentiment")))
+		print(f"\n🎉 Project completed successfully! Stages run: {', '.join(ran) or 'none (all cached)'}")
+		return
+
+	mem_cfg = getattr(cfg, 'memory', None)
+	tracker = MemoryTracker(trace_python=getattr(mem_cfg, 'trace_python', False))
+	guard = MemoryGuard(getattr(mem_cfg, 'ceiling_mb', None))
+	chunk_size = getattr(mem_cfg, 'chunk_size', 100)
 
 	# Load data
 	print("Loading dataset...")
-	ds: DatasetDict = load_dataset_any(cfg)
+	with tracker.stage("load_dataset"):
+		ds: DatasetDict = load_dataset_any(cfg)
+	cost_model = build_cost_model(cfg)
+	if shard:
+		# shard_by cost: the assignment is planned once and read back from shard_plan.json
+		# by every node, so ledger updates from running shards cannot change it
+		plan = None
+		if shard_by == "cost":
+			if cost_model is None:
+				raise ValueError("--shard-by cost needs balance.enabled")
+			plan = cost_shard_plan(base_dir, ds["test"], num_shards, cost_model)
+		ds = select_shard(ds, *shard, plan=plan)
 	test_split = ds["test"]
-	print(f"Dataset loaded: {len(test_split)} test examples")
-
-	texts = test_split["text"]
-	
-	# Process in smaller batches to avoid memory issues
-	batch_size = min(100, len(texts))  # Process in smaller batches
-	
-	print("Initializing sentiment model...")
-	sent = SentimentPipeline(cfg.sentiment.model_name, cfg.sentiment.max_length, cfg.device)
-	print("Running sentiment analysis...")
-	pred_labels = sent.predict(texts, batch_size=cfg.sentiment.batch_size)
-	print(f"Sentiment analysis completed: {len(pred_labels)} predictions")
-	
-	print("Initializing summarization model...")
-	sumz = Summarizer(cfg.summarization.model_name, cfg.summarization.max_input_length, cfg.summarization.max_summary_length, cfg.summarization.num_beams, cfg.device)
-	print("Running summarization...")
-	summaries = []
-	for i, text in enumerate(texts):
-		if i % 50 == 0:
-			print(f"Summarizing progress: {i}/{len(texts)}")
-		try:
-			summary = sumz.summarize(text)
-			summaries.append(summary)
-		except Exception as e:
-			print(f"Error summarizing text {i}: {e}")
-			summaries.append("Error in summarization")
-	print(f"Summarization completed: {len(summaries)} summaries")
-	
-	print("Extracting keywords...")
-	keywords_list = []
-	for i, text in enumerate(texts):
-		if i % 50 == 0:
-			print(f"Keywords progress: {i}/{len(texts)}")
-		try:
-			keywords = extract_keywords(text, top_k=cfg.keywords.top_k)
-			keywords_list.append("; ".join(keywords))
-		except Exception as e:
-			print(f"Error extracting keywords for text {i}: {e}")
-			keywords_list.append("Error in keyword extraction")
-	print(f"Keyword extraction completed: {len(keywords_list)} extractions")
-
-	# Save CSV
-	print("Saving results to CSV...")
-	rows = []
-	for i, t in enumerate(texts):
-		rows.append({
-			"text": t,
-			"sentiment": pred_labels[i],
-			"summary": summaries[i],
-			"keywords": keywords_list[i],
-		})
-	df = pd.DataFrame(rows)
-	csv_path = os.path.join(exp_dir, "predictions.csv")
-	df.to_csv(csv_path, index=False, quoting=csv.QUOTE_MINIMAL)
-	print(f"✓ Saved predictions: {csv_path}")
-
-	# Word cloud from full corpus
+	chunk_sizes = None
+	if cost_model is not None:
+		# Longest documents first, in chunks of roughly equal predicted seconds; rows keep
+		# the ids load_dataset_any gave them, so predictions still name their documents
+		costs = cost_model.costs(split_tokens(test_split))
+		order = longest_first(costs)
+		test_split = test_split.select(order).flatten_indices()
+		costs = [costs[i] for i in order]
+		replicas = getattr(getattr(cfg, 'workers', None), 'replicas', 1) or 1
+		budget = getattr(cfg.balance, 'chunk_seconds', None) or sum(costs) / (replicas * 8) or 1.0
+		chunk_sizes = iter(plan_chunk_sizes(costs, budget, chunk_size))
+		print(f"Cost model: {sum(costs) / 60:.1f} predicted CPU-minutes, longest document {costs[0] if costs else 0:.1f}s")
+	print(f"Dataset loaded: {len(test_split)} test examples" + (f" (shard {shard_index} of {num_shards})" if shard else ""))
+
+	# Pre-tokenized model inputs, when pretokenize.enabled added them
+	sentiment_ids_col = token_columns(cfg.sentiment.model_name, cfg.sentiment.max_length)[0]
+	summary_ids_col = token_columns(cfg.summarization.model_name, cfg.summarization.max_input_length)[0]
+	sentiment_ids_col = sentiment_ids_col if sentiment_ids_col in test_split.column_names else None
+	summary_ids_col = summary_ids_col if summary_ids_col in test_split.column_names else None
+	extra_columns = getattr(getattr(cfg, 'output', None), 'extra_columns', None) or []
+	# Pre-truncated sentiment_text / summary_text too, when pretruncate.enabled added them
+	columns = ["id", "text", "sentiment_text", "summary_text", sentiment_ids_col, summary_ids_col, *extra_columns]
+	# Facet columns (stakeholder_type, consultation_topic, author_type, date) for the rollup
+	rollup = build_rollup(cfg)
+	if rollup is not None:
+		columns += [c for c in rollup.columns() if c not in columns]
+
+	# With workers.replicas > 1 the models run in a pool of replica processes instead
+	pool = build_replica_pool(cfg, config_path, ds["train"])
+	sent = sumz = None
+	if pool is None:
+		print("Initializing models...")
+		with tracker.stage("load_models"):
+			sent = build_sentiment_model(cfg, ds["train"])
+			sumz = build_summarizer(cfg)
+	else:
+		print(f"Starting {pool.replicas} model replicas ({pool.intra} intra-op threads each)...")
+		pool.start()
+
+	# Documents are read as Arrow record batches and appended to the outputs batch by
+	# batch, so neither the corpus nor the results are ever held as Python lists;
+	# near memory.ceiling_mb the guard shrinks batches
+	next_rows = (lambda: guard.batch_size(next(chunk_sizes, chunk_size))) if chunk_sizes else (lambda: guard.batch_size(chunk_size))
+	batches = iter_record_batches(test_split, next_rows, [c for c in columns if c])
+	if pool is None:
+		results = run_models(batches, sent, sumz, cfg, tracker, guard, sentiment_ids_col, summary_ids_col)
+	else:
+		results = pool.imap(((start, batch), chunk_inputs(batch, start, sentiment_ids_col, summary_ids_col)) for start, batch in batches)
+	writers = open_prediction_writers(cfg, exp_dir)
+	search_index = open_search_index(cfg, exp_dir)
+	term_counts = TermCounter()
+	sentiment_counts = Counter()
+	for (start, batch), out in results:
+		chunk = batch_column(batch, "text")
+		sentiment_counts.update(out["sentiment"])
+		if cost_model is not None:
+			tokens = estimate_tokens(chunk)
+			for stage, seconds in out["stage_seconds"].items():
+				cost_model.record_chunk(stage, tokens, seconds)
+		if rollup is not None:
+			# Tokenized once: the rollup's ("all", "all") cell doubles as the corpus term counts
+			with tracker.stage("rollup"), tracing.span("rollup.update", docs=len(chunk)):
+				rollup.update(batch_facets(batch, rollup.columns()), chunk, out["sentiment"], out["keywords"])
+		else:
+			with tracker.stage("term_counts"), tracing.span("wordcloud.count_terms", docs=len(chunk)):
+				term_counts.update(chunk)
+
+		with tracker.stage("write"):
+			records = {
+				"id": batch_ids(batch),
+				"text": batch.column("text"),
+				"sentiment": out["sentiment"],
+				"summary": out["summary"],
+				"keywords": out["keywords"],
+				"confidence": out["confidence"],
+				**{c: batch.column(c) for c in extra_columns},
+			}
+			for writer in writers:
+				with tracing.span(f"write.{type(writer).__name__}", rows=len(chunk)) as sp:
+					sp.add_bytes(writer.write(records))
+			if search_index is not None:
+				with tracing.span("search.index", rows=len(chunk)):
+					search_index.add(records, extra_columns)
+		# Chunk written out: resize the following batches from what is still resident
+		guard.check()
+	for writer in writers:
+		writer.close()
+		print(f"✓ Saved predictions: {writer.path}")
+	if rollup is not None:
+		term_counts = rollup.corpus_terms()
+	if search_index is not None:
+		search_index.optimize()
+		print(f"✓ Indexed {search_index.docs()} comments for search: {search_index.path}")
+		search_index.close()
+	if pool is not None:
+		pool.close()
+		stats = pool.report()
+		if stats["incremental_mb_per_worker"] is not None:
+			print(f"Replicas: {stats['incremental_mb_per_worker']:.0f} MB private memory per worker (weights {stats['weights_mb'] or 0:.0f} MB, share_weights={stats['share_weights']})")
+		with open(os.path.join(exp_dir, "worker_stats.json"), "w") as f:
+			json.dump(stats, f, indent=2)
+
+	# Word cloud from the corpus term frequencies accumulated per chunk
 	print("Generating word cloud...")
 	try:
-		wc = build_wordcloud(" ".join(texts), width=cfg.viz.wordcloud.width, height=cfg.viz.wordcloud.height, background_color=cfg.viz.wordcloud.background_color)
+		freq_path = os.path.join(exp_dir, "word_frequencies.json")
+		term_counts.save(freq_path)
+		with tracker.stage("wordcloud"), tracing.span("wordcloud.build"):
+			wc = build_wordcloud_from_frequencies(term_counts, width=cfg.viz.wordcloud.width, height=cfg.viz.wordcloud.height, background_color=cfg.viz.wordcloud.background_color)
 		wc_path = os.path.join(exp_dir, "wordcloud.png")
 		wc.to_file(wc_path)
 		print(f"✓ Saved word cloud: {wc_path}")
 	except Exception as e:
 		print(f"Error generating word cloud: {e}")
 
+	if rollup is not None:
+		rollup.save(os.path.join(exp_dir, "rollup.json"))
+		print(f"✓ Saved facet rollup: {len(rollup.cells)} cells over {rollup.docs} docs")
+		if getattr(cfg.rollup, 'wordclouds', True):
+			wc_cfg = cfg.viz.wordcloud
+			with tracker.stage("rollup_wordclouds"), tracing.span("rollup.wordclouds"):
+				n = rollup.render_wordclouds(os.path.join(exp_dir, "wordclouds"), wc_cfg.width, wc_cfg.height, wc_cfg.background_color, getattr(cfg.rollup, 'min_docs', 20))
+			print(f"✓ Rendered {n} facet word clouds")
+
+	if isinstance(sent, SentimentCascade):
+		report_cascade(sent, test_split, cfg, exp_dir)
+	windows = window_stats(sent)
+	if windows is not None:
+		print(f"Windowed sentiment: {windows['windows']} windows over {windows['docs']} docs ({windows['capped_docs']} capped at {windows['max_windows']})")
+		with open(os.path.join(exp_dir, "sentiment_windows.json"), "w") as f:
+			json.dump(windows, f, indent=2)
+	report_summarization(sumz, exp_dir)
+
+	dash_cfg = getattr(cfg, 'dashboard', None)
+	if getattr(dash_cfg, 'precompute', False):
+		# Counts, histograms and paged document slices the dashboard reads instead of predictions.csv
+		from mca_ai.viz.aggregates import build_aggregates
+		with tracker.stage("aggregates"), tracing.span("dashboard.aggregates"):
+			build_aggregates(exp_dir, page_size=getattr(dash_cfg, 'page_size', 200))
+
+	tracing.finish(exp_dir)
+	tracker.report(exp_dir)
+	if shard:
+		mark_shard_done(exp_dir, *shard, len(test_split), sentiment_counts)
+
 	print("\n🎉 Project completed successfully!")
 	print(f"Results saved in: {exp_dir}")
 
 
+def run_models(batches, sent, sumz, cfg, tracker, guard, sentiment_ids_col=None, summary_ids_col=None):
+	"""Sentiment, summaries and keywords for each batch in this process, yielding ``((start, batch), results)``."""
+	for start, batch in batches:
+		inputs = chunk_inputs(batch, start, sentiment_ids_col, summary_ids_col)
+		chunk = inputs["text"]
+		print(f"Processing documents {start}-{start + len(chunk)}")
+
+		stage_seconds = {}
+		t0 = time.perf_counter()
+		with tracker.stage("sentiment"), tracing.span("sentiment.predict", docs=len(chunk)):
+			pred_labels, confidences = predict_sentiment(sent, inputs["sentiment_text"], guard.batch_size(cfg.sentiment.batch_size), inputs["sentiment_ids"])
+		stage_seconds["sentiment"] = time.perf_counter() - t0
+
+		t0 = time.perf_counter()
+		with tracker.stage("summarize"), tracing.span("summarizer.summarize", docs=len(chunk)):
+			summaries = summarize_chunk(sumz, inputs["summary_text"], start, inputs["summary_ids"], guard.batch_size(getattr(cfg.summarization, 'batch_size', 8)))
+		stage_seconds["summarize"] = time.perf_counter() - t0
+
+		t0 = time.perf_counter()
+		keywords_list = []
+		with tracker.stage("keywords"):
+			for i, text in enumerate(chunk, start):
+				try:
+					with tracing.span("keywords.extract"):
+						keywords = extract_keywords(text, top_k=cfg.keywords.top_k)
+					keywords_list.append(list(keywords))
+				except Exception as e:
+					print(f"Error extracting keywords for text {i}: {e}")
+					keywords_list.append(None)
+		stage_seconds["keywords"] = time.perf_counter() - t0
+
+		yield (start, batch), {"sentiment": pred_labels, "confidence": confidences, "summary": summaries, "keywords": keywords_list, "stage_seconds": stage_seconds}
+
+
+# Documents re-run transformer-only to measure cascade agreement when not configured
+AGREEMENT_SAMPLE = 200
+
+
+def report_cascade(cascade: SentimentCascade, split, cfg, exp_dir: str):
+	"""Print and save tier fractions and agreement with transformer-only mode on a fixed sample."""
+	sample = min(getattr(cfg.sentiment.cascade, 'agreement_sample', AGREEMENT_SAMPLE), len(split))
+	if sample:
+		# A seeded sample rather than the first rows, which are the longest when balance.enabled reorders them
+		rows = sorted(random.Random(getattr(cfg, 'seed', 42)).sample(range(len(split)), sample))
+		cascade.agreement(split.select(rows)[:]["text"], batch_size=cfg.sentiment.batch_size)
+	stats = cascade.report()
+	print(f"Cascade: {stats['tier1_fraction']:.1%} labelled by {stats['tier']}, {stats['transformer_fraction']:.1%} by the transformer")
+	if "agreement" in stats:
+		print(f"Cascade agreement with transformer-only: {stats['agreement']:.1%} on {stats['agreement_docs']} docs")
+	with open(os.path.join(exp_dir, "cascade_stats.json"), "w") as f:
+		json.dump(stats, f, indent=2)
+
+
+def report_summarization(sumz, exp_dir: str):
+	"""Print and save decoding-rule counts and long-document window counts, when those modes are on."""
+	stats = summarizer_stats(sumz)
+	if not stats:
+		return
+	if "decoding" in stats:
+		d = stats["decoding"]
+		print(f"Summarization: {d['passthrough']} passed through ({d['trimmed']} trimmed), {d['greedy']} greedy, {d['beam']} beam search")
+	if "long_document" in stats:
+		h = stats["long_document"]
+		print(f"Long-document summarization: {h['windows']} windows over {h['docs']} docs ({h['long_docs']} multi-window), {h['reduce_rounds']} reduce rounds")
+	with open(os.path.join(exp_dir, "summarization_stats.json"), "w") as f:
+		json.dump(stats, f, indent=2)
+
+
 if __name__ == "__main__":
 	try:
+		parser = argparse.ArgumentParser(description="Run the MCA AI pipeline")
+		parser.add_argument("--config", default="configs/default.yaml")
+		parser.add_argument("--shard-index", type=int, default=None, help="Process only this shard (0-based) of the test split")
+		parser.add_argument("--num-shards", type=int, default=None, help="Number of shards documents are hashed into by id")
+		parser.add_argument("--shard-by", choices=("hash", "cost"), default="hash", help="cost: balance shards by predicted cost (needs balance.enabled)")
+		args = parser.parse_args()
+		if (args.shard_index is None) != (args.num_shards is None):
+			parser.error("--shard-index and --num-shards go together")
 		print("🚀 Starting MCA AI Project...")
-		main()
+		main(args.config, args.shard_index, args.num_shards, args.shard_by)
 	except KeyboardInterrupt:
 		print("\n⚠️  Project interrupted by user")
 	except Exception as e:
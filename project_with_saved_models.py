@@ -8,20 +8,20 @@ to avoid retraining every time.
 """
 
 import os
-import csv
 from pathlib import Path
 import pickle
 import json
 
-import pandas as pd
 from datasets import DatasetDict
 
+from mca_ai import tracing
 from mca_ai.config import load_config
 from mca_ai.data_loader import load_dataset_any
+from mca_ai.output import open_prediction_writers, source_ids
 from mca_ai.models.sentiment import SentimentPipeline
 from mca_ai.models.summarizer import Summarizer
 from mca_ai.models.keywords import extract_keywords
-from mca_ai.viz.wordcloud_utils import build_wordcloud
+from mca_ai.viz.wordfreq import build_wordcloud_from_frequencies, count_terms_parallel
 
 
 def ensure_dir(p: str):
@@ -158,6 +158,7 @@ def main(config_path: str = "configs/default.yaml"):
     print("=" * 60)
     
     cfg = load_config(config_path)
+    tracing.configure(cfg)
     exp_dir = os.path.join(cfg.paths.experiments_dir, "baseline")
     ensure_dir(exp_dir)
 
@@ -192,7 +193,8 @@ def main(config_path: str = "configs/default.yaml"):
     
     # Sentiment analysis
     print("📊 Running sentiment analysis...")
-    pred_labels = sentiment.predict(texts, batch_size=cfg.sentiment.batch_size)
+    with tracing.span("sentiment.predict", docs=len(texts)):
+        pred_labels = sentiment.predict(texts, batch_size=cfg.sentiment.batch_size)
     print(f"✅ Sentiment analysis completed: {len(pred_labels)} predictions")
     
     # Summarization
@@ -202,7 +204,8 @@ def main(config_path: str = "configs/default.yaml"):
         if i % 50 == 0:
             print(f"   Progress: {i}/{len(texts)}")
         try:
-            summary = summarizer.summarize(text)
+            with tracing.span("summarizer.summarize"):
+                summary = summarizer.summarize(text)
             summaries.append(summary)
         except Exception as e:
             print(f"   Error summarizing text {i}: {e}")
@@ -216,38 +219,46 @@ def main(config_path: str = "configs/default.yaml"):
         if i % 50 == 0:
             print(f"   Progress: {i}/{len(texts)}")
         try:
-            keywords = extract_keywords(text, top_k=cfg.keywords.top_k)
-            keywords_list.append("; ".join(keywords))
+            with tracing.span("keywords.extract"):
+                keywords = extract_keywords(text, top_k=cfg.keywords.top_k)
+            keywords_list.append(list(keywords))
         except Exception as e:
             print(f"   Error extracting keywords for text {i}: {e}")
-            keywords_list.append("Error in keyword extraction")
+            keywords_list.append(None)
     print(f"✅ Keyword extraction completed: {len(keywords_list)} extractions")
 
     # Save results
     print("💾 Saving results...")
-    rows = []
-    for i, t in enumerate(texts):
-        rows.append({
-            "text": t,
-            "sentiment": pred_labels[i],
-            "summary": summaries[i],
-            "keywords": keywords_list[i],
-        })
-    df = pd.DataFrame(rows)
-    csv_path = os.path.join(exp_dir, "predictions.csv")
-    df.to_csv(csv_path, index=False, quoting=csv.QUOTE_MINIMAL)
-    print(f"✅ Results saved: {csv_path}")
+    records = {
+        "id": source_ids(test_split),
+        "text": texts,
+        "sentiment": pred_labels,
+        "summary": summaries,
+        "keywords": keywords_list,
+        **{c: test_split[c] for c in (getattr(getattr(cfg, 'output', None), 'extra_columns', None) or [])},
+    }
+    for writer in open_prediction_writers(cfg, exp_dir):
+        with tracing.span(f"write.{type(writer).__name__}", rows=len(texts)) as sp:
+            sp.add_bytes(writer.write(records))
+        writer.close()
+        print(f"✅ Results saved: {writer.path}")
 
     # Word cloud
     print("☁️ Generating word cloud...")
     try:
-        wc = build_wordcloud(" ".join(texts), width=cfg.viz.wordcloud.width, height=cfg.viz.wordcloud.height, background_color=cfg.viz.wordcloud.background_color)
+        with tracing.span("wordcloud.count_terms", docs=len(texts)):
+            term_counts = count_terms_parallel(texts, num_proc=getattr(cfg.viz.wordcloud, 'num_proc', 1))
+        term_counts.save(os.path.join(exp_dir, "word_frequencies.json"))
+        with tracing.span("wordcloud.build"):
+            wc = build_wordcloud_from_frequencies(term_counts, width=cfg.viz.wordcloud.width, height=cfg.viz.wordcloud.height, background_color=cfg.viz.wordcloud.background_color)
         wc_path = os.path.join(exp_dir, "wordcloud.png")
         wc.to_file(wc_path)
         print(f"✅ Word cloud saved: {wc_path}")
     except Exception as e:
         print(f"❌ Error generating word cloud: {e}")
 
+    tracing.finish(exp_dir)
+
     # Save models for future use
     save_models_after_processing(sentiment, summarizer, cfg)
 
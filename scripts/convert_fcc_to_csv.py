@@ -2,60 +2,322 @@
 """
 Convert FCC PostgreSQL database to CSV format for the MCA AI project.
 This script extracts the main comment data from the fcc.pgsql file.
+
+The dump is streamed line by line: rows from its ``COPY ... FROM stdin``
+and ``INSERT`` sections are bulk-inserted into a local SQLite store, which
+is then exported to CSV or to chunked Parquet files for ``load_dataset_any``.
 """
 
 import os
+import re
+import argparse
 import pandas as pd
 import sqlite3
 from pathlib import Path
 
-def convert_pgsql_to_csv(pgsql_path: str, output_dir: str = "data/fcc"):
-    """Convert PostgreSQL dump to CSV format."""
+# Columns that get an index after ingestion, when the table has them
+ID_COLUMNS = ["id", "comment_id", "submission_id"]
+DATE_COLUMNS = ["date", "date_received", "date_submitted", "created_at", "submitted_at"]
+
+_COPY_START = re.compile(r"^COPY\s+(\S+)\s*(?:\((.*?)\))?\s+FROM\s+stdin", re.IGNORECASE)
+_INSERT_START = re.compile(r"^INSERT\s+INTO\s+(\S+)\s*(?:\((.*?)\))?\s*VALUES\s*", re.IGNORECASE | re.DOTALL)
+_COPY_ESCAPE = re.compile(r"\\(N|[0-7]{1,3}|x[0-9a-fA-F]{1,2}|.)")
+_COPY_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+
+
+def _table_name(raw: str) -> str:
+    """Strip schema prefix and quoting from a dump table name."""
+    return raw.split(".")[-1].strip('"')
+
+
+def _column_names(raw, width: int):
+    if raw:
+        return [c.strip().strip('"') for c in raw.split(",")]
+    return [f"col{i}" for i in range(width)]
+
+
+def _decode_copy_field(field: str):
+    """Decode one field of PostgreSQL's COPY text format."""
+    if field == "\\N":
+        return None
+    if "\\" not in field:
+        return field
+
+    def _sub(m):
+        esc = m.group(1)
+        if esc[0] in "01234567":
+            return chr(int(esc, 8))
+        if esc[0] == "x" and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return _COPY_ESCAPES.get(esc, esc)
+
+    return _COPY_ESCAPE.sub(_sub, field)
+
+
+def _parse_values(values: str):
+    """Parse the tuple list of an INSERT ... VALUES statement into rows."""
+    rows, row, i, n = [], None, 0, len(values)
+    while i < n:
+        ch = values[i]
+        if ch == "(" and row is None:
+            row = []
+            i += 1
+        elif ch == ")" and row is not None:
+            rows.append(row)
+            row = None
+            i += 1
+        elif row is None or ch in " \t\r\n,":
+            i += 1
+        elif ch == "'" or (ch in "eE" and values[i + 1:i + 2] == "'"):
+            backslash = ch != "'"
+            i += 2 if backslash else 1
+            buf = []
+            while i < n:
+                c = values[i]
+                if backslash and c == "\\" and i + 1 < n:
+                    buf.append(_COPY_ESCAPES.get(values[i + 1], values[i + 1]))
+                    i += 2
+                elif c == "'":
+                    if values[i + 1:i + 2] == "'":
+                        buf.append("'")
+                        i += 2
+                    else:
+                        i += 1
+                        break
+                else:
+                    buf.append(c)
+                    i += 1
+            row.append("".join(buf))
+        else:
+            j = i
+            while j < n and values[j] not in ",)":
+                j += 1
+            token = values[i:j].strip()
+            row.append(None if token.upper() == "NULL" else token)
+            i = j
+    return rows
+
+
+def _scan_quotes(text: str, in_string: bool, backslash: bool):
+    """Advance the string-literal state of an INSERT statement over ``text``."""
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if in_string:
+            if backslash and c == "\\":
+                i += 1
+            elif c == "'":
+                in_string = False
+        elif c == "'":
+            in_string = True
+            backslash = i > 0 and text[i - 1] in "eE"
+        i += 1
+    return in_string, backslash
+
+
+def iter_dump_rows(pgsql_path: str):
+    """Stream ``(table, columns, row)`` tuples out of a PostgreSQL dump.
+
+    Only one COPY line or one INSERT statement is held in memory at a time.
+    """
+    copy_table, copy_cols = None, None
+    stmt = []
+    in_string, backslash = False, False
+    with open(pgsql_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if copy_table is not None:
+                if line.rstrip("\r\n") == "\\.":
+                    copy_table, copy_cols = None, None
+                    continue
+                fields = [_decode_copy_field(v) for v in line.rstrip("\r\n").split("\t")]
+                if copy_cols is None:
+                    copy_cols = _column_names(None, len(fields))
+                yield copy_table, copy_cols, fields
+                continue
+
+            if stmt:
+                stmt.append(line)
+            else:
+                m = _COPY_START.match(line)
+                if m:
+                    copy_table = _table_name(m.group(1))
+                    copy_cols = _column_names(m.group(2), 0) if m.group(2) else None
+                    continue
+                if not line[:6].upper() == "INSERT":
+                    continue
+                stmt = [line]
+            in_string, backslash = _scan_quotes(line, in_string, backslash)
+
+            # An INSERT ends at a ';' outside of any string literal
+            if not in_string and line.rstrip().endswith(";"):
+                text = "".join(stmt).rstrip().rstrip(";")
+                stmt = []
+                m = _INSERT_START.match(text)
+                if not m:
+                    continue
+                table = _table_name(m.group(1))
+                for row in _parse_values(text[m.end():]):
+                    yield table, _column_names(m.group(2), len(row)), row
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def ingest_pgsql_to_sqlite(pgsql_path: str, db_path: str, batch_size: int = 50000) -> dict:
+    """Stream a PostgreSQL dump into a local SQLite database.
+
+    Rows are inserted in transactions of ``batch_size`` rows. Indexes on id and
+    date columns are created once all rows are loaded. Returns rows per table.
+    """
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    columns, buffers, counts = {}, {}, {}
+
+    def _flush(table):
+        rows = buffers[table]
+        if not rows:
+            return
+        width = len(columns[table])
+        sql = f"INSERT INTO {_quote(table)} VALUES ({', '.join('?' * width)})"
+        conn.execute("BEGIN")
+        conn.executemany(sql, [r[:width] + [None] * (width - len(r)) for r in rows])
+        conn.execute("COMMIT")
+        counts[table] += len(rows)
+        buffers[table] = []
+        print(f"  {table}: {counts[table]} rows")
+
+    for table, cols, row in iter_dump_rows(pgsql_path):
+        if table not in columns:
+            columns[table] = cols
+            buffers[table] = []
+            counts[table] = 0
+            col_defs = ", ".join(f"{_quote(c)} TEXT" for c in cols)
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+            conn.execute(f"CREATE TABLE {_quote(table)} ({col_defs})")
+        buffers[table].append(row)
+        if len(buffers[table]) >= batch_size:
+            _flush(table)
+    for table in columns:
+        _flush(table)
+
+    for table, cols in columns.items():
+        for col in [c for c in cols if c.lower() in ID_COLUMNS + DATE_COLUMNS]:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{col}')} ON {_quote(table)} ({_quote(col)})")
+    conn.close()
+    return counts
+
+
+def main_table(db_path: str) -> str:
+    """Return the table with the most rows, which holds the comments."""
+    conn = sqlite3.connect(db_path)
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    if not tables:
+        conn.close()
+        raise ValueError(f"No tables found in {db_path}")
+    sizes = {t: conn.execute(f"SELECT COUNT(*) FROM {_quote(t)}").fetchone()[0] for t in tables}
+    conn.close()
+    return max(sizes, key=sizes.get)
+
+
+def _order_clause(conn, table: str) -> str:
+    cols = [r[1] for r in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+    id_cols = [c for c in cols if c.lower() in ID_COLUMNS]
+    return f" ORDER BY {_quote(id_cols[0])}" if id_cols else ""
+
+
+def export_sqlite_to_parquet(db_path: str, output_dir: str = "data/fcc", table: str = None, rows_per_file: int = 100000):
+    """Export a table from the SQLite store as ``train-00000.parquet``, ``train-00001.parquet``, ...
+
+    ``load_dataset_any`` with ``data.source: local_parquet`` picks the parts up.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = table or main_table(db_path)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    for stale in Path(output_dir).glob("train-*.parquet"):
+        stale.unlink()
+
+    conn = sqlite3.connect(db_path)
+    cur = conn.execute(f"SELECT * FROM {_quote(table)}{_order_clause(conn, table)}")
+    names = [d[0] for d in cur.description]
+    schema = pa.schema([(name, pa.string()) for name in names])
+    paths = []
+    while True:
+        rows = cur.fetchmany(rows_per_file)
+        if not rows:
+            break
+        arrays = [pa.array([r[i] for r in rows], type=pa.string()) for i in range(len(names))]
+        part_path = os.path.join(output_dir, f"train-{len(paths):05d}.parquet")
+        pq.write_table(pa.Table.from_arrays(arrays, schema=schema), part_path)
+        paths.append(part_path)
+        print(f"✓ Wrote {part_path} ({len(rows)} rows)")
+    conn.close()
+    return paths
+
+
+def convert_pgsql_to_csv(pgsql_path: str, output_dir: str = "data/fcc", db_path: str = None, table: str = None, chunk_size: int = 100000):
+    """Convert PostgreSQL dump to CSV format via the local SQLite store."""
     print(f"Converting {pgsql_path} to CSV format...")
-    
+
     # Create output directory
     Path(output_dir).mkdir(parents=True, exist_ok=True)
-    
-    # Read the PostgreSQL dump file
-    with open(pgsql_path, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-    
-    # Extract INSERT statements (this is a simplified approach)
-    # In a real scenario, you'd use psycopg2 or similar to connect to PostgreSQL
-    print("Note: This is a simplified conversion. For full functionality, use PostgreSQL tools.")
-    
-    # Create a sample CSV with the structure we expect
-    sample_data = {
-        'id': range(1, 1001),
-        'text': [
-            f"Sample FCC comment #{i}: This is a test comment about telecommunications policy. "
-            f"Comment number {i} discusses various aspects of the proposed regulations."
-            for i in range(1, 1001)
-        ],
-        'label': ['positive' if i % 3 == 0 else 'negative' if i % 3 == 1 else 'neutral' for i in range(1, 1001)]
-    }
-    
-    df = pd.DataFrame(sample_data)
+    db_path = db_path or os.path.join(output_dir, "fcc.sqlite")
+
+    counts = ingest_pgsql_to_sqlite(pgsql_path, db_path)
+    if not counts:
+        raise ValueError(f"No COPY or INSERT rows found in {pgsql_path}")
+    table = table or max(counts, key=counts.get)
+
     csv_path = os.path.join(output_dir, "fcc_comments.csv")
-    df.to_csv(csv_path, index=False)
-    
-    print(f"✓ Created sample CSV: {csv_path}")
-    print(f"✓ Rows: {len(df)}")
-    print(f"✓ Columns: {list(df.columns)}")
-    
+    conn = sqlite3.connect(db_path)
+    query = f"SELECT * FROM {_quote(table)}{_order_clause(conn, table)}"
+    rows = 0
+    columns = []
+    for i, chunk in enumerate(pd.read_sql_query(query, conn, chunksize=chunk_size)):
+        chunk.to_csv(csv_path, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+        rows += len(chunk)
+        columns = list(chunk.columns)
+    conn.close()
+
+    print(f"✓ Created CSV from table '{table}': {csv_path}")
+    print(f"✓ Rows: {rows}")
+    print(f"✓ Columns: {columns}")
+
     return csv_path
 
 def main():
-    pgsql_path = "data/fcc/fcc.pgsql"
+    parser = argparse.ArgumentParser(description="Convert the FCC PostgreSQL dump for the MCA AI project")
+    parser.add_argument("--pgsql", default="data/fcc/fcc.pgsql", help="Path to the PostgreSQL dump")
+    parser.add_argument("--output-dir", default="data/fcc", help="Directory for the SQLite store and exports")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Export format")
+    parser.add_argument("--table", default=None, help="Table to export (default: the largest one)")
+    parser.add_argument("--rows-per-file", type=int, default=100000, help="Rows per Parquet part")
+    args = parser.parse_args()
+
+    pgsql_path = args.pgsql
     if not os.path.exists(pgsql_path):
         print(f"Error: {pgsql_path} not found!")
         return
-    
-    csv_path = convert_pgsql_to_csv(pgsql_path)
-    print(f"\nTo use this data, update configs/default.yaml:")
-    print(f"  data.source: csv")
+
+    if args.format == "parquet":
+        db_path = os.path.join(args.output_dir, "fcc.sqlite")
+        ingest_pgsql_to_sqlite(pgsql_path, db_path)
+        export_sqlite_to_parquet(db_path, args.output_dir, table=args.table, rows_per_file=args.rows_per_file)
+        print(f"\nTo use this data, update configs/default.yaml:")
+        print(f"  data.source: local_parquet")
+    else:
+        convert_pgsql_to_csv(pgsql_path, args.output_dir, table=args.table)
+        print(f"\nTo use this data, update configs/default.yaml:")
+        print(f"  data.source: csv")
     print(f"  data.text_field: text")
-    print(f"  paths.data_dir: ./data/fcc")
+    print(f"  paths.data_dir: {args.output_dir}")
 
 if __name__ == "__main__":
     main()
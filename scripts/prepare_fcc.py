@@ -1,13 +1,18 @@
 import os
+import json
+import fnmatch
+import argparse
 import tarfile
 from pathlib import Path
 
 SUPPORTED_EXTS = [".parquet", ".json", ".jsonl", ".csv"]
+ARCHIVES = ["fcc.tar.gz", "attachments.tar.gz", "search.tar.gz"]
+DEFAULT_INDEX = "data/fcc/archive_index.json"
 
 
 def extract_all(archives_dir: str = ".", out_dir: str = "data/fcc") -> None:
 	Path(out_dir).mkdir(parents=True, exist_ok=True)
-	for name in ["fcc.tar.gz", "attachments.tar.gz", "search.tar.gz"]:
+	for name in ARCHIVES:
 		arc_path = Path(archives_dir) / name
 		if not arc_path.exists():
 			print(f"Skip: {name} not found in {archives_dir}")
@@ -18,6 +23,101 @@ def extract_all(archives_dir: str = ".", out_dir: str = "data/fcc") -> None:
 	print("Extraction complete.")
 
 
+def index_archives(archives_dir: str = ".", index_path: str = DEFAULT_INDEX) -> dict:
+	"""Record name, size and offsets of every archive member in one streaming pass.
+
+	Offsets refer to the decompressed tar stream, so a member can later be read
+	with ``mca_ai.data_loader.iter_tar_member_chunks`` without a directory walk.
+	"""
+	index = {}
+	for name in ARCHIVES:
+		arc_path = Path(archives_dir) / name
+		if not arc_path.exists():
+			print(f"Skip: {name} not found in {archives_dir}")
+			continue
+		print(f"Indexing {arc_path}")
+		members = []
+		with tarfile.open(arc_path, "r|gz") as tar:
+			for m in tar:
+				if not m.isfile():
+					continue
+				members.append({"name": m.name, "size": m.size, "offset": m.offset, "offset_data": m.offset_data})
+		index[name] = {"path": str(arc_path.resolve()), "members": members}
+		print(f"  {len(members)} files, {sum(m['size'] for m in members)/1e6:.1f} MB")
+	Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+	with open(index_path, "w") as f:
+		json.dump(index, f)
+	print(f"Index written: {index_path}")
+	return index
+
+
+def load_archive_index(index_path: str = DEFAULT_INDEX) -> dict:
+	with open(index_path) as f:
+		return json.load(f)
+
+
+def select_members(index: dict, patterns=None, min_size: int = 0, top: int = None) -> dict:
+	"""Pick table files from the index by glob pattern and size, largest first."""
+	patterns = patterns or [f"*{ext}" for ext in SUPPORTED_EXTS]
+	picked = []
+	for arc_name, entry in index.items():
+		for m in entry["members"]:
+			if m["size"] < min_size:
+				continue
+			if any(fnmatch.fnmatch(m["name"], p) or fnmatch.fnmatch(os.path.basename(m["name"]), p) for p in patterns):
+				picked.append((arc_name, m))
+	picked.sort(key=lambda am: am[1]["size"], reverse=True)
+	if top is not None:
+		picked = picked[:top]
+	selected = {}
+	for arc_name, m in picked:
+		selected.setdefault(arc_name, set()).add(m["name"])
+	return selected
+
+
+def extract_selected(archives_dir: str = ".", out_dir: str = "data/fcc", index_path: str = DEFAULT_INDEX, patterns=None, min_size: int = 0, top: int = None) -> None:
+	"""Extract only the indexed members chosen by ``select_members``."""
+	if not Path(index_path).exists():
+		index_archives(archives_dir, index_path)
+	selected = select_members(load_archive_index(index_path), patterns, min_size, top)
+	if not selected:
+		print("No archive members matched the selection.")
+		return
+	Path(out_dir).mkdir(parents=True, exist_ok=True)
+	for name, wanted in selected.items():
+		arc_path = Path(archives_dir) / name
+		print(f"Extracting {len(wanted)} member(s) of {arc_path} -> {out_dir}")
+		with tarfile.open(arc_path, "r|gz") as tar:
+			remaining = set(wanted)
+			for m in tar:
+				if m.name in remaining:
+					tar.extract(m, out_dir)
+					remaining.discard(m.name)
+					print(f" - {m.name}  ({m.size/1e6:.1f} MB)")
+				if not remaining:
+					break
+	print("Selective extraction complete.")
+
+
+def probe_archive_index(index_path: str = DEFAULT_INDEX) -> None:
+	"""Like ``probe_main_table`` but reads the archive index instead of walking the tree."""
+	index = load_archive_index(index_path)
+	selected = select_members(index, top=10)
+	sizes = {(a, m["name"]): m["size"] for a, e in index.items() for m in e["members"]}
+	candidates = sorted(((a, n) for a, names in selected.items() for n in names), key=lambda k: sizes[k], reverse=True)
+	if not candidates:
+		print("No candidate table files (.parquet/.json/.jsonl/.csv) found.")
+		return
+	print("Top candidate archive members (by size):")
+	for arc_name, name in candidates:
+		print(f" - {arc_name}:{name}  ({sizes[(arc_name, name)]/1e6:.1f} MB)")
+	print("\nTo read a member without extracting, update configs/default.yaml:")
+	print(" - data.source: tar_member")
+	print(" - data.archive_path: the archive holding the chosen member")
+	print(" - data.archive_member: member name (.csv/.jsonl)")
+	print(f" - data.archive_index: {index_path}")
+
+
 def probe_main_table(root: str = "data/fcc") -> None:
 	root_p = Path(root)
 	candidates = []
@@ -38,8 +138,26 @@ def probe_main_table(root: str = "data/fcc") -> None:
 
 
 def main():
-	extract_all()
-	probe_main_table()
+	parser = argparse.ArgumentParser(description="Prepare the FCC archives")
+	parser.add_argument("--mode", choices=["extract", "index", "select"], default="extract",
+		help="extract: unpack everything; index: record members only; select: extract matching members")
+	parser.add_argument("--archives-dir", default=".")
+	parser.add_argument("--out-dir", default="data/fcc")
+	parser.add_argument("--index", default=DEFAULT_INDEX)
+	parser.add_argument("--pattern", action="append", help="Glob for members to extract (repeatable)")
+	parser.add_argument("--min-size-mb", type=float, default=0.0)
+	parser.add_argument("--top", type=int, default=None, help="Keep only the N largest matches")
+	args = parser.parse_args()
+
+	if args.mode == "index":
+		index_archives(args.archives_dir, args.index)
+		probe_archive_index(args.index)
+	elif args.mode == "select":
+		extract_selected(args.archives_dir, args.out_dir, args.index, args.pattern, int(args.min_size_mb * 1e6), args.top)
+		probe_main_table(args.out_dir)
+	else:
+		extract_all(args.archives_dir, args.out_dir)
+		probe_main_table(args.out_dir)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+import pytest
+
+from mca_ai.output import CsvPredictionWriter, ParquetPredictionWriter
+from mca_ai.viz.aggregates import AggregateStore, build_aggregates
+
+SENTIMENTS = ["positive", "negative", None, "positive", "negative", "positive", "positive"]
+
+
+def _predictions(exp_dir, writer_cls, chunk=3):
+    writer = writer_cls(str(exp_dir))
+    n = len(SENTIMENTS)
+    for start in range(0, n, chunk):
+        rows = range(start, min(start + chunk, n))
+        writer.write({
+            "id": [f"doc-{i}" for i in rows],
+            "text": ["x" * (i * 60) for i in rows],
+            "sentiment": [SENTIMENTS[i] for i in rows],
+            "summary": [f"summary {i}" for i in rows],
+            # Extraction failed for doc-1
+            "keywords": [None if i == 1 else ["net", f"k{i}"] for i in rows],
+            "confidence": None,
+        })
+    writer.close()
+
+
+@pytest.fixture(params=[CsvPredictionWriter, ParquetPredictionWriter], ids=["csv", "parquet"])
+def store(tmp_path, request):
+    _predictions(tmp_path, request.param)
+    build_aggregates(str(tmp_path), page_size=2)
+    return AggregateStore(str(tmp_path / "aggregates"))
+
+
+def test_counts_and_keywords(store):
+    assert store.sentiment_counts() == {"positive": 4, "negative": 2, "unknown": 1}
+    keywords = dict(store.top_keywords())
+    # The CSV error marker is a failed extraction, not a keyword
+    assert keywords["net"] == 6 and "k1" not in keywords
+    assert not any("Error" in k for k in keywords)
+    edges, counts = store.length_histogram("negative")
+    assert sum(counts) == 2 and counts[1] == 1 and counts[0] == 1
+
+
+def test_pages_are_grouped_by_sentiment(store):
+    assert store.num_pages() == 2 + 1 + 1
+    assert store.num_pages("positive") == 2 and store.num_pages("missing") == 0
+    positive = store.page(0, "positive") + store.page(1, "positive")
+    assert [row["id"] for row in positive] == ["doc-0", "doc-3", "doc-5", "doc-6"]
+    assert store.page(2, "positive") == []
+    assert [row["id"] for row in store.page(0, "unknown")] == ["doc-2"]
+    everything = [row["id"] for p in range(store.num_pages()) for row in store.page(p)]
+    assert sorted(everything) == [f"doc-{i}" for i in range(7)]
+    assert "text" not in store.page(0)[0]
+
+
+def test_document_lookup(store):
+    doc = store.document("doc-5")
+    assert doc["summary"] == "summary 5" and doc["length"] == 300 and len(doc["text"]) == 300
+    assert store.document("doc-1")["keywords"] is None
+    assert store.document("missing") is None
+    assert store.document("doc-4", columns=["id", "sentiment"]) == {"id": "doc-4", "sentiment": "negative"}
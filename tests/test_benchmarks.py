@@ -0,0 +1,57 @@
+import multiprocessing as mp
+
+import pytest
+
+from benchmarks.corpus import build_corpus, sample_lengths, write_corpus_csv
+from benchmarks.run import _await_result, _percentile, compare_results
+
+
+def test_corpus_is_reproducible_and_follows_lengths():
+    assert build_corpus(20, "uniform", 500, seed=7) == build_corpus(20, "uniform", 500, seed=7)
+    assert build_corpus(20, "uniform", 500, seed=7) != build_corpus(20, "uniform", 500, seed=8)
+    docs = build_corpus(10, "fixed", 300)
+    assert [len(d) for d in docs] == [300] * 10
+
+
+def test_lognormal_lengths_keep_the_requested_mean():
+    lengths = sample_lengths(20000, "lognormal", 1000, sigma=0.5)
+    assert sum(lengths) / len(lengths) == pytest.approx(1000, rel=0.05)
+    with pytest.raises(ValueError):
+        sample_lengths(1, "pareto")
+
+
+def test_corpus_csv_has_id_and_text(tmp_path):
+    import pandas as pd
+
+    path = write_corpus_csv(["a, \"quoted\"\nline", "b"], str(tmp_path))
+    df = pd.read_csv(path)
+    assert df["id"].tolist() == [0, 1]
+    assert df["text"].tolist() == ["a, \"quoted\"\nline", "b"]
+
+
+def test_percentile_interpolates():
+    assert _percentile([], 0.5) is None
+    assert _percentile([1, 2, 3, 4], 0.5) == pytest.approx(2.5)
+    assert _percentile([5], 0.99) == 5
+
+
+def test_compare_flags_regressions_in_both_directions():
+    baseline = {"stages": {"sentiment": {"docs_per_sec": 100.0, "peak_rss_mb": 1000.0}}}
+    current = {"stages": {"sentiment": {"docs_per_sec": 85.0, "peak_rss_mb": 1050.0}, "summarize": {"docs_per_sec": 1.0}}}
+    regressions = compare_results(baseline, current, threshold=0.10)
+    assert [(stage, metric) for stage, metric, *_ in regressions] == [("sentiment", "docs_per_sec")]
+    assert compare_results(baseline, current, threshold=0.01)[-1][1] == "peak_rss_mb"
+
+
+def _exit_without_result(code):
+    raise SystemExit(code)
+
+
+def test_dead_stage_process_is_reported_as_error():
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_exit_without_result, args=(3,))
+    proc.start()
+    result = _await_result(proc, queue, timeout=60, poll=0.1)
+    proc.join()
+    assert result == {"error": "stage process exited with code 3 without a result"}
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mca_ai.models.cascade import LexiconScorer, SentimentCascade, canonical_label, predict_sentiment
+
+
+class FakeTransformer:
+    """Labels everything neutral in the cardiffnlp ``LABEL_n`` vocabulary and records what it saw."""
+
+    def __init__(self, label="LABEL_1"):
+        self.label = label
+        self.model = SimpleNamespace(config=SimpleNamespace(id2label={0: "LABEL_0", 1: "LABEL_1", 2: "LABEL_2"}))
+        self.seen = []
+
+    def predict(self, texts, batch_size=16):
+        self.seen.extend(texts)
+        return [self.label] * len(texts)
+
+
+POSITIVE = "I strongly support this excellent, helpful and fair proposal."
+NEGATIVE = "This is a terrible, costly and harmful rule that will hurt consumers."
+UNCLEAR = "The filing was submitted on Tuesday."
+
+
+def test_canonical_label():
+    assert canonical_label("LABEL_2") == "positive"
+    assert canonical_label("Negative") == "negative"
+    assert canonical_label("neu") == "neutral"
+    assert canonical_label("other") == "other"
+
+
+def test_lexicon_confidence_and_negation():
+    scorer = LexiconScorer()
+    label, confidence = scorer.score(POSITIVE)
+    assert label == "positive" and confidence >= 0.8
+    assert scorer.score("I do not support this")[0] == "negative"
+    assert scorer.score(UNCLEAR) == ("neutral", 0.0)
+    assert scorer.score("I have mixed feelings, there are pros and cons")[0] == "neutral"
+
+
+def test_only_unconfident_documents_reach_the_transformer():
+    transformer = FakeTransformer()
+    cascade = SentimentCascade(transformer, "lexicon", threshold=0.8)
+    labels, confidences = cascade.predict_with_confidence([POSITIVE, UNCLEAR, NEGATIVE])
+    assert transformer.seen == [UNCLEAR]
+    # Tier-one labels come back in the transformer's vocabulary
+    assert labels == ["LABEL_2", "LABEL_1", "LABEL_0"]
+    assert confidences[1] is None and confidences[0] >= 0.8
+    report = cascade.report()
+    assert (report["docs"], report["tier1_docs"], report["transformer_docs"]) == (3, 2, 1)
+
+
+def test_agreement_does_not_count_towards_cascade_stats():
+    transformer = FakeTransformer(label="LABEL_2")
+    cascade = SentimentCascade(transformer, threshold=0.8)
+    cascade.predict([POSITIVE])
+    assert cascade.agreement([POSITIVE, NEGATIVE]) == 0.5
+    assert cascade.stats["docs"] == 1
+    assert cascade.stats["agreement_docs"] == 2
+    assert cascade.agreement([]) == 1.0
+
+
+def test_plain_model_has_no_confidences():
+    labels, confidences = predict_sentiment(FakeTransformer(), [POSITIVE, UNCLEAR])
+    assert labels == ["LABEL_1", "LABEL_1"] and confidences is None
+
+
+def test_unknown_tier_is_rejected():
+    with pytest.raises(ValueError):
+        SentimentCascade(FakeTransformer(), tier="bert")
@@ -0,0 +1,51 @@
+import sqlite3
+
+from convert_fcc_to_csv import export_sqlite_to_parquet, ingest_pgsql_to_sqlite, iter_dump_rows, main_table
+
+
+DUMP = """\
+SET client_encoding = 'UTF8';
+COPY public.comments (id, text, date) FROM stdin;
+2\tsecond\\tcomment\t2017-05-02
+1\tfirst\\ncomment\t\\N
+\\.
+INSERT INTO public.filers (id, name) VALUES (1, 'O''Brien'), (2, 'semi;colon
+name');
+INSERT INTO public.filers (id, name) VALUES (3, NULL);
+"""
+
+
+def _write_dump(tmp_path):
+    path = tmp_path / "fcc.pgsql"
+    path.write_text(DUMP)
+    return str(path)
+
+
+def test_iter_dump_rows_decodes_copy_and_insert(tmp_path):
+    rows = list(iter_dump_rows(_write_dump(tmp_path)))
+    assert rows[0] == ("comments", ["id", "text", "date"], ["2", "second\tcomment", "2017-05-02"])
+    assert rows[1][2] == ["1", "first\ncomment", None]
+    filers = [row for table, _, row in rows if table == "filers"]
+    assert filers == [["1", "O'Brien"], ["2", "semi;colon\nname"], ["3", None]]
+
+
+def test_ingest_indexes_ids_and_dates(tmp_path):
+    db_path = str(tmp_path / "store" / "fcc.sqlite")
+    counts = ingest_pgsql_to_sqlite(_write_dump(tmp_path), db_path, batch_size=1)
+    assert counts == {"comments": 2, "filers": 3}
+    conn = sqlite3.connect(db_path)
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert {"idx_comments_id", "idx_comments_date", "idx_filers_id"} <= indexes
+    assert main_table(db_path) == "filers"
+
+
+def test_export_parquet_orders_by_id(tmp_path):
+    import pyarrow.parquet as pq
+
+    db_path = str(tmp_path / "fcc.sqlite")
+    ingest_pgsql_to_sqlite(_write_dump(tmp_path), db_path)
+    paths = export_sqlite_to_parquet(db_path, str(tmp_path / "out"), table="comments", rows_per_file=1)
+    assert len(paths) == 2
+    ids = [pq.read_table(p).column("id").to_pylist()[0] for p in paths]
+    assert ids == ["1", "2"]
@@ -0,0 +1,83 @@
+from types import SimpleNamespace as NS
+
+import pytest
+from datasets import Dataset, DatasetDict
+
+from mca_ai.costmodel import (
+    CostModel,
+    TimingLedger,
+    _fit,
+    balanced_assignment,
+    build_cost_model,
+    longest_first,
+    plan_chunk_sizes,
+    split_tokens,
+)
+from mca_ai.shards import cost_shard_plan, select_shard
+
+
+def _cfg(tmp_path, enabled=True):
+    return NS(
+        paths=NS(experiments_dir=str(tmp_path)),
+        balance=NS(enabled=enabled),
+        sentiment=NS(max_length=256),
+        summarization=NS(max_input_length=512, max_summary_length=64, adaptive=NS(enabled=True)),
+    )
+
+
+def test_fit_recovers_measured_coefficients():
+    rows = [{"docs": d, "tokens": t, "seconds": 0.1 * d + 0.001 * t} for d, t in ((1, 100), (4, 900), (2, 5000), (8, 300))]
+    fitted = _fit(rows, {"per_doc": 9.0, "per_token": 9.0})
+    assert fitted["per_doc"] == pytest.approx(0.1)
+    assert fitted["per_token"] == pytest.approx(0.001)
+    assert _fit(rows[:2], {"per_doc": 9.0, "per_token": 9.0}) == {"per_doc": 9.0, "per_token": 9.0}
+
+
+def test_ledger_calibrates_the_next_model(tmp_path):
+    ledger = TimingLedger(str(tmp_path / "ledger.jsonl"))
+    model = CostModel(_cfg(tmp_path), ledger)
+    for n in (10, 20, 40, 80):
+        model.record_chunk("keywords", [n] * 4, seconds=4 * (0.5 + 0.01 * n))
+    assert CostModel(_cfg(tmp_path), ledger).coeffs["keywords"]["per_doc"] == pytest.approx(0.5)
+
+
+def test_stages_only_pay_for_tokens_they_read(tmp_path):
+    model = CostModel(_cfg(tmp_path))
+    assert model.stage_tokens("sentiment", 10000) == 256
+    assert model.stage_tokens("summarize", 10000) == 512
+    assert model.stage_tokens("keywords", 10000) == 10000
+    # Short documents are passed through by the adaptive summarizer
+    assert model.stage_tokens("summarize", 64) == 0
+    assert model.doc_cost(10) < model.doc_cost(1000) < model.doc_cost(100000)
+
+
+def test_chunks_and_bins_balance_predicted_seconds():
+    costs = [9.0, 1.0, 5.0, 5.0, 2.0, 8.0]
+    order = longest_first(costs)
+    assert order == [0, 5, 2, 3, 4, 1]
+    assert plan_chunk_sizes([costs[i] for i in order], budget=10.0, max_rows=2) == [1, 1, 2, 2]
+    assignment = balanced_assignment(costs, 2)
+    loads = [sum(c for c, b in zip(costs, assignment) if b == k) for k in range(2)]
+    assert sorted(loads) == [15.0, 15.0]
+
+
+def test_cost_plan_is_frozen_once_saved(tmp_path):
+    ds = DatasetDict({"test": Dataset.from_dict({"id": list(range(30)), "text": ["word " * (i * 50) for i in range(30)]})})
+    assert split_tokens(ds["test"])[:2] == [1, 63]
+    model = CostModel(_cfg(tmp_path))
+    plan = cost_shard_plan(str(tmp_path), ds["test"], 3, model)
+    assert sorted(set(plan["assignment"].values())) == [0, 1, 2]
+
+    # A recalibrated model does not move documents between shards
+    model.coeffs = {s: {"per_doc": 1.0, "per_token": 0.0} for s in model.stages}
+    assert cost_shard_plan(str(tmp_path), ds["test"], 3, model) == plan
+    with pytest.raises(ValueError):
+        cost_shard_plan(str(tmp_path), ds["test"], 4, model)
+
+    sizes = [len(select_shard(DatasetDict(ds), i, 3, plan=plan)["test"]) for i in range(3)]
+    assert sum(sizes) == 30
+
+
+def test_balance_is_opt_in(tmp_path):
+    assert build_cost_model(_cfg(tmp_path, enabled=False)) is None
+    assert build_cost_model(_cfg(tmp_path)).ledger.path == str(tmp_path / "cost_ledger.jsonl")
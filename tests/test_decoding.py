@@ -0,0 +1,68 @@
+from mca_ai.models.decoding import AdaptiveSummarizer, summarize_chunk, summarizer_stats
+
+
+class WordTokenizer:
+    """Whitespace tokenizer with the slice of the Hugging Face interface the policies use."""
+
+    def __call__(self, text, truncation=False, max_length=None, add_special_tokens=True):
+        ids = text.split()
+        return {"input_ids": ids[:max_length] if truncation and max_length else ids}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+class FakeSummarizer:
+    def __init__(self, fail_on=None):
+        self.tokenizer = WordTokenizer()
+        self.max_input_len = 100
+        self.max_summary_len = 4
+        self.num_beams = 4
+        self.fail_on = fail_on
+        self.calls = []
+
+    def summarize(self, text):
+        if self.fail_on and self.fail_on in text:
+            raise RuntimeError("bad input")
+        self.calls.append((len(text.split()), self.num_beams))
+        return f"summary of {len(text.split())} words"
+
+    def summarize_many(self, texts):
+        return [self.summarize(t) for t in texts]
+
+
+def _words(n):
+    return " ".join(f"w{i}" for i in range(n))
+
+
+def test_inputs_are_routed_by_length():
+    base = FakeSummarizer()
+    policy = AdaptiveSummarizer(base, passthrough_tokens=6, greedy_max_tokens=20)
+    assert policy.summarize(_words(3)) == _words(3)
+    assert policy.summarize(_words(6)) == _words(4)
+    assert policy.summarize(_words(10)) == "summary of 10 words"
+    assert policy.summarize(_words(30)) == "summary of 30 words"
+    # Greedy decoding only for the short one, and the beam width is restored
+    assert base.calls == [(10, 1), (30, 4)]
+    assert base.num_beams == 4
+    report = policy.report()
+    assert (report["passthrough"], report["greedy"], report["beam"], report["trimmed"]) == (2, 1, 1, 1)
+    assert report["skipped_fraction"] == 0.5
+
+
+def test_summarize_many_keeps_input_order():
+    base = FakeSummarizer()
+    policy = AdaptiveSummarizer(base, passthrough_tokens=2, greedy_max_tokens=20)
+    texts = [_words(30), _words(1), _words(10)]
+    assert policy.summarize_many(texts) == ["summary of 30 words", _words(1), "summary of 10 words"]
+    assert sorted(base.calls) == [(10, 1), (30, 4)]
+
+
+def test_failed_batch_is_retried_one_by_one_without_double_counting():
+    base = FakeSummarizer(fail_on="w25")
+    policy = AdaptiveSummarizer(base, passthrough_tokens=2, greedy_max_tokens=20)
+    texts = [_words(10), _words(1), _words(30)]
+    summaries = summarize_chunk(policy, texts)
+    assert summaries == ["summary of 10 words", _words(1), "Error in summarization"]
+    stats = summarizer_stats(policy)["decoding"]
+    assert (stats["passthrough"], stats["greedy"], stats["beam"]) == (1, 1, 1)
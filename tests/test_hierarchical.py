@@ -0,0 +1,64 @@
+from mca_ai.models.hierarchical import HierarchicalSummarizer
+
+
+class IntTokenizer:
+    """Each word is one token id; words are the ids written out."""
+
+    eos_token_id = 1
+
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": [int(w) for w in text.split()]}
+
+
+class FakeSummarizer:
+    tokenizer = IntTokenizer()
+    max_input_len = 12
+    max_summary_len = 4
+    num_beams = 4
+
+
+class FirstTokens(HierarchicalSummarizer):
+    """Summarizes a window to its first two tokens instead of running a model."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def _generate(self, windows):
+        self.batches.append(len(windows))
+        return [" ".join(str(t) for t in w[:2]) for w in windows]
+
+
+def _doc(start, n):
+    return " ".join(str(i) for i in range(start, start + n))
+
+
+def test_windows_overlap_and_respect_the_input_budget():
+    hs = FirstTokens(FakeSummarizer(), overlap=2, prefix="")
+    # max_input_len 12 minus one EOS token
+    assert hs.window_tokens == 11
+    windows = hs.windows(_doc(100, 25))
+    assert [len(w) for w in windows] == [11, 11, 7]
+    assert windows[1][:2] == windows[0][-2:]
+    assert len(FirstTokens(FakeSummarizer(), overlap=2, max_windows=2, prefix="").windows(_doc(100, 25))) == 2
+    assert hs.windows("") == [[]]
+
+
+def test_windows_of_all_documents_share_batches():
+    hs = FirstTokens(FakeSummarizer(), overlap=0, batch_size=4, prefix="")
+    summaries = hs.summarize_many([_doc(100, 5), _doc(200, 30), _doc(300, 3)])
+    # One short doc each side of a three-window doc: five windows in two map batches
+    assert hs.batches[:2] == [4, 1]
+    assert summaries[0] == "100 101" and summaries[2] == "300 301"
+    # The long doc's partials "200 201 211 212 222 223" are reduced to their first window
+    assert summaries[1] == "200 201"
+    report = hs.report()
+    assert (report["docs"], report["long_docs"], report["windows"], report["reduce_rounds"]) == (3, 1, 5, 1)
+
+
+def test_long_partials_are_reduced_in_several_rounds():
+    hs = FirstTokens(FakeSummarizer(), overlap=0, batch_size=8, prefix="")
+    (summary,) = hs.summarize_many([_doc(1000, 110)])
+    assert hs.stats["windows"] == 10
+    assert hs.stats["reduce_rounds"] == 2
+    assert summary == "1000 1001"
@@ -0,0 +1,128 @@
+import json
+import os
+from types import SimpleNamespace as NS
+
+import pandas as pd
+import pytest
+
+from mca_ai import incremental, workers
+from mca_ai.incremental import IncrementalRunner, Watermark, _read_tail, read_new_rows
+
+
+def _write(path, data: bytes, mode="wb"):
+    with open(path, mode) as f:
+        f.write(data)
+
+
+def test_unsettled_last_row_without_newline_waits(tmp_path):
+    path = str(tmp_path / "drop.csv")
+    _write(path, b"id,text\n1,first\n2,sec")
+    data, offset = _read_tail(path, 0, True, settle_seconds=3600)
+    assert data == b"id,text\n1,first\n"
+    # Once the file has settled its end closes the last record
+    data, offset = _read_tail(path, offset, True, settle_seconds=0)
+    assert data == b"2,sec" and offset == os.path.getsize(path)
+
+
+def test_quoted_newlines_stay_in_one_record(tmp_path):
+    path = str(tmp_path / "drop.csv")
+    _write(path, b'id,text\n1,"line one\nline two"\n2,"still open\n')
+    df, offset, rows, header = read_new_rows(path, 0, 0, settle_seconds=3600)
+    assert header == "id,text"
+    assert df["text"].tolist() == ["line one\nline two"]
+    _write(path, b'done"\n3,last\n', "ab")
+    df, offset, rows, header = read_new_rows(path, offset, rows, header, settle_seconds=3600)
+    assert df["id"].tolist() == ["2", "3"]
+    assert df["text"].tolist() == ["still open\ndone", "last"]
+    assert rows == 3 and offset == os.path.getsize(path)
+
+
+def test_appended_jsonl_is_read_from_the_offset(tmp_path):
+    path = str(tmp_path / "drop.jsonl")
+    _write(path, b'{"id": 1, "text": "a"}\n{"id": 2, "te')
+    df, offset, rows, _ = read_new_rows(path, 0, 0, settle_seconds=3600)
+    assert df["id"].tolist() == [1] and rows == 1
+    _write(path, b'xt": "b"}\n', "ab")
+    df, offset, rows, _ = read_new_rows(path, offset, rows, settle_seconds=3600)
+    assert df["text"].tolist() == ["b"] and rows == 2
+
+
+def test_parquet_skips_rows_already_read(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / "drop.parquet")
+    pq.write_table(pa.table({"id": [str(i) for i in range(10)]}), path, row_group_size=4)
+    df, _, rows, _ = read_new_rows(path, 0, 6)
+    assert df["id"].tolist() == ["6", "7", "8", "9"] and rows == 10
+
+
+def test_watermark_adds_counts_atomically(tmp_path):
+    wm = Watermark(str(tmp_path / "wm.sqlite"))
+    assert wm.unseen(["a", "b", "a"]) == [0, 1]
+    wm.advance("f.csv", 10, 2, "id,text", ["a", "b"], {"predictions.csv": 100}, {"aggregates": {"docs": 2}}, [("net", 2), ("fcc", 1)], [("all", "all", "terms", "net", 2)])
+    wm.advance("f.csv", 20, 3, "id,text", ["c"], {"predictions.csv": 150}, None, [("net", 1)], [("all", "all", "terms", "net", 1)])
+    assert wm.unseen(["a", "c", "d"]) == [2]
+    assert wm.top_terms(1) == [("net", 3)]
+    assert list(wm.rollup_rows()) == [("all", "all", "terms", "net", 3)]
+    assert wm.outputs() == {"predictions.csv": 150}
+    assert wm.file_state("f.csv") == (20, 3, "id,text")
+    with pytest.raises(Exception):
+        wm.advance("g.csv", 5, 1, None, ["e"], terms=[("bad",)])
+    assert wm.file_state("g.csv") == (0, 0, None) and wm.unseen(["e"]) == [0]
+
+
+class Lengths:
+    def predict(self, texts, batch_size=16):
+        return ["positive" if len(t) > 10 else "negative" for t in texts]
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    cfg = NS(
+        paths=NS(experiments_dir=str(tmp_path / "experiments")),
+        data=NS(text_field="text", map_num_proc=1),
+        sentiment=NS(model_name="m", max_length=256, batch_size=8),
+        summarization=NS(model_name="t5-small", max_input_length=512),
+        keywords=NS(top_k=3),
+        incremental=NS(settle_seconds=0),
+    )
+    monkeypatch.setattr(incremental, "load_config", lambda path: cfg)
+    monkeypatch.setattr(workers, "_keywords", lambda texts, top_k, offset=0: [t.split()[:1] for t in texts])
+
+    def load_models(self):
+        workers.init_replica(cfg, Lengths(), NS(summarize=str.upper))
+        self.loaded = True
+
+    monkeypatch.setattr(IncrementalRunner, "_load_models", load_models)
+    os.makedirs(tmp_path / "incoming")
+    r = IncrementalRunner("config.yaml", str(tmp_path / "incoming"), str(tmp_path / "out"))
+    yield r
+    r.close()
+
+
+def test_runner_processes_only_new_comments(runner, tmp_path):
+    path = tmp_path / "incoming" / "drop.csv"
+    _write(path, b"id,text\n1,support this rule strongly\n2,no\n")
+    assert runner.run_once() == 2
+    assert runner.run_once() == 0
+
+    # A re-delivered comment is skipped, a new one appended
+    _write(path, b"2,no\n3,another long comment here\n", "ab")
+    assert runner.run_once() == 1
+    predictions = pd.read_csv(tmp_path / "out" / "predictions.csv", dtype=str)
+    assert predictions["id"].tolist() == ["1", "2", "3"]
+    agg = json.loads((tmp_path / "out" / "aggregates.json").read_text())
+    assert agg["docs"] == 3 and agg["sentiment_counts"] == {"positive": 2, "negative": 1}
+    terms = json.loads((tmp_path / "out" / "word_frequencies.json").read_text())
+    assert terms["docs"] == 3 and terms["frequencies"]["comment"] == 1
+
+
+def test_rows_written_after_the_last_commit_are_discarded(runner, tmp_path):
+    _write(tmp_path / "incoming" / "drop.csv", b"id,text\n1,first comment\n")
+    runner.run_once()
+    csv_path = tmp_path / "out" / "predictions.csv"
+    committed = csv_path.read_bytes()
+    _write(csv_path, b"9,half written", "ab")
+    runner.run_once()
+    assert csv_path.read_bytes() == committed
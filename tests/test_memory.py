@@ -0,0 +1,49 @@
+import json
+
+from mca_ai import memory
+from mca_ai.memory import MemoryGuard, MemoryTracker, current_rss_mb
+
+
+def test_rss_reading_is_positive():
+    assert current_rss_mb() > 0
+
+
+def test_tracker_reports_each_stage(tmp_path):
+    tracker = MemoryTracker(trace_python=True, interval=0.01)
+    for _ in range(2):
+        with tracker.stage("build"):
+            data = [bytes(1000) for _ in range(1000)]
+            del data
+    tracker.report(str(tmp_path))
+    stage = json.loads((tmp_path / "memory_report.json").read_text())["build"]
+    assert stage["calls"] == 2
+    assert stage["peak_rss_mb"] >= stage["rss_start_mb"]
+    assert stage["py_peak_mb"] >= 1.0
+
+
+def test_guard_without_ceiling_never_resizes():
+    guard = MemoryGuard(None)
+    guard.check()
+    assert guard.batch_size(16) == 16
+
+
+def test_guard_halves_batches_near_the_ceiling_and_recovers(monkeypatch):
+    rss = [950.0]
+    monkeypatch.setattr(memory, "current_rss_mb", lambda: rss[0])
+    guard = MemoryGuard(1000, soft_ratio=0.85, recover_ratio=0.7)
+    guard.check()
+    guard.check()
+    assert guard.scale == 0.25 and guard.shrinks == 2
+    assert guard.batch_size(16) == 4
+    assert guard.batch_size(1) == 1
+
+    # Between the recover and soft thresholds the scale holds
+    rss[0] = 800.0
+    guard.check()
+    assert guard.scale == 0.25
+
+    rss[0] = 500.0
+    guard.check()
+    guard.check()
+    guard.check()
+    assert guard.scale == 1.0 and guard.recoveries == 2
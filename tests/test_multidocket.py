@@ -0,0 +1,90 @@
+import json
+from types import SimpleNamespace as NS
+
+import pandas as pd
+import pytest
+from datasets import Dataset, DatasetDict
+
+from mca_ai import multidocket, workers
+from mca_ai.models import cascade, decoding
+from mca_ai.multidocket import _split_output, mixed_batches, run_dockets
+
+
+def _cfg(n, model="m"):
+    return NS(
+        n=n,
+        paths=NS(experiments_dir="unused"),
+        sentiment=NS(model_name=model, max_length=256, batch_size=4),
+        summarization=NS(model_name="t5-small", max_input_length=512),
+        keywords=NS(top_k=1),
+        viz=NS(wordcloud=NS(width=60, height=30, background_color="white")),
+    )
+
+
+def _split(name, n):
+    return Dataset.from_dict({"id": [f"{name}-{i}" for i in range(n)], "text": [f"{name} comment {i}" for i in range(n)]})
+
+
+class FakeDocket:
+    sentiment_ids_col = summary_ids_col = None
+
+    def __init__(self, name, n):
+        self.name = name
+        self.split = _split(name, n)
+
+    def batches(self, rows):
+        from mca_ai.data_loader import iter_record_batches
+        return iter_record_batches(self.split, rows, ["id", "text"])
+
+
+def test_partial_batches_are_topped_up_from_the_next_docket():
+    dockets = [FakeDocket("a", 5), FakeDocket("b", 2), FakeDocket("c", 6)]
+    batches = list(mixed_batches(dockets, 4))
+    layout = [[(d.name, s, b.num_rows) for d, s, b in segments] for segments, _ in batches]
+    assert layout == [
+        [("a", 0, 4)],
+        [("a", 4, 1), ("b", 0, 2), ("c", 0, 1)],
+        [("c", 1, 4)],
+        [("c", 5, 1)],
+    ]
+    _, inputs = batches[1]
+    assert inputs["text"] == ["a comment 4", "b comment 0", "b comment 1", "c comment 0"]
+    assert inputs["sentiment_ids"] is None
+
+
+def test_outputs_are_split_back_by_segment_size():
+    out = {k: list(range(5)) for k in ("sentiment", "confidence", "summary", "keywords")}
+    pieces = _split_output(out, [1, 3, 1])
+    assert [p["sentiment"] for p in pieces] == [[0], [1, 2, 3], [4]]
+    # Plain transformer models report no confidences at all
+    out["confidence"] = None
+    assert [p["confidence"] for p in _split_output(out, [2, 3])] == [None, None]
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    configs = {"first.yaml": _cfg(3), "second.yaml": _cfg(2), "other.yaml": _cfg(2, model="other")}
+    monkeypatch.setattr(multidocket, "load_config", configs.__getitem__)
+    monkeypatch.setattr(multidocket, "load_dataset_any", lambda cfg: DatasetDict({"train": _split("train", 1), "test": _split(f"n{cfg.n}", cfg.n)}))
+    monkeypatch.setattr(cascade, "build_sentiment_model", lambda cfg, split: NS(predict=lambda texts, batch_size=16: [t.split()[0] for t in texts]))
+    monkeypatch.setattr(decoding, "build_summarizer", lambda cfg: NS(summarize=str.upper))
+    monkeypatch.setattr(workers, "_keywords", lambda texts, top_k, offset=0: [None] * len(texts))
+    yield
+    workers._REPLICA.clear()
+
+
+def test_each_docket_gets_its_own_rows(tmp_path, fake_models):
+    stats = run_dockets(["first.yaml", "second.yaml", "first.yaml"], str(tmp_path), batch_rows=4)
+    assert list(stats["dockets"]) == ["first", "second", "first-2"]
+    assert stats["batches"] == 2 and stats["mixed_batches"] == 2
+    for name, n in (("first", 3), ("second", 2), ("first-2", 3)):
+        predictions = pd.read_csv(tmp_path / name / "predictions.csv", dtype=str)
+        assert predictions["id"].tolist() == [f"n{n}-{i}" for i in range(n)]
+        assert set(predictions["sentiment"]) == {f"n{n}"}
+        summary = json.loads((tmp_path / name / "summary_stats.json").read_text())
+        assert summary["docs"] == n and summary["sentiment_counts"] == {f"n{n}": n}
+
+
+def test_dockets_must_share_model_settings(tmp_path, fake_models):
+    with pytest.raises(ValueError, match="other.yaml"):
+        run_dockets(["first.yaml", "other.yaml"], str(tmp_path))
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from mca_ai.output import KEYWORD_ERROR, CsvPredictionWriter, ParquetPredictionWriter, open_prediction_writers
+
+
+def _records(ids, sentiments=None):
+    n = len(ids)
+    return {
+        "id": ids,
+        "text": [f"comment {i}" for i in ids],
+        "sentiment": sentiments or ["positive"] * n,
+        "summary": ["short"] * n,
+        "keywords": [["net", "neutrality"]] + [None] * (n - 1),
+        "confidence": [0.5] * n,
+    }
+
+
+def test_parquet_columns_are_typed(tmp_path):
+    writer = ParquetPredictionWriter(str(tmp_path))
+    writer.write(_records([10, 11], ["positive", "negative"]))
+    writer.write(_records([12]))
+    writer.close()
+    table = pq.read_table(writer.path)
+    assert table.num_rows == writer.rows == 3
+    assert table.schema.field("id").type == pa.string()
+    assert pa.types.is_dictionary(table.schema.field("sentiment").type)
+    assert table.schema.field("keywords").type == pa.list_(pa.string())
+    assert table.schema.field("confidence").type == pa.float32()
+    assert table.column("id").to_pylist() == ["10", "11", "12"]
+    assert table.column("keywords").to_pylist() == [["net", "neutrality"], None, ["net", "neutrality"]]
+    assert pq.ParquetFile(writer.path).num_row_groups == 2
+
+
+def test_parquet_append_writes_numbered_parts(tmp_path):
+    first = ParquetPredictionWriter(str(tmp_path), append=True)
+    assert first.path.endswith("predictions-00000.parquet")
+    first.write(_records([1]))
+    first.close()
+    second = ParquetPredictionWriter(str(tmp_path), append=True)
+    assert second.path.endswith("predictions-00001.parquet")
+
+
+def test_csv_joins_keywords_and_marks_failures(tmp_path):
+    writer = CsvPredictionWriter(str(tmp_path))
+    writer.write(_records([1, 2]))
+    CsvPredictionWriter(str(tmp_path), append=True).write(_records([3]))
+    df = pd.read_csv(writer.path, dtype=str)
+    assert df["id"].tolist() == ["1", "2", "3"]
+    assert df["keywords"].tolist() == ["net; neutrality", KEYWORD_ERROR, "net; neutrality"]
+
+
+def test_writers_follow_output_format(tmp_path):
+    def cfg(fmt):
+        return SimpleNamespace(output=SimpleNamespace(format=fmt))
+
+    assert [type(w) for w in open_prediction_writers(SimpleNamespace(), str(tmp_path))] == [CsvPredictionWriter]
+    assert [type(w) for w in open_prediction_writers(cfg("both"), str(tmp_path))] == [CsvPredictionWriter, ParquetPredictionWriter]
+    with pytest.raises(ValueError):
+        open_prediction_writers(cfg("xlsx"), str(tmp_path))
@@ -0,0 +1,78 @@
+import copy
+import json
+import os
+from types import SimpleNamespace as NS
+
+import pyarrow.parquet as pq
+
+from mca_ai.pipeline import StagedPipeline, fingerprints
+
+
+def _cfg(tmp_path):
+    return NS(
+        seed=42,
+        paths=NS(experiments_dir=str(tmp_path / "experiments"), data_dir=str(tmp_path / "data")),
+        data=NS(source="synthetic", text_field="text", split_ratio=[0.8, 0.2], map_num_proc=1, fast_limit=40),
+        sentiment=NS(model_name="sentiment-model", max_length=256, batch_size=16),
+        summarization=NS(model_name="t5-small", max_input_length=512, max_summary_length=64, num_beams=4),
+        keywords=NS(method="keybert", top_k=5),
+        viz=NS(wordcloud=NS(width=80, height=40, background_color="white")),
+        output=NS(format="parquet"),
+    )
+
+
+def _changed(a, b):
+    return {stage for stage in a if a[stage] != b[stage]}
+
+
+def test_fingerprints_follow_config_and_dependencies(tmp_path):
+    cfg = _cfg(tmp_path)
+    base = fingerprints(cfg)
+
+    other = copy.deepcopy(cfg)
+    other.sentiment.batch_size = 64
+    assert fingerprints(other) == base
+
+    other.sentiment.model_name = "another-model"
+    assert _changed(base, fingerprints(other)) == {"sentiment", "write"}
+
+    other = copy.deepcopy(cfg)
+    other.data.text_field = "comment"
+    assert _changed(base, fingerprints(other)) == {"clean", "sentiment", "summarize", "keywords", "wordcloud", "write"}
+
+    assert _changed(base, fingerprints(cfg, shard=(0, 2))) == set(base)
+    assert fingerprints(cfg, shard=(0, 2)) != fingerprints(cfg, shard=(0, 2), shard_by="cost")
+
+
+def test_cached_stages_are_not_rerun(tmp_path):
+    cfg = _cfg(tmp_path)
+    exp_dir = str(tmp_path / "experiments" / "baseline")
+    assert StagedPipeline(cfg, exp_dir).run(["load", "clean"]) == ["load", "clean"]
+    assert StagedPipeline(cfg, exp_dir).run(["load", "clean"]) == []
+    assert StagedPipeline(cfg, exp_dir).run(["load", "clean"], force={"clean"}) == ["clean"]
+
+    # A new clean fingerprint replaces the old artifact instead of piling up
+    other = copy.deepcopy(cfg)
+    other.data.text_field = "label"
+    pipeline = StagedPipeline(other, exp_dir)
+    assert pipeline.run(["load", "clean"]) == ["clean"]
+    assert os.listdir(os.path.join(pipeline.store.root, "clean")) == [pipeline.fps["clean"]]
+
+
+def test_write_reuses_cached_model_outputs(tmp_path):
+    cfg = _cfg(tmp_path)
+    exp_dir = str(tmp_path / "experiments" / "baseline")
+    pipeline = StagedPipeline(cfg, exp_dir)
+    n = len(pipeline.output("clean")["test"])
+    results = {"sentiment": ["positive"] * n, "summarize": ["summary"] * n, "keywords": [["policy"]] * n}
+    for stage, values in results.items():
+        path = pipeline.store.begin(stage, pipeline.fps[stage])
+        with open(os.path.join(path, "results.json"), "w") as f:
+            json.dump(values, f)
+        pipeline.store.commit(stage, pipeline.fps[stage], {})
+
+    assert pipeline.run(["write"]) == ["load", "clean", "write"]
+    table = pq.read_table(os.path.join(exp_dir, "predictions.parquet"))
+    assert table.num_rows == n
+    assert table.column("id").to_pylist() == [str(i) for i in pipeline.output("clean")["test"]["id"]]
+    assert set(table.column("sentiment").to_pylist()) == {"positive"}
@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+from mca_ai.preprocess import estimate_char_budget, truncate_chars
+
+
+TEXT = "alpha beta gamma delta epsilon zeta eta theta"
+
+
+class WordTokenizer:
+    """One token per word, with character offsets like a fast tokenizer."""
+
+    def _encode(self, text):
+        return [m.span() for m in re.finditer(r"\S+", text)]
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        if isinstance(text, list):
+            return {"input_ids": [list(range(len(self._encode(t)))) for t in text]}
+        offsets = self._encode(text)
+        out = {"input_ids": list(range(len(offsets)))}
+        if return_offsets_mapping:
+            out["offset_mapping"] = offsets
+        return out
+
+
+def test_short_text_is_unchanged():
+    assert truncate_chars("short", 10, "head_tail") == "short"
+
+
+def test_strategies_cut_on_word_boundaries():
+    assert truncate_chars(TEXT, 18, "head") == "alpha beta gamma"
+    assert truncate_chars(TEXT, 16, "tail") == "zeta eta theta"
+    assert truncate_chars(TEXT, 24, "head_tail", 0.5) == "alpha beta eta theta"
+    with pytest.raises(ValueError):
+        truncate_chars(TEXT, 10, "middle")
+
+
+@pytest.mark.parametrize("ratio, same_as", [(0, "tail"), (0.0, "tail"), (1, "head"), (1.0, "head")])
+def test_edge_head_ratios_fall_back_to_one_side(ratio, same_as):
+    assert truncate_chars(TEXT, 18, "head_tail", ratio) == truncate_chars(TEXT, 18, same_as)
+
+
+@pytest.mark.parametrize("ratio", [-0.1, 1.5])
+def test_out_of_range_head_ratio_is_rejected(ratio):
+    with pytest.raises(ValueError):
+        truncate_chars(TEXT, 18, "head_tail", ratio)
+    with pytest.raises(ValueError):
+        estimate_char_budget(WordTokenizer(), [TEXT], 3, "head_tail", ratio)
+
+
+def test_no_budget_when_nothing_is_long():
+    assert estimate_char_budget(WordTokenizer(), ["a b", "c"], 5) == (None, 1.0)
+
+
+@pytest.mark.parametrize("strategy, ratio", [("head", 0.5), ("tail", 0.5), ("head_tail", 0.3), ("head_tail", 0), ("head_tail", 1)])
+def test_budget_still_fills_the_token_window(strategy, ratio):
+    tok = WordTokenizer()
+    texts = [" ".join(f"w{i}x{'y' * (i % 7)}" for i in range(n)) for n in (40, 80, 160, 5)]
+    budget, fill = estimate_char_budget(tok, texts, 20, strategy, ratio, min_fill=1.0)
+    assert fill == 1.0
+    for text in texts[:3]:
+        cut = truncate_chars(text, budget, strategy, ratio)
+        assert len(cut) < len(text)
+        assert len(tok(cut)["input_ids"]) >= 20
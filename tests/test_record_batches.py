@@ -0,0 +1,57 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datasets import Dataset
+
+from mca_ai.data_loader import batch_column, iter_record_batches
+from mca_ai.output import CsvPredictionWriter, ParquetPredictionWriter
+
+
+def _split(n=10):
+    return Dataset.from_dict({"id": list(range(100, 100 + n)), "text": [f"t{i}" for i in range(n)], "extra": ["x"] * n})
+
+
+def test_batches_are_arrow_slices_covering_the_split():
+    batches = list(iter_record_batches(_split(), 4, ["id", "text", "missing"]))
+    assert [start for start, _ in batches] == [0, 4, 8]
+    assert all(isinstance(b, pa.Table) for _, b in batches)
+    assert batches[0][1].column_names == ["id", "text"]
+    assert [r for _, b in batches for r in b.column("id").to_pylist()] == list(range(100, 110))
+
+
+def test_callable_batch_size_is_read_before_every_batch():
+    sizes = iter([1, 2, 3, 100])
+    batches = list(iter_record_batches(_split(), lambda: next(sizes)))
+    assert [(start, b.num_rows) for start, b in batches] == [(0, 1), (1, 2), (3, 3), (6, 4)]
+
+
+def test_reordered_split_keeps_its_ids():
+    split = _split().select([9, 0, 5]).flatten_indices()
+    ((_, batch),) = iter_record_batches(split, 8, ["id", "text"])
+    assert batch.column("id").to_pylist() == [109, 100, 105]
+    assert batch_column(batch, "text") == ["t9", "t0", "t5"]
+
+
+def test_batch_column_falls_back_to_text():
+    ((_, batch),) = iter_record_batches(_split(2), 8, ["text"])
+    assert batch_column(batch, "sentiment_text") == ["t0", "t1"]
+
+
+def test_writers_take_arrow_columns_directly(tmp_path):
+    ((_, batch),) = iter_record_batches(_split(3), 8)
+    records = {
+        "id": batch.column("id"),
+        "text": batch.column("text"),
+        "sentiment": ["positive"] * 3,
+        "summary": ["s"] * 3,
+        "keywords": [["k"]] * 3,
+        "confidence": None,
+        "extra": batch.column("extra"),
+    }
+    parquet = ParquetPredictionWriter(str(tmp_path), extra_columns=["extra"])
+    parquet.write(records)
+    parquet.close()
+    CsvPredictionWriter(str(tmp_path), extra_columns=["extra"]).write(records)
+    table = pq.read_table(parquet.path)
+    assert table.column("id").to_pylist() == ["100", "101", "102"]
+    assert table.column("extra").to_pylist() == ["x"] * 3
+    assert (tmp_path / "predictions.csv").read_text().splitlines()[1].startswith("100,t0,positive")
@@ -0,0 +1,84 @@
+from types import SimpleNamespace as NS
+
+import pyarrow as pa
+
+from mca_ai.rollup import FacetRollup, batch_facets, build_rollup, time_window
+
+FACETS = {
+    "stakeholder_type": ["industry", "individual", None, "industry"],
+    "date": ["2024-01-05", "2024-01-31T10:00", "2024-02-01", "not a date"],
+}
+TEXTS = ["broadband pricing harms rural users", "pricing fair", None, "rural broadband"]
+SENTIMENTS = ["negative", "positive", "neutral", "negative"]
+KEYWORDS = [["pricing"], ["pricing", "fair"], None, ["rural"]]
+
+
+def _rollup(**kwargs):
+    rollup = FacetRollup(dimensions=["stakeholder_type", "author_type"], time_grains=("month", "week"), **kwargs)
+    rollup.update(FACETS, TEXTS, SENTIMENTS, KEYWORDS)
+    return rollup
+
+
+def test_time_windows():
+    assert time_window("2024-01-01", "day") == "2024-01-01"
+    assert time_window("2024-01-01T23:59", "week") == "2024-W01"
+    assert time_window("2023-12-31", "week") == "2023-W52"
+    assert time_window("2024-03-15", "month") == "2024-03"
+    assert time_window(None, "month") == time_window("soon", "month") == "unknown"
+
+
+def test_cells_per_value_window_and_trend():
+    rollup = _rollup()
+    assert rollup.docs == 4
+    stakeholders = rollup.facet("stakeholder_type")
+    assert {v: c["docs"] for v, c in stakeholders.items()} == {"individual": 1, "industry": 2, "unknown": 1}
+    industry = stakeholders["industry"]
+    assert industry["sentiment"] == {"negative": 2}
+    assert industry["keywords"] == {"pricing": 1, "rural": 1}
+    assert industry["terms"]["rural"] == 2 and industry["terms"]["broadband"] == 2
+    assert industry["length_sum"] == len(TEXTS[0]) + len(TEXTS[3])
+    # Columns absent from the chunk get no cells
+    assert rollup.facet("author_type") == {}
+    assert {v: c["docs"] for v, c in rollup.facet("month").items()} == {"2024-01": 2, "2024-02": 1, "unknown": 1}
+    trend = rollup.facet("stakeholder_type|month")
+    assert trend["industry|2024-01"]["docs"] == 1 and "terms" not in trend["industry|2024-01"]
+    assert rollup.corpus_terms().counts["pricing"] == 2 and rollup.corpus_terms().docs == 4
+
+
+def test_merge_equals_one_pass():
+    first = FacetRollup(dimensions=["stakeholder_type"])
+    first.update({k: v[:2] for k, v in FACETS.items()}, TEXTS[:2], SENTIMENTS[:2], KEYWORDS[:2])
+    second = FacetRollup(dimensions=["stakeholder_type"])
+    second.update({k: v[2:] for k, v in FACETS.items()}, TEXTS[2:], SENTIMENTS[2:], KEYWORDS[2:])
+    whole = FacetRollup(dimensions=["stakeholder_type"])
+    whole.update(FACETS, TEXTS, SENTIMENTS, KEYWORDS)
+    assert first.merge(second).to_dict() == whole.to_dict()
+
+
+def test_rows_round_trip():
+    rollup = _rollup()
+    rebuilt = FacetRollup(dimensions=["stakeholder_type", "author_type"], time_grains=("month", "week"))
+    rebuilt.add_rows(rollup.rows())
+    assert rebuilt.docs == 4
+    # Including values whose documents had no terms, and trend cells that keep none
+    for facet in ("stakeholder_type", "month", "stakeholder_type|week"):
+        assert rebuilt.facet(facet) == rollup.facet(facet)
+    # Adding the same rows again doubles every count
+    rebuilt.add_rows(rollup.rows())
+    assert rebuilt.docs == 8 and rebuilt.facet("week")["2024-W01"]["docs"] == 2
+
+
+def test_saved_rollup_is_continued(tmp_path):
+    path = str(tmp_path / "rollup.json")
+    _rollup(max_terms=2).save(path)
+    cfg = NS(rollup=NS(enabled=True, dimensions=["other"]))
+    loaded = build_rollup(cfg, path)
+    assert loaded.dimensions == ["stakeholder_type", "author_type"] and loaded.docs == 4
+    assert len(loaded.facet("all")["all"]["terms"]) == 2
+    assert build_rollup(cfg, str(tmp_path / "missing.json")).dimensions == ["other"]
+    assert build_rollup(NS(rollup=NS(enabled=False)), path) is None
+
+
+def test_batch_facets_skips_absent_columns():
+    batch = pa.table({"text": ["a"], "stakeholder_type": ["industry"]})
+    assert batch_facets(batch, ["stakeholder_type", "date"]) == {"stakeholder_type": ["industry"]}
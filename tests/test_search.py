@@ -0,0 +1,82 @@
+import sqlite3
+from types import SimpleNamespace as NS
+
+import pyarrow as pa
+import pytest
+
+from mca_ai.search import SearchIndex, fts_query, open_search_index
+
+
+def _records(rows):
+    ids, texts, sentiments, keywords, stakeholders = zip(*rows)
+    return {
+        "id": pa.array(ids),
+        "text": pa.array(texts),
+        "sentiment": list(sentiments),
+        "summary": [t[:20] for t in texts],
+        "keywords": list(keywords),
+        "confidence": [0.9 if s == "negative" else 0.4 for s in sentiments],
+        "stakeholder_type": pa.array(stakeholders),
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search" / "index.sqlite"))
+    index.add(_records([
+        ("1", "Audit rotation would raise costs for small firms.", "negative", ["audit rotation"], "industry"),
+        ("2", "We support mandatory audit rotation.", "positive", None, "individual"),
+        ("3", "Net neutrality protects consumers.", "positive", ["net neutrality"], "individual"),
+        ("4", "Rotating auditors every year is burdensome.", "negative", ["auditors"], "industry"),
+    ]), extra_columns=["stakeholder_type"])
+    yield index
+    index.close()
+
+
+def test_plain_words_are_quoted_terms():
+    assert fts_query("audit rotation!") == '"audit" "rotation"'
+    assert fts_query("audit OR rotation") == "audit OR rotation"
+    assert fts_query("audit*") == "audit*"
+
+
+def test_ranked_hits_with_stems(index):
+    result = index.search("audit rotation")
+    assert result["total"] == 2
+    # The keyword hit outranks the body-only one
+    assert [h["id"] for h in result["hits"]] == ["1", "2"]
+    assert result["hits"][0]["keywords"] == ["audit rotation"]
+    assert result["hits"][1]["keywords"] == []
+    assert "[rotation]" in result["hits"][0]["snippet"]
+    assert {h["id"] for h in index.search("rotate")["hits"]} == {"1", "2", "4"}
+
+
+def test_filters(index):
+    assert [h["id"] for h in index.search("rotation", sentiment="positive")["hits"]] == ["2"]
+    assert {h["id"] for h in index.search("rotate", filters={"stakeholder_type": "industry"})["hits"]} == {"1", "4"}
+    assert index.search("rotate", filters={"stakeholder_type": "nobody"})["total"] == 0
+    confident = index.search("rotate", min_confidence=0.5, page_size=1)
+    assert confident["total"] == 2 and len(confident["hits"]) == 1
+    assert index.search("rotate", min_confidence=0.5, page_size=1, page=2)["hits"] == []
+
+
+def test_readding_an_id_replaces_it(index):
+    index.add(_records([("2", "Actually I now oppose rotation.", "negative", None, "individual")]), extra_columns=["stakeholder_type"])
+    assert index.docs() == 4
+    assert index.search("mandatory")["total"] == 0
+    hits = index.search("oppose", with_text=True)["hits"]
+    assert [(h["id"], h["sentiment"]) for h in hits] == [("2", "negative")]
+    assert hits[0]["text"] == "Actually I now oppose rotation."
+    index.optimize()
+    assert index.search("rotation")["total"] == 3
+
+
+def test_readonly_and_config(tmp_path, index):
+    reader = SearchIndex(index.path, readonly=True)
+    assert reader.docs() == 4
+    with pytest.raises(sqlite3.OperationalError):
+        reader.add(_records([("5", "new", "positive", None, "x")]))
+    reader.close()
+    assert open_search_index(NS(search=NS(enabled=False)), str(tmp_path)) is None
+    opened = open_search_index(NS(search=NS(enabled=True)), str(tmp_path))
+    assert opened.path == str(tmp_path / "search.sqlite")
+    opened.close()
@@ -0,0 +1,96 @@
+import json
+import os
+from collections import Counter
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from datasets import Dataset, DatasetDict
+
+from mca_ai.data_loader import add_positional_ids
+from mca_ai.output import CsvPredictionWriter, ParquetPredictionWriter, source_ids
+from mca_ai.shards import mark_shard_done, merge_shards, select_shard, shard_dir, shard_of
+from mca_ai.viz.wordfreq import TermCounter
+
+NUM_SHARDS = 3
+
+
+def _ds(n=60):
+    test = Dataset.from_dict({"id": [f"doc-{i}" for i in range(n)], "text": [f"comment number {i}" for i in range(n)]})
+    return DatasetDict({"train": test.select(range(10)), "test": test})
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert shard_of("doc-1", 7) == shard_of("doc-1", 7)
+    assert {shard_of(f"doc-{i}", 4) for i in range(200)} == {0, 1, 2, 3}
+    assert shard_of(5, 4) == shard_of("5", 4)
+
+
+def test_shards_partition_the_test_split():
+    seen = []
+    for i in range(NUM_SHARDS):
+        ds = select_shard(_ds(), i, NUM_SHARDS)
+        assert len(ds["train"]) == 10
+        seen.extend(ds["test"]["id"])
+    assert sorted(seen) == sorted(_ds()["test"]["id"])
+    with pytest.raises(ValueError):
+        select_shard(_ds(), NUM_SHARDS, NUM_SHARDS)
+
+
+def test_positional_ids_survive_sharding():
+    raw = DatasetDict({"test": Dataset.from_dict({"text": [f"t{i}" for i in range(20)]})})
+    with pytest.raises(KeyError):
+        source_ids(raw["test"])
+    ds = add_positional_ids(raw)
+    shard = select_shard(ds, 1, NUM_SHARDS)["test"]
+    assert 0 < len(shard) < 20
+    assert all(text == f"t{i}" for i, text in zip(shard["id"], shard["text"]))
+
+
+def _run_shards(exp_dir, skip=()):
+    for i in range(NUM_SHARDS):
+        if i in skip:
+            continue
+        out = shard_dir(exp_dir, i, NUM_SHARDS)
+        os.makedirs(out)
+        test = select_shard(_ds(), i, NUM_SHARDS)["test"]
+        n = len(test)
+        records = {
+            "id": test["id"],
+            "text": test["text"],
+            "sentiment": ["positive"] * n,
+            "summary": ["s"] * n,
+            "keywords": [["k"]] * n,
+            "confidence": [None] * n,
+        }
+        for writer in (CsvPredictionWriter(out), ParquetPredictionWriter(out)):
+            writer.write(records)
+            writer.close()
+        TermCounter().update(test["text"]).save(os.path.join(out, "word_frequencies.json"))
+        with open(os.path.join(out, "summary_stats.json"), "w") as f:
+            json.dump({"decoding": {"greedy": n, "skipped_fraction": 0.5}}, f)
+        mark_shard_done(out, i, NUM_SHARDS, n, Counter(records["sentiment"]))
+
+
+def test_merge_refuses_unfinished_shards(tmp_path):
+    _run_shards(str(tmp_path), skip={1})
+    with pytest.raises(RuntimeError, match=r"\[1\]"):
+        merge_shards(str(tmp_path), NUM_SHARDS)
+
+
+def test_merged_outputs_have_each_id_once(tmp_path):
+    exp_dir = str(tmp_path)
+    _run_shards(exp_dir)
+    summary = merge_shards(exp_dir, NUM_SHARDS, wordcloud_size=(60, 30))
+    ids = _ds()["test"]["id"]
+
+    csv_ids = pd.read_csv(tmp_path / "predictions.csv", dtype=str)["id"].tolist()
+    parquet_ids = pq.read_table(tmp_path / "predictions.parquet").column("id").to_pylist()
+    for merged in (csv_ids, parquet_ids):
+        assert len(merged) == len(set(merged)) == len(ids)
+        assert set(merged) == set(ids)
+
+    assert summary["docs"] == sum(summary["docs_per_shard"]) == len(ids)
+    assert summary["sentiment_counts"] == {"positive": len(ids)}
+    assert summary["stage_stats"]["summary_stats.json"] == {"decoding": {"greedy": len(ids)}}
+    assert TermCounter.load(str(tmp_path / "word_frequencies.json")).docs == len(ids)
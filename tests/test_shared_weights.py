@@ -0,0 +1,92 @@
+import os
+import sys
+from types import SimpleNamespace as NS
+
+import pytest
+
+from mca_ai import workers
+from mca_ai.memory import memory_breakdown_mb
+from mca_ai.workers import ReplicaPool, torch_modules, weights_mb
+
+
+class FakeParam:
+    def __init__(self, n):
+        self.n = n
+        self.requires_grad = True
+
+    def numel(self):
+        return self.n
+
+    def element_size(self):
+        return 4
+
+    def requires_grad_(self, flag):
+        self.requires_grad = flag
+
+
+class FakeModule:
+    def __init__(self, *sizes):
+        self.params = [FakeParam(n) for n in sizes]
+        self.training = True
+
+    def parameters(self):
+        return iter(self.params)
+
+    def eval(self):
+        self.training = False
+
+
+class Labeller:
+    """Sentiment model whose label proves which process loaded it."""
+
+    def __init__(self, origin):
+        self.model = FakeModule(250000)
+        self.origin = origin
+
+    def predict(self, texts, batch_size=16):
+        return [self.origin] * len(texts)
+
+
+def test_memory_breakdown_separates_private_pages():
+    breakdown = memory_breakdown_mb()
+    assert breakdown["rss"] > 0
+    if "private" in breakdown:
+        assert breakdown["private"] <= breakdown["rss"]
+        assert breakdown["pss"] <= breakdown["rss"]
+
+
+def test_modules_are_found_through_wrappers_once():
+    shared = FakeModule(10)
+    sent = NS(model=FakeModule(1000), transformer=None)
+    cascade = NS(transformer=NS(pipeline=sent))
+    sumz = NS(summarizer=NS(model=shared), model=shared)
+    modules = torch_modules(cascade, sumz)
+    assert len(modules) == 2
+    assert weights_mb(cascade, sumz) == pytest.approx(4040 / 1e6)
+
+
+def test_report_averages_private_memory_per_worker():
+    pool = ReplicaPool("config.yaml", 2)
+    pool.workers = {
+        1: {"docs": 4, "seconds": 2.0, "memory_mb": {"rss": 900.0, "private": 100.0}},
+        2: {"docs": 2, "seconds": 1.0, "memory_mb": {"rss": 800.0, "private": 60.0}},
+    }
+    assert pool.report()["incremental_mb_per_worker"] == 80.0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fork start method")
+def test_forked_replicas_use_the_parent_models(monkeypatch):
+    cfg = NS(sentiment=NS(batch_size=2), summarization=NS(), keywords=NS(top_k=1))
+    monkeypatch.setattr(workers, "load_config", lambda path: cfg)
+    monkeypatch.setattr(workers, "build_sentiment_model", lambda cfg, split: Labeller(f"parent {os.getpid()}"))
+    monkeypatch.setattr(workers, "build_summarizer", lambda cfg: NS(summarize=str.upper))
+    monkeypatch.setattr(workers, "_set_threads", lambda cpus, intra, inter: None)
+    monkeypatch.setattr(workers, "_keywords", lambda texts, top_k, offset=0: [None] * len(texts))
+
+    with ReplicaPool("config.yaml", 2, pin_cpus=False, share_weights="fork") as pool:
+        assert pool.weights_mb == pytest.approx(1.0)
+        inputs = {"start": 0, "text": ["a"], "sentiment_text": ["a"], "summary_text": ["a"]}
+        results = [out for _, out in pool.imap((k, inputs) for k in range(4))]
+    assert {out["sentiment"][0] for out in results} == {f"parent {os.getpid()}"}
+    assert all(out["pid"] != os.getpid() for out in results)
+    assert workers._REPLICA == {}
@@ -0,0 +1,51 @@
+import io
+import tarfile
+
+from mca_ai.data_loader import iter_tar_member_chunks
+from prepare_fcc import extract_selected, index_archives, select_members
+
+
+def _add(tar, name, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _archive(tmp_path):
+    with tarfile.open(tmp_path / "fcc.tar.gz", "w:gz") as tar:
+        _add(tar, "fcc/readme.txt", b"not a table")
+        _add(tar, "fcc/comments.csv", b"id,text\n" + b"".join(b"%d,comment %d\n" % (i, i) for i in range(25)))
+        _add(tar, "fcc/filers.jsonl", b'{"id": 1, "name": "a"}\n{"id": 2, "name": "b"}\n')
+    return tmp_path
+
+
+def test_index_records_offsets_and_selects_tables(tmp_path):
+    index_path = str(tmp_path / "index.json")
+    index = index_archives(str(_archive(tmp_path)), index_path)
+    members = {m["name"]: m for m in index["fcc.tar.gz"]["members"]}
+    assert set(members) == {"fcc/readme.txt", "fcc/comments.csv", "fcc/filers.jsonl"}
+    assert all(m["offset_data"] > m["offset"] for m in members.values())
+    assert select_members(index) == {"fcc.tar.gz": {"fcc/comments.csv", "fcc/filers.jsonl"}}
+    assert select_members(index, top=1) == {"fcc.tar.gz": {"fcc/comments.csv"}}
+
+
+def test_chunks_read_through_index_match_direct_read(tmp_path):
+    archives = _archive(tmp_path)
+    index_path = str(tmp_path / "index.json")
+    index_archives(str(archives), index_path)
+    archive = str(archives / "fcc.tar.gz")
+    indexed = list(iter_tar_member_chunks(archive, "fcc/comments.csv", chunk_size=10, index_path=index_path))
+    assert [len(c) for c in indexed] == [10, 10, 5]
+    direct = list(iter_tar_member_chunks(archive, "fcc/comments.csv", chunk_size=10))
+    assert [c["text"].tolist() for c in indexed] == [c["text"].tolist() for c in direct]
+    (jsonl,) = iter_tar_member_chunks(archive, "fcc/filers.jsonl", index_path=index_path)
+    assert jsonl["name"].tolist() == ["a", "b"]
+
+
+def test_extract_selected_writes_only_matching_members(tmp_path):
+    archives = _archive(tmp_path)
+    out = tmp_path / "out"
+    extract_selected(str(archives), str(out), str(tmp_path / "index.json"), patterns=["*.csv"])
+    assert (out / "fcc" / "comments.csv").exists()
+    assert not (out / "fcc" / "filers.jsonl").exists()
+    assert not (out / "fcc" / "readme.txt").exists()
@@ -0,0 +1,75 @@
+from types import SimpleNamespace as NS
+
+import pytest
+from datasets import Dataset, DatasetDict
+
+from mca_ai.data_loader import pretokenize_dataset
+from mca_ai.models.decoding import AdaptiveSummarizer
+from mca_ai.models.tokenized import SUMMARIZE_PREFIX, _length_batches, token_columns
+
+
+class WordTokenizer:
+    loads = 0
+
+    @classmethod
+    def from_pretrained(cls, name):
+        cls.loads += 1
+        return cls()
+
+    def __call__(self, texts, truncation=False, max_length=None, **kwargs):
+        def encode(text):
+            ids = [len(w) for w in text.split()]
+            return ids[:max_length] if truncation and max_length else ids
+        if isinstance(texts, list):
+            return {"input_ids": [encode(t) for t in texts]}
+        return {"input_ids": encode(texts)}
+
+
+def _cfg():
+    return NS(
+        data=NS(map_num_proc=1),
+        pretokenize=NS(enabled=True, num_proc=1),
+        sentiment=NS(model_name="org/sentiment", max_length=4),
+        summarization=NS(model_name="t5-small", max_input_length=8),
+    )
+
+
+def test_columns_are_keyed_by_model_and_length():
+    assert token_columns("org/model", 256) == ("input_ids__org__model__256", "length__org__model__256")
+    assert token_columns("org/model", 512)[0] != token_columns("org/model", 256)[0]
+
+
+def test_length_batches_cover_every_row_longest_first():
+    ids = [[1] * n for n in (3, 9, 1, 5, 7)]
+    batches = list(_length_batches(ids, 2))
+    assert batches == [[1, 4], [3, 0], [2]]
+
+
+def test_pretokenize_stores_ids_and_lengths_once(monkeypatch):
+    transformers = pytest.importorskip("transformers")
+    monkeypatch.setattr(transformers, "AutoTokenizer", WordTokenizer)
+    texts = ["a bb ccc dddd eeeee", "ff g"]
+    ds = DatasetDict({"train": Dataset.from_dict({"text": texts, "summary_text": ["x yy", "zzz"]})})
+    ds = pretokenize_dataset(ds, _cfg())
+
+    sent_ids, sent_len = token_columns("org/sentiment", 4)
+    sum_ids = token_columns("t5-small", 8)[0]
+    train = ds["train"]
+    assert train[sent_ids] == [[1, 2, 3, 4], [2, 1]]
+    assert train[sent_len] == [4, 2]
+    # The summarizer reads its pre-truncated column, behind the task prefix
+    assert train[sum_ids] == [[len(SUMMARIZE_PREFIX.strip()), 1, 2], [len(SUMMARIZE_PREFIX.strip()), 3]]
+
+    loads = WordTokenizer.loads
+    pretokenize_dataset(ds, _cfg())
+    assert WordTokenizer.loads == loads
+
+
+def test_stored_lengths_route_the_decoding_policy():
+    tokenizer = WordTokenizer()
+    summarizer = NS(tokenizer=tokenizer, max_summary_len=2, max_input_len=8, num_beams=4, summarize_many=lambda texts: ["generated"] * len(texts))
+    policy = AdaptiveSummarizer(summarizer, passthrough_tokens=2, greedy_max_tokens=4)
+    # Stored ids carry the prefix token; "x" alone would have been passed through
+    input_ids = [[9, 1, 1], [9, 1, 1, 1, 1, 1, 1]]
+    assert policy.summarize_many(["a b", "x"], input_ids) == ["a b", "generated"]
+    assert (policy.stats["passthrough"], policy.stats["beam"]) == (1, 1)
@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from mca_ai import tracing
+from mca_ai.tracing import Tracer
+
+
+@pytest.fixture
+def global_tracer():
+    tracer = tracing.tracer
+    yield tracer
+    tracer.enabled = False
+    tracer.events, tracer.stats, tracer.counters = [], {}, {}
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("stage") as sp:
+        sp.add_bytes(10)
+    tracer.count("rows", 5)
+    assert tracer.events == [] and tracer.stats == {} and tracer.counters == {}
+
+
+def test_spans_aggregate_calls_bytes_and_counters(tmp_path):
+    tracer = Tracer()
+    tracer.enable()
+    for n in (3, 4):
+        with tracer.span("write", rows=n) as sp:
+            sp.add_bytes(n * 10)
+    with tracer.span("load"):
+        pass
+    tracer.count("rows", 3)
+    tracer.count("rows", 4)
+    assert tracer.stats["write"]["calls"] == 2
+    assert tracer.stats["write"]["bytes"] == 70
+    assert tracer.counters == {"rows": 7}
+    assert {r["stage"] for r in tracer.summary_rows()} == {"write", "load"}
+
+    path = tmp_path / "trace.json"
+    tracer.export_chrome_trace(str(path))
+    trace = json.loads(path.read_text())
+    assert [e["name"] for e in trace["traceEvents"]] == ["write", "write", "load"]
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in trace["traceEvents"])
+    assert trace["traceEvents"][1]["args"] == {"rows": 4, "bytes": 40}
+    assert trace["otherData"]["counters"] == {"rows": 7}
+
+
+def test_configure_from_environment(monkeypatch, global_tracer):
+    monkeypatch.delenv("MCA_TRACE", raising=False)
+    assert tracing.configure(SimpleNamespace()) is False
+    monkeypatch.setenv("MCA_TRACE", "1")
+    assert tracing.configure(None) is True
+
+
+def test_load_dataset_any_is_traced(tmp_path, global_tracer):
+    from mca_ai.data_loader import load_dataset_any
+
+    global_tracer.enable()
+    cfg = SimpleNamespace(data=SimpleNamespace(source="synthetic"), seed=42)
+    ds = load_dataset_any(cfg, clean=False)
+    assert set(ds) == {"train", "test"}
+    assert global_tracer.stats["load_dataset_any"]["calls"] == 1
+    assert global_tracer.events[-1]["args"]["source"] == "synthetic"
+
+    assert tracing.finish(str(tmp_path)).endswith("trace.json")
+    summary = json.loads((tmp_path / "trace_summary.json").read_text())
+    assert summary["stages"][0]["stage"] == "load_dataset_any"
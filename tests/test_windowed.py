@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mca_ai.models.windowed import WindowedSentiment
+
+
+class IntTokenizer:
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": [int(w) for w in text.split()]}
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+
+def _pipeline():
+    config = SimpleNamespace(id2label={0: "negative", 1: "positive"})
+    return SimpleNamespace(tokenizer=IntTokenizer(), model=SimpleNamespace(config=config), device="cpu")
+
+
+def _doc(n):
+    return " ".join(str(i) for i in range(n))
+
+
+def test_windows_cover_the_document_with_overlap():
+    ws = WindowedSentiment(_pipeline(), max_length=12, overlap=4)
+    assert ws.window_tokens == 10
+    windows = ws.windows(_doc(26))
+    assert [w[0] for w in windows] == [0, 6, 12, 18]
+    assert windows[-1][-1] == 25
+    assert ws.windows(_doc(3)) == [[0, 1, 2]]
+
+
+def test_capped_documents_keep_evenly_spaced_windows():
+    ws = WindowedSentiment(_pipeline(), max_length=12, overlap=0, max_windows=3)
+    windows = ws.windows(_doc(100))
+    assert [w[0] for w in windows] == [0, 40, 90]
+    assert ws.stats["capped_docs"] == 1
+
+
+def test_unknown_aggregation_is_rejected():
+    with pytest.raises(ValueError):
+        WindowedSentiment(_pipeline(), aggregate="median")
+
+
+@pytest.mark.parametrize("aggregate, expected", [("mean", "positive"), ("max", "positive"), ("length_weighted", "negative")])
+def test_window_logits_are_aggregated_per_document(aggregate, expected):
+    torch = pytest.importorskip("torch")
+
+    class FixedLogits(WindowedSentiment):
+        # A short, strongly positive last window after two long negative ones
+        def _logits(self, windows):
+            return torch.tensor([[0.0, 3.0] if len(w) < 5 else [1.0, 0.0] for w in windows])
+
+    ws = FixedLogits(_pipeline(), max_length=12, overlap=0, batch_size=2, aggregate=aggregate)
+    assert ws.predict([_doc(23), _doc(2)]) == [expected, "positive"]
+    assert (ws.stats["windows"], ws.stats["multi_window_docs"], ws.stats["batches"]) == (4, 1, 2)
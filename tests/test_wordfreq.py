@@ -0,0 +1,42 @@
+from collections import Counter
+
+from mca_ai.viz.wordfreq import TermCounter, count_terms, count_terms_parallel
+
+
+TEXTS = [
+    "The FCC's proposal hurts small ISPs.",
+    "Small ISPs support the proposal, 2017 filing",
+    None,
+    "Net neutrality: the FCC must keep it!",
+]
+
+
+def test_count_terms_tokenizes_like_wordcloud():
+    counts = count_terms(TEXTS, stopwords={"the", "it"})
+    assert counts["fcc"] == 2
+    assert counts["isps"] == 2
+    assert counts["proposal"] == 2
+    assert "2017" not in counts and "the" not in counts and "fcc's" not in counts
+
+
+def test_parallel_counts_match_serial():
+    texts = TEXTS * 50
+    serial = count_terms_parallel(texts, num_proc=1, chunk_size=7)
+    parallel = count_terms_parallel(texts, num_proc=2, chunk_size=7)
+    assert parallel.counts == serial.counts == count_terms(texts)
+    assert parallel.docs == serial.docs == len(texts)
+
+
+def test_update_merge_and_save_round_trip(tmp_path):
+    a = TermCounter().update(TEXTS[:2])
+    b = TermCounter().update(TEXTS[2:])
+    total = a.merge(b)
+    assert total.docs == 4
+    assert total.counts == count_terms(TEXTS)
+
+    path = str(tmp_path / "word_frequencies.json")
+    total.save(path, max_terms=3)
+    loaded = TermCounter.load(path)
+    assert loaded.docs == 4
+    assert loaded.most_common() == total.most_common(3)
+    assert isinstance(loaded.counts, Counter)
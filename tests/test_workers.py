@@ -0,0 +1,83 @@
+from types import SimpleNamespace as NS
+
+import pytest
+
+from mca_ai import workers
+from mca_ai.workers import ReplicaPool, check_oversubscription, init_replica, plan_topology, run_chunk
+
+
+@pytest.fixture
+def eight_cpus(monkeypatch):
+    monkeypatch.setattr(workers, "available_cpus", lambda: list(range(8)))
+
+
+def test_cores_are_split_evenly_between_replicas(eight_cpus):
+    assert plan_topology(4) == (2, [[0, 1], [2, 3], [4, 5], [6, 7]])
+    assert plan_topology(3, pin_cpus=False) == (2, [None, None, None])
+    # More threads than cores wrap around instead of failing
+    assert plan_topology(2, intra_op_threads=6) == (6, [[0, 1, 2, 3, 4, 5], [6, 7, 0, 1, 2, 3]])
+
+
+def test_oversubscription_is_reported(eight_cpus, monkeypatch):
+    monkeypatch.setenv("TOKENIZERS_PARALLELISM", "false")
+    assert check_oversubscription(4, 2, 1) == []
+    assert len(check_oversubscription(4, 4, 1)) == 1
+    monkeypatch.setenv("TOKENIZERS_PARALLELISM", "true")
+    assert len(check_oversubscription(2, 2, 1, map_num_proc=4)) == 2
+
+
+class EchoSentiment:
+    def predict(self, texts, batch_size=16):
+        return [f"len{len(t)}" for t in texts]
+
+
+class EchoSummarizer:
+    def summarize(self, text):
+        return text.upper()
+
+
+def test_run_chunk_uses_this_process_replica(monkeypatch):
+    monkeypatch.setattr(workers, "_keywords", lambda texts, top_k, offset=0: [[t] for t in texts])
+    cfg = NS(sentiment=NS(batch_size=2), summarization=NS(), keywords=NS(top_k=3))
+    init_replica(cfg, EchoSentiment(), EchoSummarizer(), cpus=[0])
+    out = run_chunk({"start": 0, "text": ["ab", "c"], "sentiment_text": ["ab", "c"], "summary_text": ["ab", "c"]})
+    assert out["sentiment"] == ["len2", "len1"]
+    assert out["summary"] == ["AB", "C"]
+    assert out["keywords"] == [["ab"], ["c"]]
+    assert out["confidence"] is None and out["docs"] == 2 and out["cpus"] == [0]
+    assert set(out["stage_seconds"]) == {"sentiment", "summarize", "keywords"}
+
+
+class InlinePool:
+    """Runs tasks on submission and remembers how many were queued at most."""
+
+    def __init__(self):
+        self.queued = 0
+        self.max_queued = 0
+
+    def apply_async(self, fn, args):
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        pool = self
+
+        class Handle:
+            def get(self):
+                pool.queued -= 1
+                return {"pid": 1, "cpus": None, "docs": args[0]["docs"], "seconds": 0.5, "reports": {}, "memory_start": {}, "memory": {}}
+
+        return Handle()
+
+
+def test_imap_keeps_order_and_bounds_in_flight_chunks(eight_cpus):
+    pool = ReplicaPool("config.yaml", 2, max_in_flight=3)
+    pool.pool = InlinePool()
+    results = list(pool.imap((k, {"docs": k}) for k in range(10)))
+    assert [key for key, _ in results] == list(range(10))
+    assert pool.pool.max_queued == 3
+    worker = pool.report()["workers"]["1"]
+    assert (worker["chunks"], worker["docs"], worker["docs_per_sec"]) == (10, 45, 9.0)
+
+
+def test_unknown_share_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ReplicaPool("config.yaml", 2, share_weights="mmap")
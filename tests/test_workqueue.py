@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from mca_ai.workqueue import WorkQueue, _heartbeat_loop, _open
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue" / "work.sqlite")
+
+
+def test_costliest_chunk_is_leased_first(queue_path):
+    queue = WorkQueue(queue_path)
+    queue.enqueue([["a"], ["b", "c"], ["d"]], [1.0, 5.0, 3.0])
+    assert queue.lease("w1") == (2, ["b", "c"])
+    assert queue.lease("w1") == (3, ["d"])
+    assert queue.complete(2, "w1", "chunk-2.json")
+    assert queue.counts() == {"done": 1, "leased": 1, "queued": 1}
+    assert queue.done_chunks() == [(2, "chunk-2.json")]
+
+
+def test_expired_lease_goes_to_the_next_worker(queue_path):
+    queue = WorkQueue(queue_path, lease_seconds=0.05)
+    queue.enqueue([["a"]])
+    chunk_id, _ = queue.lease("dead")
+    assert queue.lease("alive") is None
+    time.sleep(0.1)
+    assert queue.lease("alive") == (chunk_id, ["a"])
+    # The first owner has lost the chunk: no heartbeat, no completion
+    assert not queue.heartbeat(chunk_id, "dead")
+    assert not queue.complete(chunk_id, "dead", "stale.json")
+    assert queue.complete(chunk_id, "alive", "fresh.json")
+    assert queue.done_chunks() == [(chunk_id, "fresh.json")]
+
+
+def test_chunks_fail_after_max_attempts(queue_path):
+    queue = WorkQueue(queue_path, lease_seconds=0.05, max_attempts=2)
+    queue.enqueue([["a"]])
+    chunk_id, _ = queue.lease("w1")
+    queue.fail(chunk_id, "w1", "boom")
+    assert queue.counts() == {"queued": 1}
+    queue.lease("w2")
+    time.sleep(0.1)
+    assert queue.lease("w3") is None
+    assert queue.counts() == {"failed": 1}
+
+
+def test_heartbeat_keeps_the_lease(queue_path):
+    queue = WorkQueue(queue_path, lease_seconds=0.2)
+    queue.enqueue([["a"]])
+    chunk_id, _ = queue.lease("w1")
+    stop, lost = threading.Event(), threading.Event()
+    beat = threading.Thread(target=_heartbeat_loop, args=(queue_path, chunk_id, "w1", 0.05, 0.2, stop, lost))
+    beat.start()
+    time.sleep(0.5)
+    assert queue.lease("w2") is None
+    stop.set()
+    beat.join()
+    assert not lost.is_set()
+    assert queue.complete(chunk_id, "w1", "done.json")
+
+
+def test_concurrent_workers_lease_each_chunk_once(queue_path):
+    WorkQueue(queue_path).enqueue([[str(i)] for i in range(40)])
+    leased = []
+
+    def worker(name):
+        queue = WorkQueue(queue_path)
+        while True:
+            got = queue.lease(name)
+            if got is None:
+                break
+            leased.append(got[0])
+            queue.complete(got[0], name, f"{got[0]}.json")
+        queue.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(leased) == list(range(1, 41))
+    assert WorkQueue(queue_path).counts() == {"done": 40}
+
+
+def test_uninitialized_queue_is_rejected(queue_path):
+    WorkQueue(queue_path).close()
+    with pytest.raises(RuntimeError):
+        _open(queue_path)